@@ -0,0 +1,284 @@
+"""
+Benchmark the extraction of a synthetic export. Each extractor, and the end-to-end
+Extractor.extract_from_json, is run on its own in a fresh process, again and again until
+--min-time seconds have been measured, and the rows per second and MB of JSON per second
+of its fastest run and its peak RSS are reported. The results can be saved as
+a JSON baseline and later runs compared with it to catch performance regressions:
+
+    python benchmark.py --save benchmark.json
+    python benchmark.py --compare benchmark.json
+
+The same way, the STOP game session calculations with NumPy arrays can be compared with
+those made event by event, without the time taken to create the spreadsheets:
+
+    python benchmark.py --xlsx skip --save events.json
+    python benchmark.py --xlsx skip --session-arrays --compare events.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+import resource
+import tempfile
+import contextlib
+import multiprocessing
+
+from synthetic import SyntheticExport
+
+END_TO_END = 'extract_from_json'
+
+BASELINE_VERSION = 1
+
+
+def get_peak_rss():
+    """Return the peak resident set size of this process in bytes"""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak_rss  # bytes on macOS
+    return peak_rss * 1024  # kilobytes on Linux
+
+
+def get_benchmark_extractors():
+    """Return every game and question extractor keyed by its CSV filename"""
+    from extractors import ExtractorFactory
+    extractors = ExtractorFactory.game_extractors + ExtractorFactory.question_extractors
+    return {extractor.get_filename(): extractor for extractor in extractors}
+
+
+def repeat_until(min_seconds, run):
+    """
+    Call run, which returns (CSV rows, seconds), until at least min_seconds have been measured,
+    so a fast case is timed often enough to compare with a baseline; return (CSV rows, seconds
+    of the fastest run, runs). The fastest run is the one least disturbed by the rest of the system.
+    """
+    total_seconds = 0
+    fastest_seconds = None
+    run_count = 0
+    while run_count == 0 or total_seconds < min_seconds:
+        csv_row_count, seconds = run()
+        total_seconds += seconds
+        fastest_seconds = seconds if fastest_seconds is None else min(fastest_seconds, seconds)
+        run_count += 1
+    return csv_row_count, fastest_seconds, run_count
+
+
+def run_extractor(extractor_filename, rows, extractor_options, min_seconds=0):
+    """
+    Process each row an extractor can process, with a new extractor and new copies of the rows
+    for each run, until min_seconds have been measured; return (rows, bytes, CSV rows, seconds, runs)
+    """
+    extractor_class = type(get_benchmark_extractors()[extractor_filename])
+    # Measure the rows, and copy them for each run because an extractor may add values to them
+    row_texts = [json.dumps(row) for row in rows]
+    row_selector = extractor_class()
+    extractor_row_texts = [row_text for row, row_text in zip(rows, row_texts) if row_selector.can_process_row(row)]
+    row_bytes = sum(len(row_text) for row_text in extractor_row_texts)
+
+    def run():
+        extractor = extractor_class()
+        # Set the options an Extractor sets on its extractors
+        if hasattr(extractor, 'use_session_arrays'):
+            extractor.use_session_arrays = extractor_options.get('session_arrays', False)
+        if hasattr(extractor, 'xlsx_mode'):
+            extractor.xlsx_mode = extractor_options.get('xlsx', 'session')
+        extractor_rows = [json.loads(row_text) for row_text in extractor_row_texts]
+        csv_row_count = 0
+        start_time = time.perf_counter()
+        for row in extractor_rows:
+            if extractor.process_row(row):
+                csv_row_count += len(extractor.extracted_rows())
+        if hasattr(extractor, 'remaining_rows'):
+            csv_row_count += len(extractor.remaining_rows())
+        return csv_row_count, time.perf_counter() - start_time
+
+    # An extractor with no rows to process is not repeated
+    csv_row_count, seconds, run_count = repeat_until(min_seconds if extractor_row_texts else 0, run)
+    return len(extractor_row_texts), row_bytes, csv_row_count, seconds, run_count
+
+
+def run_end_to_end(export_text, extractor_options, include_questions, min_seconds=0):
+    """
+    Extract every row into CSV files in a temporary folder, with a new Extractor and new rows
+    for each run, until min_seconds have been measured; return (rows, bytes, CSV rows, seconds, runs)
+    """
+    import pathlib
+    from extractors import ExtractorFactory
+    if include_questions:
+        ExtractorFactory.extractors = ExtractorFactory.game_extractors + ExtractorFactory.question_extractors
+    from extract import Extractor
+
+    def run():
+        extractor = Extractor(**extractor_options)
+        rows = json.loads(export_text)
+        with tempfile.TemporaryDirectory() as output_folder:
+            start_time = time.perf_counter()
+            extractor.extract_from_json(rows, pathlib.Path(output_folder))
+            seconds = time.perf_counter() - start_time
+            csv_row_count = 0
+            for filename in os.listdir(output_folder):
+                if filename.endswith('.csv'):
+                    with open(os.path.join(output_folder, filename), encoding='utf-8') as csv_file:
+                        csv_row_count += sum(1 for _ in csv_file) - 1
+        return csv_row_count, seconds
+
+    csv_row_count, seconds, run_count = repeat_until(min_seconds, run)
+    return len(json.loads(export_text)), len(export_text.encode('utf-8')), csv_row_count, seconds, run_count
+
+
+def run_case(job):
+    """Run one benchmark case in a worker process and return its result"""
+    case, export_path, extractor_options, include_questions, min_seconds = job
+    with open(export_path, 'r', encoding='utf-8') as json_file:
+        export_text = json_file.read()
+    # Silence the progress output of the extractors
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if case == END_TO_END:
+            row_count, row_bytes, csv_row_count, seconds, run_count = run_end_to_end(
+                export_text, extractor_options, include_questions, min_seconds)
+        else:
+            row_count, row_bytes, csv_row_count, seconds, run_count = run_extractor(
+                case, json.loads(export_text), extractor_options, min_seconds)
+    return {
+        'rows': row_count,
+        'bytes': row_bytes,
+        'csv_rows': csv_row_count,
+        'seconds': seconds,
+        'runs': run_count,
+        'rows_per_second': row_count / seconds if seconds else 0,
+        'mb_per_second': row_bytes / 1e6 / seconds if seconds else 0,
+        'peak_rss_mb': get_peak_rss() / 1e6,
+    }
+
+
+def run_benchmarks(cases, export_path, extractor_options, include_questions, repeat=1, min_seconds=0):
+    """
+    Run each case repeat times, each time in a fresh process so its peak RSS is its own,
+    and keep the fastest run of each case. Within each process a case is run again until
+    at least min_seconds have been measured.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for case in cases:
+        for _ in range(repeat):
+            with context.Pool(1) as pool:
+                result = pool.apply(run_case, [(case, export_path, extractor_options, include_questions, min_seconds)])
+            if case not in results or result['seconds'] < results[case]['seconds']:
+                results[case] = result
+        print_result(case, results[case])
+    return results
+
+
+def print_result(case, result):
+    print('{:<20} {:>7} rows {:>8} CSV rows {:>9.4f}s x {:<5} {:>10.0f} rows/s {:>8.2f} MB/s {:>8.1f} MB peak RSS'.format(
+        case, result['rows'], result['csv_rows'], result['seconds'], result['runs'],
+        result['rows_per_second'], result['mb_per_second'], result['peak_rss_mb']))
+
+
+def compare_with_baseline(baseline, report, tolerance):
+    """
+    Print the change in rows per second and peak RSS of each case from the baseline and
+    return the list of cases whose throughput fell, or whose peak RSS grew, by more than the tolerance
+    """
+    if baseline['workload'] != report['workload']:
+        print('WARNING: the baseline workload {} differs from this workload {}'.format(baseline['workload'], report['workload']))
+    regressions = []
+    for case, result in report['results'].items():
+        if case not in baseline['results']:
+            continue
+        baseline_result = baseline['results'][case]
+        if not baseline_result['rows_per_second'] or not result['rows_per_second']:
+            print('{:<20} no rows to compare'.format(case))
+            continue
+        throughput_change = result['rows_per_second'] / baseline_result['rows_per_second'] - 1
+        rss_change = result['peak_rss_mb'] / baseline_result['peak_rss_mb'] - 1
+        is_regression = throughput_change < -tolerance or rss_change > tolerance
+        print('{:<20} {:>+7.1%} rows/s {:>+7.1%} peak RSS{}'.format(
+            case, throughput_change, rss_change, '  REGRESSION' if is_regression else ''))
+        if is_regression:
+            regressions.append(case)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the extraction of a synthetic Food Control export')
+    parser.add_argument('--users', type=int, default=20, help='the number of synthetic users')
+    parser.add_argument('--sessions', type=int, default=2, help='the number of sessions of each user')
+    parser.add_argument('--rounds', type=int, default=4, help='the number of rounds of each STOP game session')
+    parser.add_argument('--trials', type=int, default=48, help='the number of trials in each STOP game round')
+    parser.add_argument('--seed', type=int, default=0, help='the random number generator seed')
+    parser.add_argument('--hash-seed', type=int, default=0,
+                        help='the PYTHONHASHSEED of the benchmark processes; the speed of some extractors '
+                             'depends on the order of their sets, so it is fixed for runs to be comparable')
+    parser.add_argument('--repeat', type=int, default=1, help='run each case this many times and keep the fastest')
+    parser.add_argument('--min-time', type=float, default=0.2, metavar='SECONDS',
+                        help='run each case again until at least this many seconds have been measured, '
+                             'so that fast cases are timed for long enough to compare')
+    parser.add_argument('--extractor', action='append', dest='cases', metavar='FILENAME',
+                        help='only benchmark this extractor, e.g. G-STOP or Q-FREQ (may be repeated)')
+    parser.add_argument('--no-end-to-end', action='store_true', help='do not benchmark Extractor.extract_from_json')
+    parser.add_argument('--questions', action='store_true',
+                        help='include the question extractors in the end-to-end benchmark')
+    parser.add_argument('--single-pass', action='store_true', help='benchmark the end-to-end single pass extraction')
+    parser.add_argument('--session-arrays', action='store_true',
+                        help='benchmark the STOP game session event calculations with NumPy arrays')
+    parser.add_argument('--xlsx', choices=['session', 'defer', 'skip'], default='session',
+                        help='create the STOP game spreadsheet for every session (session), only for the last session '
+                             'when it is saved (defer) or not at all (skip); skip times the session calculations alone')
+    parser.add_argument('--save', metavar='JSON', help='save the results as a baseline to this file')
+    parser.add_argument('--compare', metavar='JSON', help='compare the results with the baseline in this file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='the fraction by which throughput may fall or peak RSS grow before it is a regression')
+    args = parser.parse_args()
+    if args.session_arrays:
+        from extractors import SessionEventArrays
+        if not SessionEventArrays.is_available():
+            parser.error('--session-arrays requires NumPy')
+
+    workload = {
+        'users': args.users,
+        'sessions': args.sessions,
+        'rounds': args.rounds,
+        'trials': args.trials,
+        'seed': args.seed,
+        'hash_seed': args.hash_seed,
+    }
+    cases = args.cases or sorted(get_benchmark_extractors())
+    if not args.no_end_to_end:
+        cases.append(END_TO_END)
+    extractor_options = {'single_pass': args.single_pass, 'session_arrays': args.session_arrays, 'xlsx': args.xlsx}
+    # The spawned benchmark processes inherit the environment
+    os.environ['PYTHONHASHSEED'] = str(args.hash_seed)
+
+    with tempfile.TemporaryDirectory() as export_folder:
+        export_path = os.path.join(export_folder, 'synthetic.json')
+        rows = SyntheticExport(args.users, args.sessions, args.rounds, args.trials, args.seed).create_rows()
+        with open(export_path, 'w', encoding='utf-8') as json_file:
+            json.dump(rows, json_file)
+        workload['rows'] = len(rows)
+        workload['bytes'] = os.path.getsize(export_path)
+        del rows
+        print('Workload: {rows} rows, {bytes} bytes of JSON'.format(**workload))
+        results = run_benchmarks(cases, export_path, extractor_options, args.questions, args.repeat, args.min_time)
+
+    report = {
+        'version': BASELINE_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'workload': workload,
+        'options': dict(extractor_options, questions=args.questions),
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as baseline_file:
+            json.dump(report, baseline_file, indent=2, sort_keys=True)
+        print('Saved the baseline to {}'.format(args.save))
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_with_baseline(baseline, report, args.tolerance)
+        if regressions:
+            print('{} regression(s): {}'.format(len(regressions), ', '.join(regressions)))
+            sys.exit(1)
@@ -0,0 +1,59 @@
+import bisect
+
+
+class DuplicateIndex:
+    """
+    Find the rows of an export that duplicate an earlier row. A row is a duplicate if an
+    earlier row has the same studyId, userId and captureDate and a creationDate within
+    window milliseconds of it, whether or not the two rows are next to each other.
+
+    The creation dates of the rows seen so far are indexed by (studyId, userId, captureDate)
+    and kept sorted within each bucket, so each row is checked with a binary search and a
+    whole export in O(n log n). When rows are streamed, pass a retention (in milliseconds):
+    buckets whose newest creation date is older than the newest creation date seen minus
+    the retention are dropped from time to time so memory stays bounded.
+    """
+
+    window = 2500
+
+    # How many rows to check between sweeps for buckets older than the retention
+    eviction_interval = 10000
+
+    def __init__(self, retention=None):
+        self.creation_dates = {}  # dict of sorted list of creation dates keyed by (studyId, userId, captureDate)
+        self.retention = retention
+        self.newest_creation_date = None
+        self.rows_since_eviction = 0
+
+    @staticmethod
+    def get_key(row):
+        return row['studyId'], row['userId'], row['captureDate']
+
+    def is_duplicate(self, row):
+        """Return True if the row duplicates a row already seen and add the row to the index"""
+        creation_date = row['creationDate']
+        creation_dates = self.creation_dates.setdefault(self.get_key(row), [])
+        index = bisect.bisect_left(creation_dates, creation_date - self.window)
+        duplicate = index < len(creation_dates) and creation_dates[index] <= creation_date + self.window
+        bisect.insort(creation_dates, creation_date)
+
+        if self.newest_creation_date is None or creation_date > self.newest_creation_date:
+            self.newest_creation_date = creation_date
+        if self.retention is not None:
+            self.rows_since_eviction += 1
+            if self.rows_since_eviction >= self.eviction_interval:
+                self.evict()
+        return duplicate
+
+    def evict(self):
+        """Drop the buckets whose newest creation date is older than the retention"""
+        oldest_creation_date = self.newest_creation_date - self.retention
+        self.creation_dates = {
+            key: creation_dates for key, creation_dates in self.creation_dates.items()
+            if creation_dates[-1] >= oldest_creation_date
+        }
+        self.rows_since_eviction = 0
+
+    def flag_duplicates(self, rows):
+        """Return a list with a duplicate flag for each of the rows"""
+        return [self.is_duplicate(row) for row in rows]
@@ -1,61 +1,213 @@
 import os
-import csv
 import json
+import time
+import argparse
+import itertools
+import multiprocessing
 
 from settings import JSON_PATH, CSV_PATH
-from extractors import ExtractorFactory
+from extractors import ExtractorFactory, SessionEventArrays, ScoreMatrix
+from outputs import CsvOutput, ParquetOutput, SqliteOutput, TeeOutput
+from duplicates import DuplicateIndex
+from manifest import RowManifest
+from timings import NullTimer, PhaseTimer, ALL_EXTRACTORS
+from utils import iterate_json_array
 
 
 class Extractor:
 
-    def __init__(self):
+    # How long, in milliseconds, streamed rows are kept in the duplicate index
+    duplicate_retention = 24 * 60 * 60 * 1000
+
+    def __init__(self, single_pass=False, session_arrays=False, block_ssrt=False, xlsx='session', incremental=False,
+                 batch_scoring=False, timings=False, parquet=False, sqlite=None):
         self.extractor_factory = ExtractorFactory()
-        self.previous_row = None
+        self.single_pass = single_pass
+        self.incremental = incremental
+        self.parquet = parquet
+        # The SQLite database every export is also written to, if any
+        self.sqlite = sqlite
+        # Time the phases of the extraction of every row with a PhaseTimer, or not at all with a NullTimer
+        self.timer = PhaseTimer() if timings else NullTimer()
+        for extractor in self.extractor_factory.extractors:
+            if hasattr(extractor, 'timer'):
+                extractor.timer = self.timer
+            if hasattr(extractor, 'use_session_arrays'):
+                extractor.use_session_arrays = session_arrays
+            if hasattr(extractor, 'per_block_ssrt'):
+                extractor.per_block_ssrt = block_ssrt
+            if hasattr(extractor, 'xlsx_mode'):
+                extractor.xlsx_mode = xlsx
+            if hasattr(extractor, 'batch_scoring'):
+                extractor.batch_scoring = batch_scoring
 
     def extract_from_json(self, json_array, json_csv_path):
-        for extractor in self.extractor_factory.extractors:
-            print('\nEXTRACTOR: {}'.format(extractor.type))
-            self.extract_row_type(json_array, extractor, json_csv_path)
+        # In incremental mode the rows already extracted into the folder are skipped
+        manifest = RowManifest(json_csv_path) if self.incremental else None
+        if self.single_pass:
+            self.dispatch_rows(json_array, json_csv_path, manifest)
+        else:
+            # Find the duplicate rows once for all of the extractors
+            self.timer.start()
+            duplicate_flags = DuplicateIndex().flag_duplicates(json_array)
+            self.timer.stop(ALL_EXTRACTORS, 'dispatch', len(json_array))
+            for extractor in self.extractor_factory.extractors:
+                print('\nEXTRACTOR: {}'.format(extractor.type))
+                self.extract_row_type(json_array, duplicate_flags, extractor, json_csv_path, manifest)
+        if manifest:
+            print('{} new rows extracted into {}'.format(manifest.new_row_count, json_csv_path))
+
+    def dispatch_rows(self, json_array, json_csv_path, manifest=None):
+        """
+        Read the JSON rows once and send each row to the extractors that can process it
+        rather than rescanning the whole array once per extractor. Each extractor keeps
+        its CSV file open until all of the rows have been dispatched. The rows may be a
+        list or an iterator, e.g. the rows of a JSON file read by iterate_json_array.
+        """
+        if isinstance(json_array, list):
+            duplicate_index = DuplicateIndex()
+        else:
+            duplicate_index = DuplicateIndex(retention=self.duplicate_retention)
+        outputs = {}
+        extractors_with_new_rows = set()
+        row_count = 0
+        try:
+            # The time spent extracting and writing the rows is taken out of the dispatch time
+            self.timer.start()
+            for row in json_array:
+                row_count += 1
+                is_duplicate = duplicate_index.is_duplicate(row)
+                extractors = self.extractor_factory.extractors_for_row(row)
+                for extractor in extractors:
+                    if extractor not in outputs:
+                        print('\nEXTRACTOR: {}'.format(extractor.type))
+                        outputs[extractor] = self.open_outputs(extractor, json_csv_path, manifest)
+                    if is_duplicate or (manifest and manifest.has_row(extractor, row)):
+                        continue
+                    if extractor.process_row(row):
+                        self.write_extracted_rows(extractor, outputs[extractor])
+                        extractors_with_new_rows.add(extractor)
+                        if manifest:
+                            manifest.add_row(extractor, row)
+            self.timer.stop(ALL_EXTRACTORS, 'dispatch', row_count)
+            for extractor, output in outputs.items():
+                self.write_remaining_rows(extractor, output)
+        finally:
+            # Close every output even if closing one of them fails
+            TeeOutput(list(outputs.values())).close()
+            self.save_manifest(manifest)
+
+        for extractor in outputs:
+            if not manifest or extractor in extractors_with_new_rows:
+                self.save_spreadsheet(extractor, json_csv_path)
 
-    def extract_row_type(self, json_array, extractor, json_csv_path):
+    def open_outputs(self, extractor, json_csv_path, manifest=None):
+        """
+        Open the extractor's CSV file and, if they are on, its Parquet file and its table in the
+        SQLite database. The table gets the export's new rows in the same way as the CSV file:
+        appended to those of an earlier run in incremental mode, otherwise replacing them.
+        """
+        self.timer.start()
+        csv_output = self.open_csv_output(extractor, json_csv_path, manifest)
+        outputs = [csv_output]
+        try:
+            if self.parquet:
+                parquet_filename = self.get_output_filename(extractor, json_csv_path, 'parquet')
+                outputs.append(ParquetOutput(parquet_filename, extractor.get_column_names()))
+            if self.sqlite:
+                outputs.append(SqliteOutput(self.sqlite, self.get_output_name(extractor), extractor.get_column_names(),
+                                            json_csv_path.name, append=csv_output.append))
+        except Exception:
+            TeeOutput(outputs).close()
+            raise
+        self.timer.stop(extractor, 'write')
+        return outputs[0] if len(outputs) == 1 else TeeOutput(outputs)
+
+    def open_csv_output(self, extractor, json_csv_path, manifest=None):
+        """
+        Open the extractor's CSV file. In incremental mode the new rows are appended to the
+        CSV file written by an earlier run; if that file has gone, the extractor's rows are
+        forgotten by the manifest so the file is written again from the start.
+        """
+        output_filename = self.get_output_filename(extractor, json_csv_path, 'csv')
+        append = False
+        if manifest and manifest.has_extractor(extractor):
+            append = output_filename.exists()
+            if not append:
+                manifest.forget_extractor(extractor)
+        return CsvOutput(output_filename, extractor.get_column_names(), append=append)
+
+    def extract_row_type(self, json_array, duplicate_flags, extractor, json_csv_path, manifest=None):
+        # The time spent extracting and writing the rows is taken out of the dispatch time
+        self.timer.start()
         if not self.has_row_to_extract(json_array, extractor):
+            self.timer.stop(extractor, 'dispatch', len(json_array))
             print('no rows to extract with: ', extractor.type)
             return
 
-        filename = self.clean_filename(extractor.get_filename()).upper()
-        output_filename = json_csv_path / '{}.csv'.format(filename)
-        with open(output_filename, 'w', encoding='utf-8') as csv_file:
-            csv_writer = csv.writer(csv_file, quoting=csv.QUOTE_NONNUMERIC, lineterminator='\n')
-            for row in json_array:
-                if not self.is_duplicate(row):
-                    if extractor.process_row(row):
-                        for extracted_row in extractor.extracted_rows():
-                            csv_writer.writerow(extracted_row)
-                self.previous_row = row
-
-        # We need to prepend the column header row to the file containing the data rows
-        # because in the case of question extraction the column names are not known until
-        # a row has been read
-        with open(output_filename, 'r+', encoding='utf-8') as csv_file:
-            file_data = csv_file.read()  # Read the data rows
-            csv_file.seek(0, 0)          # Move the file pointer to the beginning
-            csv_writer = csv.writer(csv_file, quoting=csv.QUOTE_NONNUMERIC, lineterminator='\n')
-            column_names = extractor.get_column_names()
-            csv_writer.writerow(column_names)  # Write the header row
-            csv_file.write(file_data)          # Write the data rows
-
-        if hasattr(extractor, 'spreadsheet'):
-            output_filename = json_csv_path / '{}.xlsx'.format(filename)
-            extractor.spreadsheet.save(output_filename)
-
-    def is_duplicate(self, row):
-        if self.previous_row:
-            return row['studyId'] == self.previous_row['studyId']\
-                and row['userId'] == self.previous_row['userId']\
-                and row['captureDate'] == self.previous_row['captureDate'] \
-                and abs(row['creationDate'] - self.previous_row['creationDate']) <= 2500
-        else:
-            return False
+        output = self.open_outputs(extractor, json_csv_path, manifest)
+        has_new_rows = False
+        try:
+            for row, is_duplicate in zip(json_array, duplicate_flags):
+                if is_duplicate or (manifest and manifest.has_row(extractor, row)):
+                    continue
+                if extractor.process_row(row):
+                    self.write_extracted_rows(extractor, output)
+                    has_new_rows = True
+                    if manifest:
+                        manifest.add_row(extractor, row)
+            self.timer.stop(extractor, 'dispatch', len(json_array))
+            self.write_remaining_rows(extractor, output)
+        finally:
+            output.close()
+            self.save_manifest(manifest)
+
+        if not manifest or has_new_rows:
+            self.save_spreadsheet(extractor, json_csv_path)
+
+    @staticmethod
+    def save_manifest(manifest):
+        """
+        Save the manifest once the rows added to it are in the closed outputs, so that if the
+        extraction fails later on, running it again does not append the same rows a second time
+        """
+        if manifest:
+            manifest.save()
+
+    def write_extracted_rows(self, extractor, output):
+        self.timer.start()
+        rows = extractor.extracted_rows()
+        output.write_rows(rows)
+        self.timer.stop(extractor, 'write', len(rows))
+
+    def write_remaining_rows(self, extractor, output):
+        """
+        Write the rows an extractor holds back until every row has been processed, e.g. for batch
+        scoring, then flush the rows the output still buffers so that writing them is timed too.
+        """
+        rows = []
+        if hasattr(extractor, 'remaining_rows'):
+            self.timer.start()
+            rows = extractor.remaining_rows()
+            self.timer.stop(extractor, 'calculate', len(rows))
+        self.timer.start()
+        output.write_rows(rows)
+        output.flush()
+        self.timer.stop(extractor, 'write', len(rows))
+
+    def get_output_name(self, extractor):
+        """Return the name of the extractor's output files and SQLite table, e.g. G-STOP"""
+        return self.clean_filename(extractor.get_filename()).upper()
+
+    def get_output_filename(self, extractor, json_csv_path, extension):
+        return json_csv_path / '{}.{}'.format(self.get_output_name(extractor), extension)
+
+    def save_spreadsheet(self, extractor, json_csv_path):
+        if hasattr(extractor, 'has_spreadsheet') and extractor.has_spreadsheet():
+            output_filename = self.get_output_filename(extractor, json_csv_path, 'xlsx')
+            self.timer.start()
+            extractor.save_spreadsheet(output_filename)
+            self.timer.stop(extractor, 'spreadsheet')
 
     @staticmethod
     def clean_filename(filename):
@@ -79,10 +231,55 @@ class Extractor:
         return False
 
 
-if __name__ == '__main__':
-    extractor = Extractor()
+def create_folder(path):
+    path.mkdir(parents=True, exist_ok=True)
+
+
+def filename_without_extension(filename):
+    base_filename, _ = os.path.splitext(os.path.basename(filename))
+    return base_filename
 
-    json_filenames = [
+
+def extract_json_file(extractor, json_filename, stream=False, output_folder=None):
+    """
+    Extract the rows of one JSON export into its own CSV_PATH/<name>-<user>-<session> folder,
+    or into CSV_PATH/<output_folder> when given, e.g. to extract overlapping exports incrementally
+    """
+    json_path = JSON_PATH / json_filename
+    with open(json_path, 'r', encoding='utf-8') as json_file:
+        if stream:
+            json_rows = iterate_json_array(json_file)
+            first_row = next(json_rows)
+            json_rows = itertools.chain([first_row], json_rows)
+        else:
+            json_rows = json.load(json_file)
+            first_row = json_rows[0]
+        user_id = first_row['userId'].lower()
+        session_id = first_row['sessionId']
+        if output_folder:
+            json_csv_path = CSV_PATH / output_folder
+        else:
+            json_csv_path = CSV_PATH / '{}-{}-{}'.format(filename_without_extension(json_filename), user_id, session_id)
+        create_folder(json_csv_path)
+        extractor.extract_from_json(json_rows, json_csv_path)
+
+
+def extract_json_file_in_worker(job):
+    """
+    Extract one JSON export in a process pool worker. Each export gets a fresh
+    Extractor, and so a fresh ExtractorFactory, because the exports are independent.
+    The phase totals of the export are returned when it is timed.
+    """
+    json_filename, stream, extractor_options = job
+    start_time = time.time()
+    extractor = Extractor(**extractor_options)
+    extract_json_file(extractor, json_filename, stream)
+    phase_totals = extractor.timer.get_phase_totals() if extractor_options['timings'] else []
+    return json_filename, time.time() - start_time, phase_totals
+
+
+if __name__ == '__main__':
+    default_json_filenames = [
         # '020518.json',
 
         # '060618.json',
@@ -95,20 +292,76 @@ if __name__ == '__main__':
         # '041018_SameDay.json'
     ]
 
-    def create_folder(path):
-        path.mkdir(parents=True, exist_ok=True)
-
-    def filename_without_extension(filename):
-        base_filename, _ = os.path.splitext(os.path.basename(json_filename))
-        return base_filename
+    parser = argparse.ArgumentParser(description='Extract CSV files from Food Control JSON exports')
+    parser.add_argument('json_filenames', nargs='*', default=default_json_filenames,
+                        help='the JSON exports in JSON_PATH to extract')
+    parser.add_argument('--single-pass', action='store_true',
+                        help='read each export once and dispatch every row to the extractors that accept it')
+    parser.add_argument('--stream', action='store_true',
+                        help='read the rows of each export incrementally instead of loading the whole file (implies --single-pass)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='the number of exports to extract in parallel in a pool of worker processes')
+    parser.add_argument('--session-arrays', action='store_true',
+                        help='compute the STOP game session event calculations with NumPy arrays')
+    parser.add_argument('--block-ssrt', action='store_true',
+                        help='calculate the SSRT of each block (round) of a STOP game session as well as the whole session')
+    parser.add_argument('--xlsx', choices=['session', 'defer', 'skip'], default='session',
+                        help='create the STOP game spreadsheet for every session (session), only for the last session '
+                             'when it is saved (defer) or not at all (skip)')
+    parser.add_argument('--incremental', metavar='FOLDER',
+                        help='extract every export into CSV_PATH/FOLDER, skipping the rows already extracted there '
+                             'and appending the new rows to its CSV files')
+    parser.add_argument('--batch-scoring', action='store_true',
+                        help='calculate the questionnaire sum and missing scores of every row of an export together with NumPy')
+    parser.add_argument('--parquet', action='store_true',
+                        help='also write the rows of each extractor to a Parquet file with typed columns and nulls')
+    parser.add_argument('--sqlite', metavar='DATABASE',
+                        help='also write the rows of each extractor to its table in this SQLite database')
+    parser.add_argument('--timings', metavar='REPORT',
+                        help='time each phase of each extractor and write the report to REPORT.json and REPORT.txt')
+    args = parser.parse_args()
+    if args.session_arrays and not SessionEventArrays.is_available():
+        parser.error('--session-arrays requires NumPy')
+    if args.batch_scoring and not ScoreMatrix.is_available():
+        parser.error('--batch-scoring requires NumPy')
+    if args.parquet and not ParquetOutput.is_available():
+        parser.error('--parquet requires PyArrow')
+    if args.parquet and args.incremental:
+        parser.error('--parquet writes each Parquet file once and cannot be used with --incremental')
+    if args.incremental and args.jobs > 1:
+        parser.error('--incremental extracts every export into one folder and cannot be used with --jobs')
 
+    json_filenames = args.json_filenames
+    extractor_options = {
+        'single_pass': args.single_pass or args.stream,
+        'session_arrays': args.session_arrays,
+        'block_ssrt': args.block_ssrt,
+        'xlsx': args.xlsx,
+        'incremental': bool(args.incremental),
+        'batch_scoring': args.batch_scoring,
+        'timings': bool(args.timings),
+        'parquet': args.parquet,
+        'sqlite': args.sqlite,
+    }
     create_folder(CSV_PATH)
-    for json_filename in json_filenames:
-        json_path = JSON_PATH / json_filename
-        with open(json_path, 'r', encoding='utf-8') as json_file:
-            json_array = json.load(json_file)
-        user_id = json_array[0]['userId'].lower()
-        session_id = json_array[0]['sessionId']
-        json_csv_path = CSV_PATH / '{}-{}-{}'.format(filename_without_extension(json_filename), user_id, session_id)
-        create_folder(json_csv_path)
-        extractor.extract_from_json(json_array, json_csv_path)
+    if args.jobs > 1:
+        jobs = [(json_filename, args.stream, extractor_options) for json_filename in json_filenames]
+        # Replace each worker process after one export so that no extractor state
+        # is carried from one export to the next
+        with multiprocessing.Pool(args.jobs, maxtasksperchild=1) as pool:
+            extracted_files = pool.imap_unordered(extract_json_file_in_worker, jobs)
+            phase_totals_lists = []
+            for file_number, (json_filename, duration, phase_totals) in enumerate(extracted_files, 1):
+                print('\nEXTRACTED {}/{}: {} in {:.1f}s'.format(file_number, len(jobs), json_filename, duration))
+                phase_totals_lists.append(phase_totals)
+        if args.timings:
+            PhaseTimer.save_report(PhaseTimer.merge_phase_totals(*phase_totals_lists), args.timings)
+    else:
+        extractor = Extractor(**extractor_options)
+        for file_number, json_filename in enumerate(json_filenames, 1):
+            start_time = time.time()
+            extract_json_file(extractor, json_filename, args.stream, args.incremental)
+            duration = time.time() - start_time
+            print('\nEXTRACTED {}/{}: {} in {:.1f}s'.format(file_number, len(json_filenames), json_filename, duration))
+        if args.timings:
+            PhaseTimer.save_report(extractor.timer.get_phase_totals(), args.timings)
@@ -1 +1,3 @@
 from .extractorfactory import ExtractorFactory
+from .games.session_arrays import SessionEventArrays
+from .questions.scorematrix import ScoreMatrix
@@ -1,6 +1,16 @@
-import dpath
+import types
+from collections import defaultdict, namedtuple
 
-from keypath_extractor import Keypath, KeypathExtractor
+from keypath_extractor import Keypath
+
+from .keypathplan import KeypathPlan
+from timings import NullTimer
+
+# The column names of an extractor and the position(s) of each name in a CSV row, as a
+# tuple and a read-only mapping of name to a tuple of positions, so the schema cached by an
+# extractor cannot be changed. A name may occur more than once, e.g. Eligibility has two
+# 'Allergies' columns.
+ColumnSchema = namedtuple('ColumnSchema', ['column_names', 'column_positions'])
 
 
 class DataExtractor:
@@ -9,6 +19,12 @@ class DataExtractor:
     # This value is used to represent any kind of missing, blank or null value
     EMPTY_CELL_VALUE = '[]'
 
+    # Replaced by a PhaseTimer to time the phases of extracting each row
+    timer = NullTimer()
+
+    def __init__(self):
+        self.column_schema = None
+
     def get_extractor_type(self):
         """Return the type of game or question this extractor can process"""
         return self.type
@@ -65,8 +81,26 @@ class DataExtractor:
         # The destination keypath is used as the column name
         return [keypath.destination_keypath for keypath in self.get_all_column_keypaths()]
 
+    def get_column_schema(self):
+        """
+        Return the column schema for this data extractor. The schema is computed
+        the first time it is needed and then reused for every row: the keypaths that
+        name the columns are fixed once the extractor is constructed, since the derived
+        value keypaths are named for the subtype of a null row.
+        """
+        if self.column_schema is None:
+            column_names = tuple(self.get_column_names())
+            column_positions = defaultdict(list)
+            for position, column_name in enumerate(column_names):
+                column_positions[column_name].append(position)
+            column_positions = types.MappingProxyType({
+                column_name: tuple(positions) for column_name, positions in column_positions.items()
+            })
+            self.column_schema = ColumnSchema(column_names, column_positions)
+        return self.column_schema
+
     def get_csv_row_values(self, values):
-        return self.listify_values(self.get_column_names(), values)
+        return self.listify_values_with_schema(self.get_column_schema(), values)
 
     @staticmethod
     def listify_values(column_names, values):
@@ -82,6 +116,23 @@ class DataExtractor:
             values_list.append(value)
         return values_list
 
+    @staticmethod
+    def listify_values_with_schema(column_schema, values):
+        """
+        Return a list of column values in the same order as the corresponding column name,
+        placing each value using the precomputed column positions of the schema
+        """
+        values_list = [DataExtractor.EMPTY_CELL_VALUE] * len(column_schema.column_names)
+        column_positions = column_schema.column_positions
+        for column_name, value in values.items():
+            if column_name in column_positions:
+                # Need to be careful to include 0, which is a valid value
+                if value == '' or value is None:
+                    continue
+                for position in column_positions[column_name]:
+                    values_list[position] = value
+        return values_list
+
     def process_row(self, row):
         """
         Attempt to process a row. Return True if this data extractor can
@@ -136,9 +187,9 @@ class DataExtractor:
         """Extract values from a data dictionary using the keypaths of this data extractor"""
         values = {}
         try:
-            value_keypath_extractor = KeypathExtractor(value_keypaths)
-            values = value_keypath_extractor.extract(data)
-            values = KeypathExtractor(derived_value_keypaths).extract(values, values)
+            # The plans of recently used lists of keypaths are compiled once
+            values = KeypathPlan.compile(value_keypaths).extract(data)
+            values = KeypathPlan.compile(derived_value_keypaths).extract(values, values)
         except KeyError as e:
             # There are cases where generated keypaths do not occur so ignore this exception
             # print("KeyError: ", e)
@@ -151,8 +202,9 @@ class DataExtractor:
     def extracted_rows(self):
         """Return a list of one (games) or more (questions) rows of data for output to CSV"""
         rows = []
+        column_schema = self.get_column_schema()
         for rv in self.csv_rows:
-            row = self.listify_values(self.get_column_names(), rv)
+            row = self.listify_values_with_schema(column_schema, rv)
             if not self.row_contains_all_empty_values(row):
                 rows.append(row)
         return rows
@@ -168,4 +220,4 @@ class DataExtractor:
     @staticmethod
     def get_keypath_value(dictionary, keypath):
         """Return the value of a dictionary at a keypath"""
-        return dpath.util.get(dictionary, keypath, separator='.')
+        return KeypathPlan.get_value(dictionary, keypath)
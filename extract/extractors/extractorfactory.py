@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from .games import *
 from .questions import *
 
@@ -45,9 +47,28 @@ class ExtractorFactory:
     def __init__(self):
         self.extractors_by_type = {extractor.type: extractor for extractor in self.extractors}
 
+        # Some extractors share a row type, e.g. all of the question extractors process
+        # 'tellusmore' rows, so extractors_by_type only holds the last one for that type
+        extractors_for_type = defaultdict(list)
+        for extractor in self.extractors:
+            extractors_for_type[extractor.type].append(extractor)
+        self.extractors_sharing_type = {
+            extractor_type: extractors for extractor_type, extractors in extractors_for_type.items()
+            if len(extractors) > 1
+        }
+
     def extractor_for_row_type(self, row_type):
         if row_type in self.extractors_by_type:
             return self.extractors_by_type[row_type]
         else:
             raise ValueError("No extractor for type '{}'".format(row_type))
 
+    def extractors_for_row(self, row):
+        """Return the extractors, in factory order, that can process a row"""
+        row_type = row['type']
+        if row_type in self.extractors_sharing_type:
+            return [extractor for extractor in self.extractors_sharing_type[row_type]
+                    if extractor.can_process_row(row)]
+        if row_type in self.extractors_by_type:
+            return [self.extractors_by_type[row_type]]
+        return []
@@ -12,9 +12,16 @@ class GameDataExtractor(DataExtractor):
         return 'G-{}'.format(super().get_filename())
 
     def extract_row_data(self, row):
+        timer = self.timer
+        timer.start()
         self.csv_rows = self.extract_values(row)
+        timer.stop(self, 'extract', len(self.csv_rows))
+        timer.start()
         self.check(row)
+        timer.stop(self, 'check')
+        timer.start()
         self.calculate(row)
+        timer.stop(self, 'calculate')
 
     def check(self, row):
         """Override to perform extractor-specific row checks"""
@@ -0,0 +1,332 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .session_state import SsrtTotals
+
+
+class SessionEventArrays:
+    """
+    The session events of one STOP game session converted once into a struct of NumPy arrays.
+    Timestamps, positions and points are float arrays, with NaN for None or missing values,
+    and the trial, item and tap response types are integer category codes, with -1 for a
+    missing or unknown value. The values of every key are read from the session events in
+    one pass and converted a column at a time. NumPy is optional: check is_available before
+    using this class.
+    """
+
+    float_keys = [
+        'trialStart',
+        'trialEnd',
+        'stopSignalOnset',
+        'stopSignalOffset',
+        'stopSignalDelay',
+        'stimulusOnset',
+        'stimulusOffset',
+        'tapResponseStart',
+        'tapResponsePositionX',
+        'tapResponsePositionY',
+        'itemPositionX',
+        'itemPositionY',
+        'pointsThisTrial',
+        'pointsRunningTotal',
+    ]
+
+    categories = {
+        'trialType': ['GO', 'STOP'],
+        'itemType': ['HEALTHY', 'NON_HEALTHY'],
+        'tapResponseType': ['CORRECT_GO', 'INCORRECT_GO', 'MISS_GO', 'CORRECT_STOP', 'INCORRECT_STOP', 'MISS_STOP'],
+    }
+
+    # The keys whose values are kept as they are in object arrays
+    object_keys = ['roundID', 'trialID', 'itemID', 'selected']
+
+    @staticmethod
+    def is_available():
+        return numpy is not None
+
+    def __init__(self, session_events):
+        self.count = len(session_events)
+        keys = self.float_keys + list(self.categories) + self.object_keys
+        columns = list(zip(*[tuple(map(session_event.get, keys)) for session_event in session_events]))
+        if not columns:
+            columns = [()] * len(keys)
+        float_count = len(self.float_keys)
+        # NumPy converts None to NaN
+        float_table = numpy.array(columns[:float_count], dtype=float).reshape(float_count, self.count)
+        self.floats = dict(zip(self.float_keys, float_table))
+        self.values = {key: self.object_array(column) for key, column in zip(keys[float_count:], columns[float_count:])}
+        self.codes = {key: self.category_codes(key, self.values[key]) for key in self.categories}
+        self.distinct_values = {}  # dict of (list of distinct values, array of codes) keyed by key
+        self.block_ids, self.block_codes = self.factorized('roundID')
+        self.selected_random = self.values['selected'] == 'random'
+        # The tap response starts with None counted as 0, as numericify does
+        self.tap_response_starts = numpy.nan_to_num(self.floats['tapResponseStart'])
+
+    @staticmethod
+    def object_array(values):
+        array = numpy.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+    @classmethod
+    def category_codes(cls, key, values):
+        codes = numpy.full(len(values), -1)
+        for code, category in enumerate(cls.categories[key]):
+            codes[values == category] = code
+        return codes
+
+    @staticmethod
+    def factorize(values):
+        """
+        Return the list of the distinct values of an object array, in the order they first occur,
+        and an array of the index in that list of each value. The values are numbered in a dict,
+        which is faster than sorting an object array and works for values that cannot be sorted
+        together, e.g. None and strings.
+        """
+        indices = {}
+        codes = numpy.array([indices.setdefault(value, len(indices)) for value in values.tolist()], dtype=int)
+        return list(indices), codes
+
+    def factorized(self, key):
+        """Return the distinct values of a key and the code of each trial's value, factorizing them once"""
+        if key not in self.distinct_values:
+            self.distinct_values[key] = self.factorize(self.values[key])
+        return self.distinct_values[key]
+
+    @staticmethod
+    def count_pairs(first_codes, first_values, second_codes, second_values):
+        """
+        Count the trials with each pair of codes, e.g. of block and trial type; return a list of
+        (first value, second value, count) in the order each pair first occurs, which is the
+        order counting the trials one by one into dicts of dicts would add them in
+        """
+        second_count = len(second_values)
+        pair_codes = first_codes * second_count + second_codes
+        pairs, first_indices, counts = numpy.unique(pair_codes, return_index=True, return_counts=True)
+        order = numpy.argsort(first_indices)
+        return [
+            (first_values[pair // second_count], second_values[pair % second_count], count)
+            for pair, count in zip(pairs[order].tolist(), counts[order].tolist())
+        ]
+
+    def is_category(self, key, value):
+        """Return a boolean array that is True for each trial where the key has the value"""
+        return self.codes[key] == self.categories[key].index(value)
+
+    def category_table(self, table, row_key, column_key):
+        """
+        Look up a value for each trial in a dict of dicts keyed by the values of two category keys,
+        e.g. the points for each trial type and tap response type. A trial whose categories do not
+        occur in the table gets NaN.
+        """
+        row_categories = self.categories[row_key]
+        column_categories = self.categories[column_key]
+        # The extra last row and column hold NaN so that the code -1 looks up NaN
+        values = numpy.full((len(row_categories) + 1, len(column_categories) + 1), numpy.nan)
+        for row_index, row_category in enumerate(row_categories):
+            for column_index, column_category in enumerate(column_categories):
+                if column_category in table.get(row_category, {}):
+                    values[row_index, column_index] = table[row_category][column_category]
+        return values[self.codes[row_key], self.codes[column_key]]
+
+    @staticmethod
+    def without_nan(values):
+        return values[~numpy.isnan(values)]
+
+    @staticmethod
+    def group_pairs(first_codes, first_values, second_codes, second_values, values):
+        """
+        Group values by the pair of codes of their trials, e.g. of tap response type and item type;
+        return a list of (first value, second value, list of values in trial order) in the order
+        each pair first occurs
+        """
+        second_count = len(second_values)
+        pair_codes = first_codes * second_count + second_codes
+        # A stable sort keeps the values of each pair in trial order
+        order = numpy.argsort(pair_codes, kind='stable')
+        pairs, starts = numpy.unique(pair_codes[order], return_index=True)
+        groups = numpy.split(values[order], starts[1:])
+        return [
+            (first_values[pairs[index] // second_count], second_values[pairs[index] % second_count], groups[index].tolist())
+            for index in numpy.argsort(order[starts]).tolist()
+        ]
+
+    def group_by(self, key, value_key):
+        """
+        Return a list of (value of the key, list of the values of value_key of the trials with it,
+        in trial order), e.g. the item IDs of each block, in the order the values of the key first occur
+        """
+        distinct_values, codes = self.factorized(key)
+        values = self.values[value_key]
+        return [(value, values[codes == code].tolist()) for code, value in enumerate(distinct_values)]
+
+    # 1 - Durations
+    def durations(self):
+        """
+        Return the duration arrays for each trial category. A duration is left
+        out of its array when either of the values it is derived from is None.
+        """
+        f = self.floats
+        return {
+            'trial': self.without_nan(f['trialEnd'] - f['trialStart']),
+            'stop_signal': self.without_nan(f['stopSignalOffset'] - f['stopSignalOnset']),
+            'stimulus': self.without_nan(f['stimulusOffset'] - f['stimulusOnset']),
+            'signal_stop_difference': self.without_nan(f['stopSignalOnset'] - f['stopSignalDelay']),
+            'stimulus_stop_difference': self.without_nan(f['stimulusOffset'] - f['stopSignalOffset']),
+            'inter_trial': self.without_nan(numpy.diff(f['trialStart'])),
+        }
+
+    @staticmethod
+    def stats(values):
+        values = numpy.asarray(values, dtype=float)
+        values = values[~numpy.isnan(values)]
+        return {
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'mean': float(values.mean()),
+            'stdev': float(values.std(ddof=1)),
+        }
+
+    # 2 - Trial Number Checks
+    def count_values_by_block(self, key):
+        """Return a list of (block ID, value, count) of the values of a key, e.g. the trial types"""
+        distinct_values, codes = self.factorized(key)
+        return self.count_by_block(codes, distinct_values)
+
+    def count_item_types_by_block(self):
+        """
+        Return a list of (block ID, item type count key, count). A HEALTHY trial is counted as HEALTHY
+        and then as HEALTHY_RANDOM or HEALTHY_NOT_RANDOM, and a NON_HEALTHY trial as NON_HEALTHY.
+        """
+        count_keys = ['HEALTHY', 'HEALTHY_RANDOM', 'HEALTHY_NOT_RANDOM', 'NON_HEALTHY']
+        healthy_trials = numpy.flatnonzero(self.is_category('itemType', 'HEALTHY'))
+        non_healthy_trials = numpy.flatnonzero(self.is_category('itemType', 'NON_HEALTHY'))
+        trials = numpy.concatenate([healthy_trials, healthy_trials, non_healthy_trials])
+        codes = numpy.concatenate([
+            numpy.zeros(len(healthy_trials), dtype=int),
+            numpy.where(self.selected_random[healthy_trials], 1, 2),
+            numpy.full(len(non_healthy_trials), 3),
+        ])
+        # Put the counts in trial order, keeping the two counts of a HEALTHY trial in the order above
+        order = numpy.argsort(trials, kind='stable')
+        return self.count_pairs(self.block_codes[trials[order]], self.block_ids, codes[order], count_keys)
+
+    # 3 - Value Label Checks
+    def count_item_id_prefixes(self, prefixes):
+        """Return a list of (item type, prefix, count) of the item IDs that start with each of the prefixes"""
+        item_ids = self.values['itemID'].astype(str)
+        prefix_codes = numpy.full(self.count, -1)
+        for code, prefix in enumerate(prefixes):
+            prefix_codes[numpy.char.startswith(item_ids, prefix)] = code
+        trials = prefix_codes >= 0
+        item_types, item_type_codes = self.factorized('itemType')
+        return self.count_pairs(item_type_codes[trials], item_types, prefix_codes[trials], prefixes)
+
+    # E
+    def check_tap_responses(self, tap_response_conditions, item_radius=95):
+        """
+        Return a boolean array that is True for each trial that passes its tap response check.
+        The conditions map each trial type and tap response type to one of 'no_response',
+        'within' (a response within the stimulus boundary) or 'outside' (a response outside it).
+        """
+        f = self.floats
+        tap_response_starts = self.tap_response_starts
+        distances = numpy.hypot(f['tapResponsePositionX'] - f['itemPositionX'], f['tapResponsePositionY'] - f['itemPositionY'])
+        responded = tap_response_starts > 0
+        condition_results = {
+            'no_response': tap_response_starts == 0,
+            'within': responded & (distances < item_radius),
+            'outside': responded & (distances >= item_radius),
+        }
+        check_results = numpy.zeros(self.count, dtype=bool)
+        for trial_type, conditions in tap_response_conditions.items():
+            is_trial_type = self.is_category('trialType', trial_type)
+            for tap_response_type, condition in conditions.items():
+                trials = is_trial_type & self.is_category('tapResponseType', tap_response_type)
+                check_results[trials] = condition_results[condition][trials]
+        return check_results
+
+    @staticmethod
+    def failed_indices(check_results):
+        return numpy.flatnonzero(~check_results).tolist()
+
+    # 4 - General Checks
+    def points_are_correct(self, points):
+        """Return True if the points and running totals of every trial match the points table"""
+        points_this_trial = self.floats['pointsThisTrial']
+        expected_points = self.category_table(points, 'trialType', 'tapResponseType')
+        running_totals = numpy.cumsum(points_this_trial)
+        return bool(numpy.all(points_this_trial == expected_points) and
+                    numpy.all(self.floats['pointsRunningTotal'] == running_totals))
+
+    # 5 - Dependent Variables (DVs) / Additional Computations
+    def count_by_block(self, codes, values, trials=None):
+        """
+        Count the trials of each block with each code, e.g. the trial type codes, where values is
+        the list of the value of each code. If trials is given, a boolean array or an array of trial
+        indices, only those trials are counted. Return a list of (block ID, value, count) in the
+        order each block and value first occur; only the blocks and values that occur are counted.
+        """
+        block_codes = self.block_codes
+        if trials is not None:
+            block_codes = block_codes[trials]
+            codes = codes[trials]
+        return self.count_pairs(block_codes, self.block_ids, codes, values)
+
+    def group_tap_response_starts(self, first_key, second_key):
+        """
+        Return a list of (value of the first key, value of the second key, list of the tap response
+        starts of the trials with them), e.g. for each tap response type and item type, leaving
+        out the trials without a value of the first key
+        """
+        first_values, first_codes = self.factorized(first_key)
+        second_values, second_codes = self.factorized(second_key)
+        trials = numpy.not_equal(self.values[first_key], None)
+        return self.group_pairs(first_codes[trials], first_values, second_codes[trials], second_values,
+                                self.tap_response_starts[trials])
+
+    def tap_response_starts_where(self, *conditions):
+        """Return the list of tap response starts for the trials that meet all of the conditions"""
+        trials = numpy.ones(self.count, dtype=bool)
+        for condition in conditions:
+            trials &= condition
+        return self.tap_response_starts[trials].tolist()
+
+    # 6 - Stop Signal Reaction Time
+    def blocks(self):
+        """Return a list of (block ID, boolean array of the trials in the block) in block order of appearance"""
+        return [(block_id, self.block_codes == block_code) for block_code, block_id in enumerate(self.block_ids)]
+
+    def ssrt_totals(self, trials=None):
+        """Return the SsrtTotals of the trials, or of every trial of the session if trials is None"""
+        if trials is None:
+            trials = numpy.ones(self.count, dtype=bool)
+        f = self.floats
+        is_go = self.is_category('trialType', 'GO') & trials
+        is_stop = self.is_category('trialType', 'STOP') & trials
+        tap_response_starts = f['tapResponseStart']
+        responded = self.tap_response_starts != 0
+        is_incorrect_stop = (self.is_category('tapResponseType', 'INCORRECT_STOP') |
+                             self.is_category('tapResponseType', 'MISS_STOP')) & trials
+        go_tap_response_starts = self.without_nan(tap_response_starts[is_go])
+
+        ssrt_totals = SsrtTotals()
+        ssrt_totals.trial_count = int(trials.sum())
+        ssrt_totals.tap_response_start_total = float(go_tap_response_starts[go_tap_response_starts > 0].sum())
+        ssrt_totals.stop_signal_delay_total = float(numpy.nansum(f['stopSignalDelay'][trials]))
+        ssrt_totals.stop_signal_onset_total = float(numpy.nansum(f['stopSignalOnset'][trials]))
+        ssrt_totals.go_trial_count = int(is_go.sum())
+        ssrt_totals.stop_trial_count = int(is_stop.sum())
+        ssrt_totals.stop_trial_with_response_count = int((is_stop & responded).sum())
+        ssrt_totals.incorrect_stop_trials_count = int(is_incorrect_stop.sum())
+        ssrt_totals.go_trial_tap_response_starts = go_tap_response_starts.tolist()
+        return ssrt_totals
+
+    @staticmethod
+    def nth_smallest(values, n):
+        """Return the nth smallest (0-based) of the values using a partial sort"""
+        if not 0 <= n < len(values):
+            raise IndexError('nth_smallest index out of range')
+        return float(numpy.partition(values, n)[n])
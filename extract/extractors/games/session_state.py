@@ -0,0 +1,152 @@
+from collections import defaultdict
+
+from .session_event_log import SessionEventLog
+
+
+class SsrtTotals:
+    """The totals and counts needed to calculate the mean and integration SSRT of a session or a block"""
+
+    __slots__ = [
+        'trial_count',
+        'tap_response_start_total',
+        'stop_signal_delay_total',
+        'stop_signal_onset_total',
+        'go_trial_count',
+        'stop_trial_count',
+        'stop_trial_with_response_count',
+        'incorrect_stop_trials_count',
+        'go_trial_tap_response_starts',
+    ]
+
+    def __init__(self):
+        self.trial_count = 0
+        self.tap_response_start_total = 0
+        self.stop_signal_delay_total = 0
+        self.stop_signal_onset_total = 0
+        self.go_trial_count = 0
+        self.stop_trial_count = 0
+        self.stop_trial_with_response_count = 0
+        self.incorrect_stop_trials_count = 0
+        self.go_trial_tap_response_starts = []
+
+
+class StopSessionState:
+    """
+    The accumulators for one STOP game session. A new state is created for each row
+    so nothing calculated for one session is carried into the next session, or into
+    another STOP extractor.
+    """
+
+    __slots__ = [
+        # 1 - Durations
+        'session_duration',
+        'durations',
+        'trial_stats',
+        # 2 - Trial Number Checks
+        'trial_count',
+        'raw_round_trial_counts',
+        'block_trial_type_counts',
+        'block_item_type_counts',
+        'block_trial_type_percentages',
+        'block_item_type_percentages',
+        'session_trial_type_counts',
+        'session_trial_type_percentages',
+        'session_item_type_counts',
+        'session_item_type_percentages',
+        # 3 - Value Label Checks
+        'label_allocation_counts',
+        'label_allocation_item_id_percentages',
+        'label_allocation_item_type_percentages',
+        'selected_item_ids',
+        'block_item_ids',
+        'session_item_ids',
+        # E and 4 - Tap Response and General Checks
+        'session_event_log',
+        'points_running_total',
+        # 5 - Dependent Variables (DVs) / Additional Computations
+        'dv_correct_counts',
+        'dv_correct_block_percentages',
+        'dv_correct_session_percentages',
+        'dv_correct_go_responses',
+        'dv_correct_stop_responses',
+        'dv_correct_responses',
+        'dv_incorrect_healthy_selected_responses',
+        'dv_incorrect_healthy_not_selected_responses',
+        'dv_incorrect_unhealthy_selected_responses',
+        'dv_incorrect_unhealthy_not_selected_responses',
+        # 6 - Stop Signal Reaction Time
+        'ssrt_totals',
+        'block_ssrt_totals',
+        'mean_ideal_ssrt',
+        'mean_actual_ssrt',
+        'ideal_integration_ssrt',
+        'actual_integration_ssrt',
+        'block_ssrt',
+        'ideal_drt2',
+        'actual_drt2',
+        # 7 - Raw Data
+        'raw_count',
+    ]
+
+    def __init__(self):
+        # 1 - Durations
+        self.session_duration = 0
+        self.durations = defaultdict(list)
+        self.trial_stats = {}
+
+        # 2 - Trial Number Checks
+        self.trial_count = 0
+        self.raw_round_trial_counts = defaultdict(set)
+        self.block_trial_type_counts = defaultdict(lambda: defaultdict(int))  # dict of int dict
+        self.block_item_type_counts = defaultdict(lambda: defaultdict(int))   # dict of int dict
+        self.block_trial_type_percentages = defaultdict(lambda: defaultdict(float))  # dict of float dict
+        self.block_item_type_percentages = defaultdict(lambda: defaultdict(float))  # dict of float dict
+        self.session_trial_type_counts = defaultdict(int)
+        self.session_trial_type_percentages = defaultdict(float)
+        self.session_item_type_counts = defaultdict(int)
+        self.session_item_type_percentages = defaultdict(float)
+
+        # 3 - Value Label Checks
+        self.label_allocation_counts = defaultdict(lambda: defaultdict(int))  # dict of int dict
+        self.label_allocation_counts['HEALTHY']['1_'] = 0
+        self.label_allocation_counts['HEALTHY']['2_'] = 0
+        self.label_allocation_counts['NON_HEALTHY']['1_'] = 0
+        self.label_allocation_counts['NON_HEALTHY']['2_'] = 0
+        self.label_allocation_item_id_percentages = defaultdict(lambda: defaultdict(float))  # dict of float dict
+        self.label_allocation_item_type_percentages = defaultdict(float)
+        self.selected_item_ids = defaultdict(set)  # dict of set
+        self.block_item_ids = defaultdict(set)  # dict of set
+        self.session_item_ids = set()
+
+        # E and 4 - Tap Response and General Checks
+        self.session_event_log = SessionEventLog()
+        self.points_running_total = 0
+
+        # 5 - Dependent Variables (DVs) / Additional Computations
+        self.dv_correct_counts = defaultdict(lambda: defaultdict(int))
+        self.dv_correct_block_percentages = defaultdict(lambda: defaultdict(int))
+        self.dv_correct_session_percentages = defaultdict(float)
+        self.dv_correct_go_responses = list()
+        self.dv_correct_stop_responses = list()
+        self.dv_correct_responses = defaultdict(lambda: defaultdict(list))
+        self.dv_incorrect_healthy_selected_responses = list()
+        self.dv_incorrect_healthy_not_selected_responses = list()
+        self.dv_incorrect_unhealthy_selected_responses = list()
+        self.dv_incorrect_unhealthy_not_selected_responses = list()
+
+        # 6 - Stop Signal Reaction Time
+        self.ssrt_totals = SsrtTotals()
+        self.block_ssrt_totals = defaultdict(SsrtTotals)  # dict of SsrtTotals keyed by block (roundID)
+        self.mean_ideal_ssrt = None
+        self.mean_actual_ssrt = None
+        self.ideal_integration_ssrt = None
+        self.actual_integration_ssrt = None
+        self.block_ssrt = {}  # dict of SSRT dict keyed by block (roundID)
+        self.ideal_drt2 = None
+        self.actual_drt2 = None
+
+        # 7 - Raw Data
+        self.raw_count = {
+            'on': defaultdict(int),
+            'off': defaultdict(int)
+        }
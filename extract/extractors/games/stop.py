@@ -1,10 +1,13 @@
+import heapq
 import math
 import statistics
 from collections import defaultdict
 from pprint import pprint
 
 from .gamedataextractor import GameDataExtractor
-from .session_event_log import SessionEventLog
+from .session_arrays import SessionEventArrays
+from .session_state import StopSessionState
+from .write_only_spreadsheet import WriteOnlySpreadsheet
 from keypath_extractor import Keypath
 from spreadsheet import Spreadsheet
 from utils import irange
@@ -19,13 +22,24 @@ class AbstractStopDataExtractor(GameDataExtractor):
             Keypath('data.captureDate', 'Capture Date'),
         ]
 
-    session_event_log = SessionEventLog()
-    session_duration = 0
-    durations = defaultdict(list)
-    raw_count = {
-        'on': defaultdict(int),
-        'off': defaultdict(int)
-    }
+    # Set use_session_arrays to compute the session event calculations as NumPy array operations
+    use_session_arrays = False
+    session_arrays_supported = True
+
+    # Set per_block_ssrt to calculate the SSRT of each block (roundID) as well as the session
+    per_block_ssrt = False
+
+    # When to create the spreadsheet of a session: 'session' creates one for every session,
+    # 'defer' creates one for the last session when it is saved, using a write-only
+    # workbook, and 'skip' creates none
+    xlsx_mode = 'session'
+
+    def __init__(self):
+        super().__init__()
+        self.tap_response_checks = self.create_tap_response_checks()
+        # The last session calculated and its spreadsheet are kept for save_spreadsheet, so an
+        # extractor instance must not calculate rows on more than one thread at a time
+        self.last_session = None
 
     @staticmethod
     def numericify(n):
@@ -51,15 +65,6 @@ class AbstractStopDataExtractor(GameDataExtractor):
     def remove_none_values(values):
         return [d for d in values if d is not None]
 
-    def clear(self):
-        self.session_duration = 0
-        self.durations.clear()
-        self.session_trial_type_counts.clear()
-        self.trial_type_block_count.clear()
-        self.block_item_type_counts.clear()
-        self.raw_count['on'].clear()
-        self.raw_count['off'].clear()
-
     def get_session_events(self, row):
         """
         Handle inconsistently formatted data structures:
@@ -89,251 +94,377 @@ class AbstractStopDataExtractor(GameDataExtractor):
 
         check_trials_count()
 
-    # 1 - Durations
-    def calculate_durations(self, row):
+    trial_categories = [
+        'trial',
+        'stop_signal',
+        'stimulus',
+        'signal_stop_difference',
+        'stimulus_stop_difference',
+        'inter_trial'
+    ]
+
+    points = {
+        'GO': {
+            'CORRECT_GO': 20,
+            'INCORRECT_GO': -50,
+            'MISS_GO': -20,
+        },
+        'STOP': {
+            'CORRECT_STOP': 50,
+            'INCORRECT_STOP': -50,
+            'MISS_STOP': -50,
+        }
+    }
 
-        def calculate_session_duration():
-            session_start = self.get_keypath_value(row, 'data.0.sessionStart')
-            session_end = self.get_keypath_value(row, 'data.0.sessionEnd')
-            self.session_duration = session_start - session_end
+    def calculate(self, row):
+        super(AbstractStopDataExtractor, self).calculate(row)
+        # Everything calculated for this row is kept in a new session state
+        session = StopSessionState()
+        self.calculate_session_duration(session, row)
+        self.calculate_session_events(session, self.get_session_events(row))
+        self.count_raw_events(session, row)
+        self.last_session = session
+        if self.xlsx_mode == 'session':
+            self.timer.start()
+            self.spreadsheet = self.create_spreadsheet(session)
+            self.timer.stop(self, 'spreadsheet')
+
+    def has_spreadsheet(self):
+        return self.xlsx_mode != 'skip' and self.last_session is not None
+
+    def save_spreadsheet(self, filename):
+        """Save the spreadsheet of the last session, creating it now if its creation was deferred"""
+        if self.xlsx_mode == 'defer':
+            self.spreadsheet = self.create_spreadsheet(self.last_session, WriteOnlySpreadsheet())
+        self.spreadsheet.save(filename)
+
+    def calculate_session_duration(self, session, row):
+        session_start = self.get_keypath_value(row, 'data.0.sessionStart')
+        session_end = self.get_keypath_value(row, 'data.0.sessionEnd')
+        session.session_duration = session_start - session_end
+
+    def calculate_session_events(self, session, session_events):
+        """
+        Read each trial of the session once and update the accumulators for the durations (1),
+        trial and item type counts (2), value labels (3), tap responses (E), points (4),
+        dependent variables (5) and stop signal reaction time (6) as the trial is read
+        """
+        if self.use_session_arrays and self.session_arrays_supported and SessionEventArrays.is_available():
+            self.calculate_session_event_arrays(session, session_events)
+            return
 
-        def record_duration(key, value):
-            self.durations[key].append(value)
+        previous_session_event = None
+        for session_event in session_events:
+            self.record_trial_durations(session, session_event, previous_session_event)
+            self.count_trial(session, session_event)
+            self.record_value_labels(session, session_event)
+            self.check_tap_response(session, session_event)
+            self.check_trial_points(session, session_event)
+            self.record_dependent_variables(session, session_event)
+            self.accumulate_ssrt(session, session_event)
+            previous_session_event = session_event
+
+        self.calculate_trial_duration_stats(session)
+        self.calculate_trial_type_percentages(session)
+        self.calculate_value_label_percentages(session)
+        self.calculate_dependent_variable_percentages(session)
+        self.calculate_ssrt(session)
+
+    def calculate_session_event_arrays(self, session, session_events):
+        """
+        The columnar version of calculate_session_events. The session events are converted once
+        into NumPy arrays and the durations (1), trial and item type counts (2), value labels (3),
+        tap responses (E), points (4), dependent variables (5) and stop signal reaction time (6)
+        are computed as array operations. The counts are added to the dicts of the session state
+        in the order counting the trials one by one would add them.
+        """
+        arrays = SessionEventArrays(session_events)
+
+        # 2 - Trial Number Checks
+        session.trial_count += arrays.count
+        for block_id, trial_ids in arrays.group_by('roundID', 'trialID'):
+            session.raw_round_trial_counts[block_id].update(trial_ids)
+        for block_id, trial_type, count in arrays.count_values_by_block('trialType'):
+            session.block_trial_type_counts[block_id][trial_type] += count
+        for block_id, item_type_key, count in arrays.count_item_types_by_block():
+            session.block_item_type_counts[block_id][item_type_key] += count
+
+        # 3 - Value Label Checks
+        for item_type, prefix, count in arrays.count_item_id_prefixes(['1_', '2_']):
+            session.label_allocation_counts[item_type][prefix] += count
+        for selected, item_ids in arrays.group_by('selected', 'itemID'):
+            session.selected_item_ids[selected].update(item_ids)
+        for block_id, item_ids in arrays.group_by('roundID', 'itemID'):
+            session.block_item_ids[block_id].update(item_ids)
+
+        # 1 - Durations
+        for trial_category, durations in arrays.durations().items():
+            session.durations[trial_category].extend(durations.tolist())
+        for trial_category in self.trial_categories:
+            session.trial_stats[trial_category] = arrays.stats(session.durations[trial_category])
+
+        self.calculate_trial_type_percentages(session)
+        self.calculate_value_label_percentages(session)
+
+        # E
+        check_results = arrays.check_tap_responses(self.tap_response_conditions)
+        for index in arrays.failed_indices(check_results):
+            self.log_tap_response_check(session, False, session_events[index])
+
+        # 4 - General Checks
+        assert arrays.points_are_correct(self.points)
+        # The running totals are correct, so the session's total is the last one
+        if session_events:
+            session.points_running_total = session_events[-1]['pointsRunningTotal']
+
+        # 5 - Dependent Variables (DVs) / Additional Computations
+        # Added to the defaultdicts, as record_dependent_variables does, so a block without
+        # a correct response of a type still counts it as 0
+        is_correct = arrays.is_category('tapResponseType', 'CORRECT_GO') | arrays.is_category('tapResponseType', 'CORRECT_STOP')
+        for block_id, tap_response_type, count in arrays.count_by_block(
+                arrays.codes['tapResponseType'], arrays.categories['tapResponseType'], is_correct):
+            session.dv_correct_counts[block_id][tap_response_type] += count
+        for tap_response_type, item_type, tap_response_starts in arrays.group_tap_response_starts('tapResponseType', 'itemType'):
+            session.dv_correct_responses[tap_response_type][item_type] = tap_response_starts
+        session.dv_correct_go_responses = arrays.tap_response_starts_where(arrays.is_category('tapResponseType', 'CORRECT_GO'))
+        session.dv_correct_stop_responses = arrays.tap_response_starts_where(arrays.is_category('tapResponseType', 'CORRECT_STOP'))
+        is_incorrect_stop = arrays.is_category('trialType', 'STOP') & (arrays.codes['tapResponseType'] >= 0) & \
+            ~arrays.is_category('tapResponseType', 'CORRECT_STOP')
+        is_healthy = arrays.is_category('itemType', 'HEALTHY')
+        is_non_healthy = arrays.is_category('itemType', 'NON_HEALTHY')
+        session.dv_incorrect_healthy_selected_responses = arrays.tap_response_starts_where(is_incorrect_stop, is_healthy, ~arrays.selected_random)
+        session.dv_incorrect_healthy_not_selected_responses = arrays.tap_response_starts_where(is_incorrect_stop, is_healthy, arrays.selected_random)
+        session.dv_incorrect_unhealthy_selected_responses = arrays.tap_response_starts_where(is_incorrect_stop, is_non_healthy, ~arrays.selected_random)
+        session.dv_incorrect_unhealthy_not_selected_responses = arrays.tap_response_starts_where(is_incorrect_stop, is_non_healthy, arrays.selected_random)
+        self.calculate_dependent_variable_percentages(session)
+
+        # 6 - Stop Signal Reaction Time
+        session.ssrt_totals = arrays.ssrt_totals()
+        if self.per_block_ssrt:
+            for block_id, trials in arrays.blocks():
+                session.block_ssrt_totals[block_id] = arrays.ssrt_totals(trials)
+        self.calculate_ssrt(session, nth_smallest=arrays.nth_smallest)
 
-        def calculate_trial_durations():
+    # 1 - Durations
+    def record_trial_durations(self, session, session_event, previous_session_event):
 
-            def not_none(a, b):
-                return a is not None and b is not None
+        def record_duration(key, value):
+            session.durations[key].append(value)
+
+        def not_none(a, b):
+            return a is not None and b is not None
+
+        trial_start = session_event['trialStart']
+        trial_end = session_event['trialEnd']
+        trial_duration = trial_end - trial_start
+        record_duration('trial', trial_duration)
+
+        stop_signal_onset = session_event['stopSignalOnset']
+        stop_signal_offset = session_event['stopSignalOffset']
+        if not_none(stop_signal_onset, stop_signal_offset):
+            stop_signal_duration = stop_signal_offset - stop_signal_onset
+            record_duration('stop_signal', stop_signal_duration)
+
+        stimulus_onset = session_event['stimulusOnset']
+        stimulus_offset = session_event['stimulusOffset']
+        if not_none(stimulus_onset, stimulus_offset):
+            stimulus_duration = stimulus_offset - stimulus_onset
+            record_duration('stimulus', stimulus_duration)
+
+        # Difference between signal onset and stop signal delay
+        stop_signal_delay = session_event['stopSignalDelay']
+        if not_none(stop_signal_onset, stop_signal_delay):
+            signal_stop_difference = stop_signal_onset - stop_signal_delay
+            record_duration('signal_stop_difference', signal_stop_difference)
+
+        # Duration between signal offset and stimulus offset
+        if not_none(stimulus_offset, stop_signal_offset):
+            stimulus_stop_difference = stimulus_offset - stop_signal_offset
+            record_duration('stimulus_stop_difference', stimulus_stop_difference)
+
+        if previous_session_event:
+            previous_trial_start = previous_session_event['trialStart']
+            inter_trial_duration = trial_start - previous_trial_start
+            record_duration('inter_trial', inter_trial_duration)
+
+    def calculate_trial_duration_stats(self, session):
+
+        def calculate_stats(durations_key):
+            durations = self.remove_none_values(session.durations[durations_key])
+            return {
+                'min': min(durations),
+                'max': max(durations),
+                'mean': statistics.mean(durations),
+                'stdev': statistics.stdev(durations),
+            }
 
-            session_events = self.get_session_events(row)
-            if session_events:
-                previous_session_event = None
-                for session_event in session_events:
-                    trial_start = session_event['trialStart']
-                    trial_end = session_event['trialEnd']
-                    trial_duration = trial_end - trial_start
-                    record_duration('trial', trial_duration)
-
-                    stop_signal_onset = session_event['stopSignalOnset']
-                    stop_signal_offset = session_event['stopSignalOffset']
-                    if not_none(stop_signal_onset, stop_signal_offset):
-                        stop_signal_duration = stop_signal_offset - stop_signal_onset
-                        record_duration('stop_signal', stop_signal_duration)
-
-                    stimulus_onset = session_event['stimulusOnset']
-                    stimulus_offset = session_event['stimulusOffset']
-                    if not_none(stimulus_onset, stimulus_offset):
-                        stimulus_duration = stimulus_offset - stimulus_onset
-                        record_duration('stimulus', stimulus_duration)
-
-                    # Difference between signal onset and stop signal delay
-                    stop_signal_delay = session_event['stopSignalDelay']
-                    if not_none(stop_signal_onset, stop_signal_delay):
-                        signal_stop_difference = stop_signal_onset - stop_signal_delay
-                        record_duration('signal_stop_difference', signal_stop_difference)
-
-                    # Duration between signal offset and stimulus offset
-                    if not_none(stimulus_offset, stop_signal_offset):
-                        stimulus_stop_difference = stimulus_offset - stop_signal_offset
-                        record_duration('stimulus_stop_difference', stimulus_stop_difference)
-
-                    if previous_session_event:
-                        previous_trial_start = previous_session_event['trialStart']
-                        inter_trial_duration = trial_start - previous_trial_start
-                        record_duration('inter_trial', inter_trial_duration)
-
-                    previous_session_event = session_event
-
-        def calculate_trial_duration_stats():
-
-            def calculate_stats(durations_key):
-                durations = self.remove_none_values(self.durations[durations_key])
-                return {
-                    'min': min(durations),
-                    'max': max(durations),
-                    'mean': statistics.mean(durations),
-                    'stdev': statistics.stdev(durations),
-                }
-
-            trial_categories = [
-                'trial',
-                'stop_signal',
-                'stimulus',
-                'signal_stop_difference',
-                'stimulus_stop_difference',
-                'inter_trial'
-            ]
-
-            self.trial_stats = {}
-            for trial_category in trial_categories:
-                self.trial_stats[trial_category] = calculate_stats(trial_category)
-
-        calculate_session_duration()
-        calculate_trial_durations()
-        calculate_trial_duration_stats()
+        session.trial_stats = {}
+        for trial_category in self.trial_categories:
+            session.trial_stats[trial_category] = calculate_stats(trial_category)
 
     # 2 - Trial Number Checks
-    def count_trial_and_types(self, row):
-        self.trial_count = 0
-        self.raw_round_trial_counts = defaultdict(set)
-        self.block_trial_type_counts = defaultdict(lambda: defaultdict(int))  # dict of int dict
-        self.block_item_type_counts = defaultdict(lambda: defaultdict(int))   # dict of int dict
-
-        session_events = self.get_session_events(row)
-        for session_event in session_events:
-            self.trial_count += 1
-
-            # Create a set of the trial IDs so we can count the elements
-            block_id = session_event['roundID']
-            trial_id = session_event['trialID']
-            self.raw_round_trial_counts[block_id].add(trial_id)
-
-            # Record the block-level trial type counts (GO/STOP)
-            trial_type = session_event['trialType']
-            self.block_trial_type_counts[block_id][trial_type] += 1
-
-            # Record the block-level item type counts (HEALTHY/NON-HEALTHY)
-            item_type = session_event['itemType']
-            selected = session_event['selected']
-            if item_type == 'HEALTHY':
-                self.block_item_type_counts[block_id]['HEALTHY'] += 1
-                if selected == 'random':
-                    self.block_item_type_counts[block_id]['HEALTHY_RANDOM'] += 1
-                else:
-                    self.block_item_type_counts[block_id]['HEALTHY_NOT_RANDOM'] += 1
-            if item_type == 'NON_HEALTHY':
-                self.block_item_type_counts[block_id]['NON_HEALTHY'] += 1
+    def count_trial(self, session, session_event):
+        session.trial_count += 1
+
+        # Create a set of the trial IDs so we can count the elements
+        block_id = session_event['roundID']
+        trial_id = session_event['trialID']
+        session.raw_round_trial_counts[block_id].add(trial_id)
+
+        # Record the block-level trial type counts (GO/STOP)
+        trial_type = session_event['trialType']
+        session.block_trial_type_counts[block_id][trial_type] += 1
+
+        # Record the block-level item type counts (HEALTHY/NON-HEALTHY)
+        item_type = session_event['itemType']
+        selected = session_event['selected']
+        if item_type == 'HEALTHY':
+            session.block_item_type_counts[block_id]['HEALTHY'] += 1
+            if selected == 'random':
+                session.block_item_type_counts[block_id]['HEALTHY_RANDOM'] += 1
+            else:
+                session.block_item_type_counts[block_id]['HEALTHY_NOT_RANDOM'] += 1
+        if item_type == 'NON_HEALTHY':
+            session.block_item_type_counts[block_id]['NON_HEALTHY'] += 1
 
+    def calculate_trial_type_percentages(self, session):
         # Calculate the block-level trial type percentages
-        self.block_trial_type_percentages = defaultdict(lambda: defaultdict(float))  # dict of float dict
-        for block_id_key, items in self.block_trial_type_counts.items():
+        session.block_trial_type_percentages = defaultdict(lambda: defaultdict(float))  # dict of float dict
+        for block_id_key, items in session.block_trial_type_counts.items():
             block_total = 0
             for item_key, item_count in items.items():
                 block_total += item_count
             for item_key, item_count in items.items():
-                self.block_trial_type_percentages[block_id_key][item_key] = self.block_trial_type_counts[block_id_key][item_key] / block_total
+                session.block_trial_type_percentages[block_id_key][item_key] = session.block_trial_type_counts[block_id_key][item_key] / block_total
 
         # Calculate the block-level item type percentages
-        self.block_item_type_percentages = defaultdict(lambda: defaultdict(float))  # dict of float dict
-        for block_id_key, items in self.block_item_type_counts.items():
+        session.block_item_type_percentages = defaultdict(lambda: defaultdict(float))  # dict of float dict
+        for block_id_key, items in session.block_item_type_counts.items():
             block_total = 0
             for item_key, item_count in items.items():
                 block_total += item_count
             for item_key, item_count in items.items():
-                self.block_item_type_percentages[block_id_key][item_key] = self.block_item_type_counts[block_id_key][item_key] / block_total
+                session.block_item_type_percentages[block_id_key][item_key] = session.block_item_type_counts[block_id_key][item_key] / block_total
 
         # Calculate the session-level trial type counts from the block-level counts
-        self.session_trial_type_counts = defaultdict(int)
-        for block_id_key, items in self.block_trial_type_counts.items():
+        session.session_trial_type_counts = defaultdict(int)
+        for block_id_key, items in session.block_trial_type_counts.items():
             for item_key, item_count in items.items():
-                self.session_trial_type_counts[item_key] += item_count
+                session.session_trial_type_counts[item_key] += item_count
 
         # Calculate the session-level trial type percentages
-        self.session_trial_type_percentages = defaultdict(float)
-        for trial_type, trial_type_count in self.session_trial_type_counts.items():
-            self.session_trial_type_percentages[trial_type] = trial_type_count / self.trial_count
+        session.session_trial_type_percentages = defaultdict(float)
+        for trial_type, trial_type_count in session.session_trial_type_counts.items():
+            session.session_trial_type_percentages[trial_type] = trial_type_count / session.trial_count
 
         # Calculate the session-level item type counts from the block-level counts
-        self.session_item_type_counts = defaultdict(int)
-        for block_id_key, items in self.block_item_type_counts.items():
+        session.session_item_type_counts = defaultdict(int)
+        for block_id_key, items in session.block_item_type_counts.items():
             for item_key, item_count in items.items():
-                self.session_item_type_counts[item_key] += item_count
+                session.session_item_type_counts[item_key] += item_count
 
         # Calculate the session-level item type percentages
-        self.session_item_type_percentages = defaultdict(float)
-        for item_type, item_type_count in self.session_item_type_counts.items():
-            self.session_item_type_percentages[item_type] = item_type_count / self.trial_count
+        session.session_item_type_percentages = defaultdict(float)
+        for item_type, item_type_count in session.session_item_type_counts.items():
+            session.session_item_type_percentages[item_type] = item_type_count / session.trial_count
 
     # 3 - Value Label Checks
-    def check_value_labels(self, row):
-        session_events = self.get_session_events(row)
+    def record_value_labels(self, session, session_event):
+        item_id = session_event['itemID']
 
         # Record healthy/non-healthy label allocation counts
-        self.label_allocation_counts = defaultdict(lambda: defaultdict(int))  # dict of int dict
-        self.label_allocation_counts['HEALTHY']['1_'] = 0
-        self.label_allocation_counts['HEALTHY']['2_'] = 0
-        self.label_allocation_counts['NON_HEALTHY']['1_'] = 0
-        self.label_allocation_counts['NON_HEALTHY']['2_'] = 0
-        for session_event in session_events:
-            item_id = session_event['itemID']
-            item_type = session_event['itemType']
-            for prefix in ['1_', '2_']:
-                if item_id.startswith(prefix):
-                    self.label_allocation_counts[item_type][prefix] += 1
-
-        # Record healthy/non-healthy label allocation percentages
-        self.label_allocation_item_id_percentages = defaultdict(lambda: defaultdict(float))  # dict of int dict
-        healthy_sum = self.label_allocation_counts['HEALTHY']['1_'] + self.label_allocation_counts['HEALTHY']['2_']
-        pprint(self.label_allocation_counts)
-        non_healthy_sum = self.label_allocation_counts['NON_HEALTHY']['1_'] + self.label_allocation_counts['NON_HEALTHY']['2_']
-        self.label_allocation_item_id_percentages['HEALTHY']['1_'] = self.label_allocation_counts['HEALTHY']['1_'] / self.denominator(healthy_sum)
-        self.label_allocation_item_id_percentages['HEALTHY']['2_'] = self.label_allocation_counts['HEALTHY']['2_'] / self.denominator(healthy_sum)
-        self.label_allocation_item_id_percentages['NON_HEALTHY']['1_'] = self.label_allocation_counts['NON_HEALTHY']['1_'] / self.denominator(non_healthy_sum)
-        self.label_allocation_item_id_percentages['NON_HEALTHY']['2_'] = self.label_allocation_counts['NON_HEALTHY']['2_'] / self.denominator(non_healthy_sum)
-        total_sum = healthy_sum + non_healthy_sum
-        self.label_allocation_item_type_percentages = defaultdict(float)
-        self.label_allocation_item_type_percentages['HEALTHY'] = healthy_sum / self.denominator(total_sum)
-        self.label_allocation_item_type_percentages['NON_HEALTHY'] = non_healthy_sum / self.denominator(total_sum)
+        item_type = session_event['itemType']
+        for prefix in ['1_', '2_']:
+            if item_id.startswith(prefix):
+                session.label_allocation_counts[item_type][prefix] += 1
 
         # Record the item IDs for each value of selected (MB/random/user/upload/non-food)
-        self.selected_item_ids = defaultdict(set)  # dict of set
-        for session_event in session_events:
-            selected = session_event['selected']
-            item_id = session_event['itemID']
-            self.selected_item_ids[selected].add(item_id)
+        selected = session_event['selected']
+        session.selected_item_ids[selected].add(item_id)
 
         # Record the block-level set of unique item IDs
-        self.block_item_ids = defaultdict(set)  # dict of set
-        for session_event in session_events:
-            block_id = session_event['roundID']
-            item_id = session_event['itemID']
-            self.block_item_ids[block_id].add(item_id)
+        block_id = session_event['roundID']
+        session.block_item_ids[block_id].add(item_id)
+
+    def calculate_value_label_percentages(self, session):
+        # Record healthy/non-healthy label allocation percentages
+        session.label_allocation_item_id_percentages = defaultdict(lambda: defaultdict(float))  # dict of int dict
+        healthy_sum = session.label_allocation_counts['HEALTHY']['1_'] + session.label_allocation_counts['HEALTHY']['2_']
+        pprint(session.label_allocation_counts)
+        non_healthy_sum = session.label_allocation_counts['NON_HEALTHY']['1_'] + session.label_allocation_counts['NON_HEALTHY']['2_']
+        session.label_allocation_item_id_percentages['HEALTHY']['1_'] = session.label_allocation_counts['HEALTHY']['1_'] / self.denominator(healthy_sum)
+        session.label_allocation_item_id_percentages['HEALTHY']['2_'] = session.label_allocation_counts['HEALTHY']['2_'] / self.denominator(healthy_sum)
+        session.label_allocation_item_id_percentages['NON_HEALTHY']['1_'] = session.label_allocation_counts['NON_HEALTHY']['1_'] / self.denominator(non_healthy_sum)
+        session.label_allocation_item_id_percentages['NON_HEALTHY']['2_'] = session.label_allocation_counts['NON_HEALTHY']['2_'] / self.denominator(non_healthy_sum)
+        total_sum = healthy_sum + non_healthy_sum
+        session.label_allocation_item_type_percentages = defaultdict(float)
+        session.label_allocation_item_type_percentages['HEALTHY'] = healthy_sum / self.denominator(total_sum)
+        session.label_allocation_item_type_percentages['NON_HEALTHY'] = non_healthy_sum / self.denominator(total_sum)
 
         # Record the session-level set of unique item IDs
-        self.session_item_ids = set()
-        for _, item_ids in self.block_item_ids.items():
-            self.session_item_ids.update(item_ids)
+        session.session_item_ids = set()
+        for _, item_ids in session.block_item_ids.items():
+            session.session_item_ids.update(item_ids)
 
     # E
-    def check_tap_responses(self, row):
+    # The condition each tap response type must meet: no response, or a response
+    # within or outside the stimulus boundary
+    tap_response_conditions = {
+        'GO': {
+            'CORRECT_GO': 'within',
+            'INCORRECT_GO': 'no_response',
+            'MISS_GO': 'outside',
+        },
+        'STOP': {
+            'CORRECT_STOP': 'no_response',
+            'INCORRECT_STOP': 'within',
+            'MISS_STOP': 'outside',
+        }
+    }
+
+    def create_tap_response_checks(self):
         # trs = tap response start
-        checks = {
-            'GO': {
-                'CORRECT_GO': lambda trs, session_event: trs > 0 and self.within_stimulus_boundary(session_event),
-                'INCORRECT_GO': lambda trs, session_event: trs == 0,
-                'MISS_GO': lambda trs, session_event: trs > 0 and self.outside_stimulus_boundary(session_event),
-            },
-            'STOP': {
-                'CORRECT_STOP': lambda trs, session_event: trs == 0,
-                'INCORRECT_STOP': lambda trs, session_event: trs > 0 and self.within_stimulus_boundary(session_event),
-                'MISS_STOP': lambda trs, session_event: trs > 0 and self.outside_stimulus_boundary(session_event),
+        conditions = {
+            'within': lambda trs, session_event: trs > 0 and self.within_stimulus_boundary(session_event),
+            'no_response': lambda trs, session_event: trs == 0,
+            'outside': lambda trs, session_event: trs > 0 and self.outside_stimulus_boundary(session_event),
+        }
+        return {
+            trial_type: {
+                tap_response_type: conditions[condition]
+                for tap_response_type, condition in tap_response_conditions.items()
             }
+            for trial_type, tap_response_conditions in self.tap_response_conditions.items()
         }
-        session_events = self.get_session_events(row)
-        for session_event in session_events:
-            trial_type = session_event['trialType']
-            tap_response_type = session_event['tapResponseType']
-            tap_response_start = self.numericify(session_event['tapResponseStart'])
-            check_result = checks[trial_type][tap_response_type](tap_response_start, session_event)
-            if not check_result:
-                prefix = 'tapResponsePosition'
-                tx = float(session_event['{}X'.format(prefix)])
-                ty = float(session_event['{}Y'.format(prefix)])
-                ix = float(session_event['itemPositionX'])
-                iy = float(session_event['itemPositionY'])
-                print('\nCheck Failed:')
-                print('      Game Session ID:', session_event['gameSessionID'])
-                print('             Round ID:', session_event['roundID'])
-                print('             Trial ID:', session_event['trialID'])
-                print('           Trial Type:', trial_type)
-                print('    Tap Response Type:', tap_response_type)
-                print('   Tap Response Start:', tap_response_start, session_event['tapResponseStart'])
-                print('Tap Response Position: ({},{})'.format(tx, ty))
-                print('        Item Position: ({},{})'.format(ix, iy))
-                print(tx, ty, ix, iy)
-                # input('Press return to continue...')
-            # assert check_result
-            self.session_event_log.log_if_check_failed(check_result, session_event, extra_message='tapResponseType={}'.format(tap_response_type))
+
+    def check_tap_response(self, session, session_event):
+        trial_type = session_event['trialType']
+        tap_response_type = session_event['tapResponseType']
+        tap_response_start = self.numericify(session_event['tapResponseStart'])
+        check_result = self.tap_response_checks[trial_type][tap_response_type](tap_response_start, session_event)
+        self.log_tap_response_check(session, check_result, session_event)
+
+    def log_tap_response_check(self, session, check_result, session_event):
+        tap_response_type = session_event['tapResponseType']
+        if not check_result:
+            prefix = 'tapResponsePosition'
+            tx = float(session_event['{}X'.format(prefix)])
+            ty = float(session_event['{}Y'.format(prefix)])
+            ix = float(session_event['itemPositionX'])
+            iy = float(session_event['itemPositionY'])
+            print('\nCheck Failed:')
+            print('      Game Session ID:', session_event['gameSessionID'])
+            print('             Round ID:', session_event['roundID'])
+            print('             Trial ID:', session_event['trialID'])
+            print('           Trial Type:', session_event['trialType'])
+            print('    Tap Response Type:', tap_response_type)
+            print('   Tap Response Start:', self.numericify(session_event['tapResponseStart']), session_event['tapResponseStart'])
+            print('Tap Response Position: ({},{})'.format(tx, ty))
+            print('        Item Position: ({},{})'.format(ix, iy))
+            print(tx, ty, ix, iy)
+            # input('Press return to continue...')
+        # assert check_result
+        session.session_event_log.log_if_check_failed(check_result, session_event, extra_message='tapResponseType={}'.format(tap_response_type))
 
     @staticmethod
     def within_stimulus_boundary(session_event, item_radius=95, prefix='tapResponsePosition'):
@@ -352,200 +483,193 @@ class AbstractStopDataExtractor(GameDataExtractor):
         return not self.within_stimulus_boundary(session_event, prefix=prefix)
 
     # 4 - General Checks
-    def check_points(self, row):
-        points = {
-            'GO': {
-                'CORRECT_GO': 20,
-                'INCORRECT_GO': -50,
-                'MISS_GO': -20,
-            },
-            'STOP': {
-                'CORRECT_STOP': 50,
-                'INCORRECT_STOP': -50,
-                'MISS_STOP': -50,
-            }
-        }
-        running_total = 0
-        session_events = self.get_session_events(row)
-        for session_event in session_events:
-            trial_type = session_event['trialType']
-            tap_response_type = session_event['tapResponseType']
-            points_this_trial = session_event['pointsThisTrial']
-            assert points_this_trial == points[trial_type][tap_response_type]
-            running_total += points_this_trial
-            points_running_total = session_event['pointsRunningTotal']
-            assert points_running_total == running_total
+    def check_trial_points(self, session, session_event):
+        trial_type = session_event['trialType']
+        tap_response_type = session_event['tapResponseType']
+        points_this_trial = session_event['pointsThisTrial']
+        assert points_this_trial == self.points[trial_type][tap_response_type]
+        session.points_running_total += points_this_trial
+        points_running_total = session_event['pointsRunningTotal']
+        assert points_running_total == session.points_running_total
 
     # 5 - Dependent Variables (DVs) / Additional Computations
-    def calculate_dependent_variables(self, row):
-        self.dv_correct_counts = defaultdict(lambda: defaultdict(int))
-        session_events = self.get_keypath_value(row, 'data.0.sessionEvents')
-        trial_count = len(session_events)
-        for session_event in session_events:
-            # GO/STOP
-            if 'tapResponseType' in session_event:
-                tap_response_type = session_event['tapResponseType']
-                if tap_response_type == 'CORRECT_GO' or tap_response_type == 'CORRECT_STOP':
-                    block_id = session_event['roundID']
-                    self.dv_correct_counts[block_id][tap_response_type] += 1
+    def record_dependent_variables(self, session, session_event):
+        # GO/STOP
+        if 'tapResponseType' in session_event:
+            tap_response_type = session_event['tapResponseType']
+            if tap_response_type == 'CORRECT_GO' or tap_response_type == 'CORRECT_STOP':
+                block_id = session_event['roundID']
+                session.dv_correct_counts[block_id][tap_response_type] += 1
+
+            tap_response_start = self.numericify(session_event['tapResponseStart'])
+            item_type = session_event['itemType']
+            session.dv_correct_responses[tap_response_type][item_type].append(tap_response_start)
+            if tap_response_type == 'CORRECT_GO':
+                session.dv_correct_go_responses.append(tap_response_start)
+            if tap_response_type == 'CORRECT_STOP':
+                session.dv_correct_stop_responses.append(tap_response_start)
 
+            trial_type = session_event['trialType']
+            selected = session_event['selected']
+            if trial_type == 'STOP' and tap_response_type != 'CORRECT_STOP':
+                if item_type == 'HEALTHY':
+                    if selected != 'random':
+                        session.dv_incorrect_healthy_selected_responses.append(tap_response_start)
+                    if selected == 'random':
+                        session.dv_incorrect_healthy_not_selected_responses.append(tap_response_start)
+                if item_type == 'NON_HEALTHY':
+                    if selected != 'random':
+                        session.dv_incorrect_unhealthy_selected_responses.append(tap_response_start)
+                    if selected == 'random':
+                        session.dv_incorrect_unhealthy_not_selected_responses.append(tap_response_start)
+
+    def calculate_dependent_variable_percentages(self, session):
         # Calculate the CORRECT_GO/STOP block-level percentages
-        self.dv_correct_block_percentages = defaultdict(lambda: defaultdict(int))
-        for block_id_key, tap_response_types in self.dv_correct_counts.items():
+        session.dv_correct_block_percentages = defaultdict(lambda: defaultdict(int))
+        for block_id_key, tap_response_types in session.dv_correct_counts.items():
             block_total = 0
             for tap_response_type, count in tap_response_types.items():
                 block_total += count
             for tap_response_type, count in tap_response_types.items():
-                self.dv_correct_block_percentages[block_id_key][tap_response_type] = count / block_total
+                session.dv_correct_block_percentages[block_id_key][tap_response_type] = count / block_total
 
         # Calculate the CORRECT_GO/STOP session-level percentages
         dv_correct_session_counts = defaultdict(int)
-        self.dv_correct_session_percentages = defaultdict(float)
-        for block_id_key, tap_response_types in self.dv_correct_counts.items():
+        session.dv_correct_session_percentages = defaultdict(float)
+        for block_id_key, tap_response_types in session.dv_correct_counts.items():
             for tap_response_type_key, item_count in tap_response_types.items():
                 dv_correct_session_counts[tap_response_type_key] += item_count
         correct_total = 0
         for tap_response_type_key, count in dv_correct_session_counts.items():
             correct_total += count
         for tap_response_type_key, count in dv_correct_session_counts.items():
-            self.dv_correct_session_percentages[tap_response_type_key] = count / correct_total
-
-        self.dv_correct_go_responses = list()
-        self.dv_correct_stop_responses = list()
-        self.dv_correct_responses = defaultdict(lambda: defaultdict(list))
-        self.dv_incorrect_healthy_selected_responses = list()
-        self.dv_incorrect_healthy_not_selected_responses = list()
-        self.dv_incorrect_unhealthy_selected_responses = list()
-        self.dv_incorrect_unhealthy_not_selected_responses = list()
-        for session_event in session_events:
-            # GO/STOP
-            if 'tapResponseType' in session_event:
-                tap_response_type = session_event['tapResponseType']
-                tap_response_start = self.numericify(session_event['tapResponseStart'])
-                item_type = session_event['itemType']
-                self.dv_correct_responses[tap_response_type][item_type].append(tap_response_start)
-                if tap_response_type == 'CORRECT_GO':
-                    self.dv_correct_go_responses.append(tap_response_start)
-                if tap_response_type == 'CORRECT_STOP':
-                    self.dv_correct_stop_responses.append(tap_response_start)
-
-                trial_type = session_event['trialType']
-                selected = session_event['selected']
-                if trial_type == 'STOP' and tap_response_type != 'CORRECT_STOP':
-                    if item_type == 'HEALTHY':
-                        if selected != 'random':
-                            self.dv_incorrect_healthy_selected_responses.append(tap_response_start)
-                        if selected == 'random':
-                            self.dv_incorrect_healthy_not_selected_responses.append(tap_response_start)
-                    if item_type == 'NON_HEALTHY':
-                        if selected != 'random':
-                            self.dv_incorrect_unhealthy_selected_responses.append(tap_response_start)
-                        if selected == 'random':
-                            self.dv_incorrect_unhealthy_not_selected_responses.append(tap_response_start)
+            session.dv_correct_session_percentages[tap_response_type_key] = count / correct_total
 
     # 6 - Stop Signal Reaction Time
-    def calculate_ssrt(self, row):
-        session_events = self.get_session_events(row)
+    def accumulate_ssrt(self, session, session_event):
+        self.add_ssrt_trial(session.ssrt_totals, session_event)
+        if self.per_block_ssrt:
+            self.add_ssrt_trial(session.block_ssrt_totals[session_event['roundID']], session_event)
+
+    def add_ssrt_trial(self, ssrt_totals, session_event):
+        trial_type = session_event['trialType']
+        tap_response_start = session_event['tapResponseStart']
+        ssrt_totals.trial_count += 1
 
         # A - Mean SSRT
-        tap_response_start_total = 0
-        stop_signal_delay_total = 0
-        stop_signal_onset_total = 0
-        for session_event in session_events:
-            trial_type = session_event['trialType']
-            tap_response_start = self.numericify(session_event['tapResponseStart'])
-            if trial_type == 'GO' and tap_response_start > 0:
-                tap_response_start_total += tap_response_start
-            stop_signal_delay = self.numericify(session_event['stopSignalDelay'])
-            stop_signal_delay_total += stop_signal_delay
-            stop_signal_onset = self.numericify(session_event['stopSignalOnset'])
-            stop_signal_onset_total += stop_signal_onset
-        mean_tap_response_start = tap_response_start_total / len(session_events)
-        mean_stop_signal_delay = stop_signal_delay_total / len(session_events)
-        mean_stop_signal_onset = stop_signal_onset_total / len(session_events)
-        self.mean_ideal_ssrt = mean_tap_response_start - mean_stop_signal_delay  # What the SSRT should be
-        self.mean_actual_ssrt = mean_tap_response_start - mean_stop_signal_onset  # What the SSRT actually is
-        print('\n IDEAL MEAN SSRT:', self.mean_ideal_ssrt)
-        print('ACTUAL MEAN SSRT:', self.mean_actual_ssrt)
+        if trial_type == 'GO' and self.numericify(tap_response_start) > 0:
+            ssrt_totals.tap_response_start_total += tap_response_start
+        ssrt_totals.stop_signal_delay_total += self.numericify(session_event['stopSignalDelay'])
+        ssrt_totals.stop_signal_onset_total += self.numericify(session_event['stopSignalOnset'])
 
         # B - Integration SSRT
-        go_trial_count = 0
-        stop_trial_count = 0
-        stop_trail_with_response_count = 0
-        incorrect_stop_trials_count = 0
-        go_trial_tap_response_starts = []
-        for session_event in session_events:
-            trial_type = session_event['trialType']
-            tap_response_start = session_event['tapResponseStart']
-            if trial_type == 'GO':
-                go_trial_count += 1
-                go_trial_tap_response_starts.append(tap_response_start)
-            elif trial_type == 'STOP':
-                stop_trial_count += 1
-                if tap_response_start:
-                    stop_trail_with_response_count += 1
-            tap_response_type = session_event['tapResponseType']
-            if tap_response_type in ['INCORRECT_STOP', 'MISS_STOP']:
-                incorrect_stop_trials_count += 1
-        go_trial_tap_response_starts = self.remove_none_values(go_trial_tap_response_starts)
-        go_trial_tap_response_starts.sort()
-        stop_signal_trial_probability = stop_trail_with_response_count / stop_trial_count
-        n = go_trial_count * stop_signal_trial_probability
-        print('GO TRIALS TRSs:', go_trial_tap_response_starts)
-        print('GO TRIALS TRSs count:', len(go_trial_tap_response_starts))
-        print('INCORRECT STOP TRIALS:', incorrect_stop_trials_count)
-        print('p(stop signal trial):', stop_signal_trial_probability)
-        print('n:', n)
+        if trial_type == 'GO':
+            ssrt_totals.go_trial_count += 1
+            if tap_response_start is not None:
+                ssrt_totals.go_trial_tap_response_starts.append(tap_response_start)
+        elif trial_type == 'STOP':
+            ssrt_totals.stop_trial_count += 1
+            if tap_response_start:
+                ssrt_totals.stop_trial_with_response_count += 1
+        tap_response_type = session_event['tapResponseType']
+        if tap_response_type in ['INCORRECT_STOP', 'MISS_STOP']:
+            ssrt_totals.incorrect_stop_trials_count += 1
+
+    @staticmethod
+    def nth_smallest(values, n):
+        """Return the nth smallest (0-based) of the values without sorting all of them"""
+        if not 0 <= n < len(values):
+            raise IndexError('nth_smallest index out of range')
+        return heapq.nsmallest(n + 1, values)[-1]
+
+    def calculate_ssrt(self, session, nth_smallest=None):
+        ssrt = self.ssrt_from_totals(session.ssrt_totals, nth_smallest, is_session=True)
+        session.mean_ideal_ssrt = ssrt['mean_ideal_ssrt']
+        session.mean_actual_ssrt = ssrt['mean_actual_ssrt']
+        session.ideal_integration_ssrt = ssrt['ideal_integration_ssrt']
+        session.actual_integration_ssrt = ssrt['actual_integration_ssrt']
+        for block_id, ssrt_totals in session.block_ssrt_totals.items():
+            session.block_ssrt[block_id] = self.ssrt_from_totals(ssrt_totals, nth_smallest)
+
+    def ssrt_from_totals(self, ssrt_totals, nth_smallest=None, is_session=False):
+        """
+        Return the mean and integration SSRT of a session or block. The SSRT of a session is
+        printed and its integration SSRT must be defined; the integration SSRT of a block is
+        None if the block has no STOP trials or too few GO trial responses.
+        """
+        if nth_smallest is None:
+            nth_smallest = self.nth_smallest
+
+        # A - Mean SSRT
+        trial_count = ssrt_totals.trial_count
+        mean_tap_response_start = ssrt_totals.tap_response_start_total / trial_count
+        mean_stop_signal_delay = ssrt_totals.stop_signal_delay_total / trial_count
+        mean_stop_signal_onset = ssrt_totals.stop_signal_onset_total / trial_count
+        ssrt = {
+            'mean_ideal_ssrt': mean_tap_response_start - mean_stop_signal_delay,  # What the SSRT should be
+            'mean_actual_ssrt': mean_tap_response_start - mean_stop_signal_onset,  # What the SSRT actually is
+            'ideal_integration_ssrt': None,
+            'actual_integration_ssrt': None,
+        }
+        if is_session:
+            print('\n IDEAL MEAN SSRT:', ssrt['mean_ideal_ssrt'])
+            print('ACTUAL MEAN SSRT:', ssrt['mean_actual_ssrt'])
+
+        # B - Integration SSRT
+        go_trial_tap_response_starts = ssrt_totals.go_trial_tap_response_starts
+        if not is_session and not ssrt_totals.stop_trial_count:
+            return ssrt
+        stop_signal_trial_probability = ssrt_totals.stop_trial_with_response_count / ssrt_totals.stop_trial_count
+        n = ssrt_totals.go_trial_count * stop_signal_trial_probability
+        if is_session:
+            print('GO TRIALS TRSs:', go_trial_tap_response_starts)
+            print('GO TRIALS TRSs count:', len(go_trial_tap_response_starts))
+            print('INCORRECT STOP TRIALS:', ssrt_totals.incorrect_stop_trials_count)
+            print('p(stop signal trial):', stop_signal_trial_probability)
+            print('n:', n)
         n = int(n) - 1
-        assert n >= 0
-        nth = go_trial_tap_response_starts[int(n)]
-        print('nth:', nth)
-        self.ideal_integration_ssrt = nth - mean_stop_signal_delay
-        self.actual_integration_ssrt = nth - mean_stop_signal_onset
-        print('ideal_integration_ssrt:', self.ideal_integration_ssrt)
-        print('actual_integration_ssrt:', self.actual_integration_ssrt)
-        # assert False
+        if is_session:
+            assert n >= 0
+        elif not 0 <= n < len(go_trial_tap_response_starts):
+            return ssrt
+        nth = nth_smallest(go_trial_tap_response_starts, n)
+        ssrt['ideal_integration_ssrt'] = nth - mean_stop_signal_delay
+        ssrt['actual_integration_ssrt'] = nth - mean_stop_signal_onset
+        if is_session:
+            print('nth:', nth)
+            print('ideal_integration_ssrt:', ssrt['ideal_integration_ssrt'])
+            print('actual_integration_ssrt:', ssrt['actual_integration_ssrt'])
+        return ssrt
 
     # 7 - Raw Data
-    def count_raw_events(self, row):
+    def count_raw_events(self, session, row):
         raw_events = self.get_keypath_value(row, 'data.0.rawEvents')
         for raw_event in raw_events:
-            self.raw_count['on'][raw_event['eventOn']] += 1
-            self.raw_count['off'][raw_event['eventOff']] += 1
+            session.raw_count['on'][raw_event['eventOn']] += 1
+            session.raw_count['off'][raw_event['eventOff']] += 1
 
-    def calculate(self, row):
-        super(AbstractStopDataExtractor, self).calculate(row)
-        self.calculate_durations(row)
-        self.count_trial_and_types(row)
-        self.check_value_labels(row)
-        self.check_tap_responses(row)
-        self.check_points(row)
-        self.calculate_dependent_variables(row)
-        self.calculate_ssrt(row)
-        self.count_raw_events(row)
-        self.create_spreadsheet()
-
-    def create_spreadsheet(self):
-        spreadsheet = Spreadsheet()
+    def create_spreadsheet(self, session, spreadsheet=None):
+        if spreadsheet is None:
+            spreadsheet = Spreadsheet()
 
         # Trial Counts
         spreadsheet.select_sheet('Trial Count')
-        spreadsheet.set_values(['Trial Count', self.trial_count], advance_by_rows=2)
+        spreadsheet.set_values(['Trial Count', session.trial_count], advance_by_rows=2)
 
         # Raw Counts
         spreadsheet.set_value('Raw Counts', advance_by_rows=2)
         spreadsheet.set_values(['On'])
-        for key, value in self.raw_count['on'].items():
+        for key, value in session.raw_count['on'].items():
             spreadsheet.set_values([key, value])
         spreadsheet.advance_row()
         spreadsheet.set_values(['Off'])
-        for key, value in self.raw_count['off'].items():
+        for key, value in session.raw_count['off'].items():
             spreadsheet.set_values([key, value])
 
         # Trial Stats
         spreadsheet.select_sheet('Stats')
         spreadsheet.set_values(['Field', 'Min', 'Max', 'Mean', 'St Dev'])
-        for field, stats in self.trial_stats.items():
+        for field, stats in session.trial_stats.items():
             spreadsheet.set_values([field, stats['min'], stats['max'], stats['mean'], stats['stdev']])
 
         # Trial Types
@@ -556,8 +680,8 @@ class AbstractStopDataExtractor(GameDataExtractor):
         for trial_type in ['GO', 'STOP']:
             spreadsheet.set_values([
                 trial_type,
-                self.session_trial_type_counts[trial_type],
-                self.session_trial_type_percentages[trial_type]
+                session.session_trial_type_counts[trial_type],
+                session.session_trial_type_percentages[trial_type]
             ])
         # - Session
         spreadsheet.advance_row()
@@ -568,18 +692,18 @@ class AbstractStopDataExtractor(GameDataExtractor):
                 spreadsheet.set_values([
                     block_key,
                     trial_type,
-                    self.block_trial_type_counts[block_key][trial_type],
-                    self.block_trial_type_percentages[block_key][trial_type]
+                    session.block_trial_type_counts[block_key][trial_type],
+                    session.block_trial_type_percentages[block_key][trial_type]
                 ])
 
         print('\nSESSION TRIAL TYPE COUNTS:')
-        pprint(self.session_trial_type_counts)
+        pprint(session.session_trial_type_counts)
         print('\nSESSION TRIAL TYPE PERCENTAGES:')
-        pprint(self.session_trial_type_percentages)
+        pprint(session.session_trial_type_percentages)
         print('\nBLOCK TRIAL TYPE COUNTS:')
-        pprint(self.block_trial_type_counts)
+        pprint(session.block_trial_type_counts)
         print('\nBLOCK TRIAL TYPE PERCENTAGES:')
-        pprint(self.block_trial_type_percentages)
+        pprint(session.block_trial_type_percentages)
 
         # Trial Items
         spreadsheet.select_sheet('Item Types')
@@ -589,8 +713,8 @@ class AbstractStopDataExtractor(GameDataExtractor):
         for trial_type in ['HEALTHY', 'HEALTHY_RANDOM', 'HEALTHY_NOT_RANDOM', 'NON_HEALTHY']:
             spreadsheet.set_values([
                 trial_type,
-                self.session_item_type_counts[trial_type],
-                self.session_item_type_percentages[trial_type]
+                session.session_item_type_counts[trial_type],
+                session.session_item_type_percentages[trial_type]
             ])
         # - Session
         spreadsheet.set_values(['Block'])
@@ -600,17 +724,17 @@ class AbstractStopDataExtractor(GameDataExtractor):
                 spreadsheet.set_values([
                     block_key,
                     trial_type,
-                    self.block_item_type_counts[block_key][trial_type],
-                    self.block_item_type_percentages[block_key][trial_type]
+                    session.block_item_type_counts[block_key][trial_type],
+                    session.block_item_type_percentages[block_key][trial_type]
                 ])
         print('\nSESSION ITEM TYPE COUNTS:')
-        pprint(self.session_item_type_counts)
+        pprint(session.session_item_type_counts)
         print('\nSESSION ITEM TYPE PERCENTAGES:')
-        pprint(self.session_item_type_percentages)
+        pprint(session.session_item_type_percentages)
         print('\nBLOCK ITEM TYPE COUNTS:')
-        pprint(self.block_item_type_counts)
+        pprint(session.block_item_type_counts)
         print('\nBLOCK ITEM TYPE PERCENTAGES:')
-        pprint(self.block_item_type_percentages)
+        pprint(session.block_item_type_percentages)
 
         # Raw Rounds
         spreadsheet.select_sheet('Raw Rounds')
@@ -618,7 +742,7 @@ class AbstractStopDataExtractor(GameDataExtractor):
         for block_key in irange(1, 4):
             spreadsheet.set_values([
                 block_key,
-                len(self.raw_round_trial_counts[block_key])
+                len(session.raw_round_trial_counts[block_key])
             ])
 
         # Label Allocations
@@ -632,38 +756,38 @@ class AbstractStopDataExtractor(GameDataExtractor):
                 spreadsheet.set_values([
                     item_type,
                     prefix,
-                    self.label_allocation_counts[item_type][prefix],
-                    self.label_allocation_item_id_percentages[item_type][prefix]
+                    session.label_allocation_counts[item_type][prefix],
+                    session.label_allocation_item_id_percentages[item_type][prefix]
                 ])
         print('\nLABEL ALLOCATION COUNTS:')
-        pprint(self.label_allocation_counts)
+        pprint(session.label_allocation_counts)
 
         # - Percentages
         spreadsheet.advance_row()
         spreadsheet.set_values(['Item Type', 'Percentage'])
-        for item_type in self.label_allocation_item_type_percentages:
+        for item_type in session.label_allocation_item_type_percentages:
             spreadsheet.set_values([
                 item_type,
-                self.label_allocation_item_type_percentages[item_type]
+                session.label_allocation_item_type_percentages[item_type]
             ])
         print('\nLABEL ALLOCATION PERCENTAGES:')
-        pprint(self.label_allocation_item_id_percentages)
-        pprint(self.label_allocation_item_type_percentages)
+        pprint(session.label_allocation_item_id_percentages)
+        pprint(session.label_allocation_item_type_percentages)
 
         # Selected Item IDs
         spreadsheet.select_sheet('Selected Items')
-        for index, selected_label in enumerate(self.selected_item_ids):
+        for index, selected_label in enumerate(session.selected_item_ids):
             spreadsheet.set_values([selected_label])
-        for index, selected_label in enumerate(self.selected_item_ids):
-            for i, selected_item_id in enumerate(self.selected_item_ids[selected_label]):
+        for index, selected_label in enumerate(session.selected_item_ids):
+            for i, selected_item_id in enumerate(session.selected_item_ids[selected_label]):
                 spreadsheet.set_values([selected_item_id])
         print('\nSELCTED ITEM IDs:')
-        print(self.selected_item_ids)
+        print(session.selected_item_ids)
 
         # Unique Item IDs
         # - Session
         spreadsheet.select_sheet('Unique Items - Session')
-        for index, unique_item_id in enumerate(self.session_item_ids):
+        for index, unique_item_id in enumerate(session.session_item_ids):
             spreadsheet.set_values([unique_item_id])
         # - Blocks
         spreadsheet.select_sheet('Unique Items - Blocks')
@@ -671,14 +795,14 @@ class AbstractStopDataExtractor(GameDataExtractor):
             spreadsheet.set_value(block_key)
         spreadsheet.advance_row()
         for block_key in irange(1, 4):
-            for index, unique_item_id in enumerate(self.block_item_ids[block_key]):
+            for index, unique_item_id in enumerate(session.block_item_ids[block_key]):
                 spreadsheet.column = block_key
                 spreadsheet.set_value(unique_item_id, cell_offset=(block_key, index+1))
 
         print('\nSESSION ITEM IDs:')
-        print(self.session_item_ids)
+        print(session.session_item_ids)
         print('\nBLOCK ITEM IDs:')
-        pprint(self.block_item_ids)
+        pprint(session.block_item_ids)
 
         # Correct Counts
         spreadsheet.select_sheet('Correct Counts')
@@ -689,17 +813,17 @@ class AbstractStopDataExtractor(GameDataExtractor):
                 spreadsheet.set_values([
                     block_key,
                     trial_type,
-                    self.dv_correct_counts[block_key][trial_type]
+                    session.dv_correct_counts[block_key][trial_type]
                 ])
                 print([
                     block_key,
                     trial_type,
-                    self.dv_correct_counts[block_key][trial_type]
+                    session.dv_correct_counts[block_key][trial_type]
                 ])
-        pprint(self.dv_correct_counts)
+        pprint(session.dv_correct_counts)
 
         print('DV BLOCK LEVEL CORRECT PERCENTAGES:')
-        pprint(self.dv_correct_block_percentages)
+        pprint(session.dv_correct_block_percentages)
         spreadsheet.advance_row()
         spreadsheet.set_values(['Block'])
         spreadsheet.set_values(['Block', 'Trial Type', 'Count'])
@@ -708,51 +832,63 @@ class AbstractStopDataExtractor(GameDataExtractor):
                 spreadsheet.set_values([
                     block_key,
                     trial_type,
-                    self.dv_correct_block_percentages[block_key][trial_type]
+                    session.dv_correct_block_percentages[block_key][trial_type]
                 ])
 
         print('DV SESSION LEVEL CORRECT PERCENTAGES:')
-        pprint(self.dv_correct_session_percentages)
+        pprint(session.dv_correct_session_percentages)
         spreadsheet.advance_row()
         spreadsheet.set_values(['Session'])
-        spreadsheet.set_values(['CORRECT_GO', self.dv_correct_session_percentages['CORRECT_GO']])
-        spreadsheet.set_values(['CORRECT_STOP', self.dv_correct_session_percentages['CORRECT_STOP']])
+        spreadsheet.set_values(['CORRECT_GO', session.dv_correct_session_percentages['CORRECT_GO']])
+        spreadsheet.set_values(['CORRECT_STOP', session.dv_correct_session_percentages['CORRECT_STOP']])
 
         spreadsheet.select_sheet('Mean Response Times')
         spreadsheet.set_values(['Correct Go'])
-        spreadsheet.set_values(['Mean CORRECT_GO Responses', self.mean(self.dv_correct_go_responses)])
-        spreadsheet.set_values(['Mean CORRECT_GO HEALTHY Responses', self.mean(self.dv_correct_responses['CORRECT_GO']['HEALTHY'])])
-        spreadsheet.set_values(['Mean CORRECT_GO UNHEALTHY Responses', self.mean(self.dv_correct_responses['CORRECT_GO']['UNHEALTHY'])])
+        spreadsheet.set_values(['Mean CORRECT_GO Responses', self.mean(session.dv_correct_go_responses)])
+        spreadsheet.set_values(['Mean CORRECT_GO HEALTHY Responses', self.mean(session.dv_correct_responses['CORRECT_GO']['HEALTHY'])])
+        spreadsheet.set_values(['Mean CORRECT_GO UNHEALTHY Responses', self.mean(session.dv_correct_responses['CORRECT_GO']['UNHEALTHY'])])
         spreadsheet.set_values(['Correct Stop'])
-        spreadsheet.set_values(['Mean CORRECT_STOP Responses', self.mean(self.dv_correct_go_responses)])
-        spreadsheet.set_values(['Mean CORRECT_STOP HEALTHY Responses', self.mean(self.dv_correct_responses['CORRECT_STOP']['HEALTHY'])])
-        spreadsheet.set_values(['Mean CORRECT_STOP UNHEALTHY Responses', self.mean(self.dv_correct_responses['CORRECT_STOP']['UNHEALTHY'])])
-        # print('mean CORRECT_GO responses', self.mean(self.dv_correct_go_responses))
-        # print('mean CORRECT_GO HEALTHY responses', self.mean(self.dv_correct_responses['CORRECT_GO']['HEALTHY']))
-        # print('mean CORRECT_GO UNHEALTHY responses', self.mean(self.dv_correct_responses['CORRECT_GO']['NON_HEALTHY']))
-        # print('mean CORRECT_STOP responses', self.mean(self.dv_correct_stop_responses))
-        # print('mean CORRECT_STOP HEALTHY responses', self.mean(self.dv_correct_responses['CORRECT_STOP']['HEALTHY']))
-        # print('mean CORRECT_STOP UNHEALTHY responses', self.mean(self.dv_correct_responses['CORRECT_STOP']['NON_HEALTHY']))
+        spreadsheet.set_values(['Mean CORRECT_STOP Responses', self.mean(session.dv_correct_go_responses)])
+        spreadsheet.set_values(['Mean CORRECT_STOP HEALTHY Responses', self.mean(session.dv_correct_responses['CORRECT_STOP']['HEALTHY'])])
+        spreadsheet.set_values(['Mean CORRECT_STOP UNHEALTHY Responses', self.mean(session.dv_correct_responses['CORRECT_STOP']['UNHEALTHY'])])
+        # print('mean CORRECT_GO responses', self.mean(session.dv_correct_go_responses))
+        # print('mean CORRECT_GO HEALTHY responses', self.mean(session.dv_correct_responses['CORRECT_GO']['HEALTHY']))
+        # print('mean CORRECT_GO UNHEALTHY responses', self.mean(session.dv_correct_responses['CORRECT_GO']['NON_HEALTHY']))
+        # print('mean CORRECT_STOP responses', self.mean(session.dv_correct_stop_responses))
+        # print('mean CORRECT_STOP HEALTHY responses', self.mean(session.dv_correct_responses['CORRECT_STOP']['HEALTHY']))
+        # print('mean CORRECT_STOP UNHEALTHY responses', self.mean(session.dv_correct_responses['CORRECT_STOP']['NON_HEALTHY']))
         spreadsheet.set_values(['CORRECT_GO Responses'])
-        print('mean INCORRECT HEALTHY SELECTED responses', self.mean(self.dv_incorrect_healthy_selected_responses))
-        print('mean INCORRECT HEALTHY NOT SELECTED responses', self.mean(self.dv_incorrect_healthy_not_selected_responses))
-        print('mean INCORRECT UNHEALTHY SELECTED responses', self.mean(self.dv_incorrect_unhealthy_selected_responses))
-        print('mean INCORRECT UNHEALTHY NOT SELECTED responses', self.mean(self.dv_incorrect_unhealthy_not_selected_responses))
+        print('mean INCORRECT HEALTHY SELECTED responses', self.mean(session.dv_incorrect_healthy_selected_responses))
+        print('mean INCORRECT HEALTHY NOT SELECTED responses', self.mean(session.dv_incorrect_healthy_not_selected_responses))
+        print('mean INCORRECT UNHEALTHY SELECTED responses', self.mean(session.dv_incorrect_unhealthy_selected_responses))
+        print('mean INCORRECT UNHEALTHY NOT SELECTED responses', self.mean(session.dv_incorrect_unhealthy_not_selected_responses))
         # assert False
 
-        if hasattr(self, 'mean_ideal_ssrt'):
+        if session.mean_ideal_ssrt is not None:
             spreadsheet.select_sheet('SSRT')
-            spreadsheet.set_values(['Ideal Mean SSRT', self.mean_ideal_ssrt])
-            spreadsheet.set_values(['Actual Mean SSRT', self.mean_actual_ssrt])
-            spreadsheet.set_values(['Ideal Integration SSRT', self.ideal_integration_ssrt])
-            spreadsheet.set_values(['Actual Integration SSRT', self.actual_integration_ssrt])
+            spreadsheet.set_values(['Ideal Mean SSRT', session.mean_ideal_ssrt])
+            spreadsheet.set_values(['Actual Mean SSRT', session.mean_actual_ssrt])
+            spreadsheet.set_values(['Ideal Integration SSRT', session.ideal_integration_ssrt])
+            spreadsheet.set_values(['Actual Integration SSRT', session.actual_integration_ssrt])
+            if session.block_ssrt:
+                spreadsheet.advance_row()
+                spreadsheet.set_values(['Block', 'Ideal Mean SSRT', 'Actual Mean SSRT', 'Ideal Integration SSRT', 'Actual Integration SSRT'])
+                for block_key in sorted(session.block_ssrt):
+                    block_ssrt = session.block_ssrt[block_key]
+                    spreadsheet.set_values([
+                        block_key,
+                        block_ssrt['mean_ideal_ssrt'],
+                        block_ssrt['mean_actual_ssrt'],
+                        block_ssrt['ideal_integration_ssrt'],
+                        block_ssrt['actual_integration_ssrt']
+                    ])
         else:
             spreadsheet.select_sheet('DRT2')
-            spreadsheet.set_values(['Ideal DRT2', self.ideal_drt2])
-            spreadsheet.set_values(['Actual DRT2', self.actual_drt2])
+            spreadsheet.set_values(['Ideal DRT2', session.ideal_drt2])
+            spreadsheet.set_values(['Actual DRT2', session.actual_drt2])
 
-        self.spreadsheet = spreadsheet
-        self.session_event_log.print()
+        session.session_event_log.print()
+        return spreadsheet
 
 
 class StopDataExtractor(AbstractStopDataExtractor):
@@ -789,48 +925,48 @@ class DoubleDataExtractor(AbstractStopDataExtractor):
 
     type = 'DOUBLE'
 
-    def check_points(self, row):
+    # DOUBLE trials have initial and second tap responses, which SessionEventArrays does not hold
+    session_arrays_supported = False
+
+    def check_trial_points(self, session, session_event):
 
         def check_go(initial_tap_response_type, second_tap_response_type):
             if (initial_tap_response_type, second_tap_response_type) == ('CORRECT_GO', 'N/A'):
                 check_result = points_this_trial == 20
-                # self.session_event_log.log_if_check_failed(check_result, session_event)
+                # session.session_event_log.log_if_check_failed(check_result, session_event)
             elif (initial_tap_response_type, second_tap_response_type) == ('INCORRECT_GO', 'N/A'):
                 check_result = points_this_trial == -20
-                # self.session_event_log.log_if_check_failed(check_result, session_event)
+                # session.session_event_log.log_if_check_failed(check_result, session_event)
             else:
                 check_result = points_this_trial == -50
-            self.session_event_log.log_if_check_failed(check_result, session_event)
+            session.session_event_log.log_if_check_failed(check_result, session_event)
 
         def check_double(initial_tap_response_type, second_tap_response_type):
             if (initial_tap_response_type, second_tap_response_type) == ('CORRECT', 'CORRECT'):
                 check_result = points_this_trial == 50
-                # self.session_event_log.log_if_check_failed(check_result, session_event)
+                # session.session_event_log.log_if_check_failed(check_result, session_event)
             else:
                 check_result = points_this_trial == -50
-            self.session_event_log.log_if_check_failed(check_result, session_event)
+            session.session_event_log.log_if_check_failed(check_result, session_event)
 
         checks = {
             'GO': check_go,
             'DOUBLE': check_double,
         }
 
-        running_total = 0
-        session_events = self.get_session_events(row)
-        for session_event in session_events:
-            # Points Awarded
-            trial_type = session_event['trialType']
-            initial_tap_response_type = session_event['initialTapResponseType']
-            second_tap_response_type = session_event['secondTapResponseType']
-            points_this_trial = session_event['pointsThisTrial']
-            checks[trial_type](initial_tap_response_type, second_tap_response_type)
-            # Running Total
-            running_total += points_this_trial
-            points_running_total = session_event['pointsRunningTotal']
-            check_passed = points_running_total == running_total
-            self.session_event_log.log_if_check_failed(check_passed, session_event, extra_message='points_running_total != running_total')
-
-    def check_tap_responses(self, row):
+        # Points Awarded
+        trial_type = session_event['trialType']
+        initial_tap_response_type = session_event['initialTapResponseType']
+        second_tap_response_type = session_event['secondTapResponseType']
+        points_this_trial = session_event['pointsThisTrial']
+        checks[trial_type](initial_tap_response_type, second_tap_response_type)
+        # Running Total
+        session.points_running_total += points_this_trial
+        points_running_total = session_event['pointsRunningTotal']
+        check_passed = points_running_total == session.points_running_total
+        session.session_event_log.log_if_check_failed(check_passed, session_event, extra_message='points_running_total != running_total')
+
+    def create_tap_response_checks(self):
         # trs is tap response start
         initial_tap_response_checks = {
             'GO': {
@@ -858,6 +994,12 @@ class DoubleDataExtractor(AbstractStopDataExtractor):
                 'MISS': lambda trs, session_event: trs > 0 and self.outside_second_stimulus_boundary(session_event),
             }
         }
+        return {
+            'initial': initial_tap_response_checks,
+            'second': second_tap_response_checks,
+        }
+
+    def check_tap_response(self, session, session_event):
 
         def check_tap_response(tap_response_checks, session_event, prefix):
             tap_response_type = session_event['{}TapResponseType'.format(prefix)]
@@ -886,13 +1028,11 @@ class DoubleDataExtractor(AbstractStopDataExtractor):
                     print(tap_response_start, session_event['secondTapResponseStart'])
                 print(tx, ty, ix, iy)
                 # assert False
-            self.session_event_log.log_if_check_failed(check_result, session_event, extra_message='tapResponseType={}'.format(tap_response_type))
+            session.session_event_log.log_if_check_failed(check_result, session_event, extra_message='tapResponseType={}'.format(tap_response_type))
 
-        session_events = self.get_session_events(row)
-        for session_event in session_events:
-            trial_type = session_event['trialType']
-            check_tap_response(initial_tap_response_checks, session_event, 'initial')
-            check_tap_response(second_tap_response_checks, session_event, 'second')
+        trial_type = session_event['trialType']
+        check_tap_response(self.tap_response_checks['initial'], session_event, 'initial')
+        check_tap_response(self.tap_response_checks['second'], session_event, 'second')
 
     def within_first_stimulus_boundary(self, session_event):
         self.within_stimulus_boundary(session_event, prefix='initialTapResponsePosition')
@@ -906,10 +1046,12 @@ class DoubleDataExtractor(AbstractStopDataExtractor):
     def outside_second_stimulus_boundary(self, session_event):
         self.outside_stimulus_boundary(session_event, prefix='secondTapResponsePosition')
 
-    def calculate_ssrt(self, row):
-        session_events = self.get_session_events(row)
-        self.ideal_drt2 = 0
-        self.actual_drt2 = 0
+    def accumulate_ssrt(self, session, session_event):
+        pass
+
+    def calculate_ssrt(self, session, nth_smallest=None):
+        session.ideal_drt2 = 0
+        session.actual_drt2 = 0
 
     def calculate(self, row):
         super(DoubleDataExtractor, self).calculate(row)
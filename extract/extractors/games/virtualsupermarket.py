@@ -1,5 +1,3 @@
-from collections import defaultdict
-
 from .gamedataextractor import GameDataExtractor
 
 from keypath_extractor import Keypath
@@ -43,20 +41,3 @@ class VirtualSupermarketDataExtractor(GameDataExtractor):
             shop_rows = self.extract_shop_rows(common_values, common_shop_values, shop_data)
             rows += shop_rows
         return rows
-
-    selected_value_count = defaultdict(int)
-
-    def calculate(self, row):
-
-        def update_selected_values_count():
-
-            def update_selected_values_count_for_keypath(keypath):
-                items = self.get_keypath_value(row, keypath)
-                for item in items:
-                    selected_value = item['selected']
-                    self.selected_value_count[selected_value] += 1
-
-            update_selected_values_count_for_keypath('data.shop1.items')
-            update_selected_values_count_for_keypath('data.shop2.items')
-
-        update_selected_values_count()
@@ -0,0 +1,68 @@
+from openpyxl import Workbook
+
+
+class WriteOnlySpreadsheet:
+    """
+    A spreadsheet with the same cursor interface as Spreadsheet (select_sheet, set_value,
+    set_values, advance_row and column) that is written to an openpyxl write-only workbook.
+    Only the cells of the selected sheet are held in memory: each sheet is written out,
+    row by row, when the next sheet is selected or the spreadsheet is saved, so memory
+    does not grow with the workbook. A sheet cannot be selected again once written.
+    """
+
+    def __init__(self):
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self.sheet_titles = set()
+        self.cells = {}  # dict of row number to dict of column number to value
+        self.row = 1
+        self.column = 1
+
+    def select_sheet(self, title):
+        if title in self.sheet_titles:
+            raise ValueError("Sheet '{}' has already been written".format(title))
+        self.write_sheet()
+        self.sheet = self.workbook.create_sheet(title)
+        self.sheet_titles.add(title)
+        self.row = 1
+        self.column = 1
+
+    def set_cell(self, row, column, value):
+        self.cells.setdefault(row, {})[column] = value
+
+    def set_value(self, value, advance_by_rows=0, cell_offset=None):
+        if cell_offset:
+            column, row_offset = cell_offset
+            self.set_cell(self.row + row_offset, column, value)
+        else:
+            self.set_cell(self.row, self.column, value)
+            self.column += 1
+        if advance_by_rows:
+            self.row += advance_by_rows
+            self.column = 1
+
+    def set_values(self, values, advance_by_rows=1):
+        for column, value in enumerate(values, 1):
+            self.set_cell(self.row, column, value)
+        self.row += advance_by_rows
+        self.column = 1
+
+    def advance_row(self):
+        self.row += 1
+        self.column = 1
+
+    def write_sheet(self):
+        """Append the buffered rows of the selected sheet to the workbook in row order"""
+        if self.sheet is None:
+            if self.cells:
+                self.sheet = self.workbook.create_sheet()
+            else:
+                return
+        for row in range(1, max(self.cells, default=0) + 1):
+            row_cells = self.cells.get(row, {})
+            self.sheet.append([row_cells.get(column) for column in range(1, max(row_cells, default=0) + 1)])
+        self.cells = {}
+
+    def save(self, filename):
+        self.write_sheet()
+        self.workbook.save(filename)
@@ -0,0 +1,86 @@
+from functools import lru_cache
+
+
+class KeypathPlan:
+    """
+    A list of keypaths compiled into an extraction plan. The source keypaths are split
+    into segments once, list indices are converted to integers once, missing values are
+    detected without raising and catching exceptions and transformer functions are
+    applied as each value is extracted.
+    """
+
+    # Returned by lookup when a keypath does not occur in a dictionary
+    MISSING = object()
+
+    def __init__(self, signature):
+        self.steps = [
+            (self.split_keypath(source_keypath), destination_keypath, transformer_fn, is_optional)
+            for source_keypath, destination_keypath, transformer_fn, is_optional in signature
+        ]
+
+    @classmethod
+    def compile(cls, keypaths):
+        """Return the plan for a list of keypaths, compiling it unless one with the same contents was used recently"""
+        return cls.compile_signature(tuple(
+            (keypath.source_keypath, keypath.destination_keypath, keypath.transformer_fn, keypath.is_optional)
+            for keypath in keypaths
+        ))
+
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def compile_signature(cls, signature):
+        """
+        Compile the plan of a tuple of (source keypath, destination keypath, transformer function,
+        is optional) steps. The extractors build their lists of keypaths on each call, so plans are
+        shared by contents. The cache is bounded because a transformer function is compared by
+        identity and one created for each call would otherwise keep adding plans that stay alive.
+        """
+        return cls(signature)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def split_keypath(keypath):
+        """Split a keypath into (key, index) segments, e.g. 'data.0.sessionEvents'"""
+        return tuple((segment, int(segment) if segment.isdigit() else None) for segment in keypath.split('.'))
+
+    @classmethod
+    def lookup(cls, dictionary, segments):
+        """Return the value at the split keypath or MISSING if the keypath does not occur"""
+        value = dictionary
+        for key, index in segments:
+            if isinstance(value, dict):
+                value = value.get(key, cls.MISSING)
+                if value is cls.MISSING:
+                    return value
+            elif isinstance(value, list) and index is not None and index < len(value):
+                value = value[index]
+            else:
+                return cls.MISSING
+        return value
+
+    @classmethod
+    def get_value(cls, dictionary, keypath):
+        """Return the value of a dictionary at a keypath; raise a KeyError if the keypath does not occur"""
+        value = cls.lookup(dictionary, cls.split_keypath(keypath))
+        if value is cls.MISSING:
+            raise KeyError(keypath)
+        return value
+
+    def extract(self, source, destination=None):
+        """
+        Extract values from a source dictionary into a destination dictionary keyed by
+        destination keypath. As with KeypathExtractor, a missing optional keypath is
+        skipped and any other missing keypath raises a KeyError.
+        """
+        if destination is None:
+            destination = {}
+        for segments, destination_keypath, transformer_fn, is_optional in self.steps:
+            value = self.lookup(source, segments)
+            if value is self.MISSING:
+                if is_optional:
+                    continue
+                raise KeyError('.'.join(key for key, _ in segments))
+            if transformer_fn:
+                value = transformer_fn(value)
+            destination[destination_keypath] = value
+        return destination
@@ -0,0 +1,94 @@
+from extractors.keypathplan import KeypathPlan
+
+
+class Codebook:
+    """
+    The response codings of a questionnaire compiled into lookup tables. A question extractor
+    class declares its codings as a dict of coding name to a dict of response to code, e.g.
+
+        codings = {
+            'response':          {None: None, '1': 1, '0': 0},
+            'response_reversed': {None: None, '1': 0, '0': 1},
+        }
+
+    and the codebook of each class is compiled once and shared by its extractors. A coder is
+    the lookup of one table, so it can be used as a keypath transformer function, and as with
+    the coding methods it replaces a response that is not in the table raises a KeyError.
+    Whole columns of a batch of rows are coded with code_rows and scored with score_rows.
+    """
+
+    # dict of Codebook keyed by question extractor class
+    shared = {}
+
+    def __init__(self, codings):
+        self.tables = {name: dict(coding) for name, coding in codings.items()}
+        self.coders = {name: table.__getitem__ for name, table in self.tables.items()}
+
+    @classmethod
+    def for_class(cls, extractor_class):
+        if extractor_class not in cls.shared:
+            cls.shared[extractor_class] = cls(getattr(extractor_class, 'codings', {}))
+        return cls.shared[extractor_class]
+
+    def coder(self, name):
+        return self.coders[name]
+
+    def code_column(self, name, responses):
+        """Return the codes of a list of responses"""
+        table = self.tables[name]
+        return [table[response] for response in responses]
+
+    @staticmethod
+    def code_rows(rows, derived_value_keypaths):
+        """
+        Add the derived (coded) values of a batch of rows of extracted values, one derived
+        column at a time. Each row gets the values it would get from its own derived value
+        keypaths: a row stops being coded at its first missing value or unknown response,
+        and an empty row, one whose values could not be extracted, is not coded at all.
+        """
+        coding = [bool(values) for values in rows]
+        for keypath in derived_value_keypaths:
+            segments = KeypathPlan.split_keypath(keypath.source_keypath)
+            destination_keypath = keypath.destination_keypath
+            transformer_fn = keypath.transformer_fn
+            for index, values in enumerate(rows):
+                if not coding[index]:
+                    continue
+                value = KeypathPlan.lookup(values, segments)
+                if value is KeypathPlan.MISSING:
+                    if not keypath.is_optional:
+                        coding[index] = False
+                    continue
+                if transformer_fn:
+                    try:
+                        value = transformer_fn(value)
+                    except KeyError:
+                        coding[index] = False
+                        continue
+                values[destination_keypath] = value
+        return rows
+
+    @staticmethod
+    def score_rows(rows, score_column_names, empty_value):
+        """
+        Return a (sum scores, missing scores) tuple for each of a batch of rows, counted in one
+        pass over the score columns of each row. The sum adds the scores, which may be quoted
+        numbers, and the missing count counts the score columns whose value is empty or None.
+        A row without values gets empty sum and missing scores.
+        """
+        scores = []
+        for values in rows:
+            if not values:
+                scores.append((empty_value, empty_value))
+                continue
+            sum_scores = 0
+            missing_scores = 0
+            for column_name in score_column_names:
+                if column_name in values:
+                    score = values[column_name]
+                    if score is None or score == empty_value:
+                        missing_scores += 1
+                    elif score:
+                        sum_scores += int(score)
+            scores.append((sum_scores, missing_scores))
+        return scores
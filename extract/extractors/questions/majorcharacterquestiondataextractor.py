@@ -1,4 +1,5 @@
 from .questiondataextractor import QuestionDataExtractor
+from .subtypekeypaths import SubtypeKeypaths
 
 from keypath_extractor import Keypath
 
@@ -10,10 +11,15 @@ class MajorCharacterQuestionDataExtractor(QuestionDataExtractor):
     e.g. ['D', 'A', 'S']
     """
 
+    # dict of the derived value keypaths of each question subtype keyed by question extractor class
+    shared_derived_value_keypaths = {}
+
+    # The question subtype whose derived value keypaths name the columns
+    question_subtype_for_null_row = None
+
     def __init__(self):
         super().__init__()
         self.major_keypaths = self.create_major_keypaths(self.value_keypaths)
-        print(self.major_keypaths)
 
     def create_major_keypaths(self, keypaths):
         """
@@ -50,22 +56,32 @@ class MajorCharacterQuestionDataExtractor(QuestionDataExtractor):
             ]
         ]
 
+        The keypaths are shared by every extractor of the class and
+        each subtype's keypaths are only created when first used.
         """
-        major_keypaths = []
-        for major in self.major_characters:
-            key = '{}{}'.format(self.prefix, major)
-            key_keypaths = []
-            major_keypaths.append(key_keypaths)
-            for keypath in keypaths:
-                major_keypath = '.'.join(['data', key, keypath.source_keypath])
-                new_keypath = Keypath(major_keypath, keypath.destination_keypath, is_optional=keypath.is_optional,
-                                      transformer_fn=keypath.transformer_fn)
-                key_keypaths.append(new_keypath)
-        return major_keypaths
+        subtype_keys = ['{}{}'.format(self.prefix, major) for major in self.major_characters]
+        return SubtypeKeypaths.for_class(type(self), subtype_keys, keypaths)
 
     def get_value_keypaths(self):
         return self.major_keypaths
 
+    def get_derived_value_keypaths(self, row=None):
+        """
+        Return the derived value keypaths of the question subtype of the row. The keypaths of
+        every subtype are created once per class by create_derived_value_keypaths.
+        """
+        extractor_class = type(self)
+        if extractor_class not in self.shared_derived_value_keypaths:
+            self.shared_derived_value_keypaths[extractor_class] = self.create_derived_value_keypaths()
+        derived_value_keypaths = self.shared_derived_value_keypaths[extractor_class]
+        if not derived_value_keypaths:
+            return []
+        return derived_value_keypaths[self.get_question_subtype(row, self.question_subtype_for_null_row)]
+
+    def create_derived_value_keypaths(self):
+        """Return a dict of the list of derived value keypaths of each question subtype"""
+        return {}
+
     def get_question_subtype(self, row, question_subtype_for_null_row):
         """
         Returns the major character for a question subtype if the subtype
@@ -85,6 +101,7 @@ class MajorCharacterQuestionDataExtractor(QuestionDataExtractor):
 class WillQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
 
     prefix = 'WILL'
+    data_key_pattern = r'WILL[MT]'
     major_characters = ['M', 'T']
 
     number_of_scores = 6
@@ -99,31 +116,30 @@ class WillQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
         Keypath('answers.S6.answer', 'S6'),
     ]
 
-    def get_derived_value_keypaths(self, row=None):
-        row_type = self.get_question_subtype(row, 'M')
-        keypaths = {
+    question_subtype_for_null_row = 'M'
+
+    def create_derived_value_keypaths(self):
+        return {
             'M': [
-                Keypath('S1', 'S1 Score', self.code_response_reversed),
-                Keypath('S2', 'S2 Score', self.code_response_reversed),
-                Keypath('S3', 'S3 Score', self.code_response),
-                Keypath('S4', 'S4 Score', self.code_response),
-                Keypath('S5', 'S5 Score', self.code_response_reversed),
-                Keypath('S6', 'S6 Score', self.code_response),
+                Keypath('S1', 'S1 Score', self.coder('response_reversed')),
+                Keypath('S2', 'S2 Score', self.coder('response_reversed')),
+                Keypath('S3', 'S3 Score', self.coder('response')),
+                Keypath('S4', 'S4 Score', self.coder('response')),
+                Keypath('S5', 'S5 Score', self.coder('response_reversed')),
+                Keypath('S6', 'S6 Score', self.coder('response')),
             ],
             'T': [
-                Keypath('S1', 'S1 Score', self.code_response_reversed),
-                Keypath('S2', 'S2 Score', self.code_response_reversed),
-                Keypath('S3', 'S3 Score', self.code_response),
-                Keypath('S4', 'S4 Score', self.code_response_reversed),
-                Keypath('S5', 'S5 Score', self.code_response),
-                Keypath('S6', 'S6 Score', self.code_response),
+                Keypath('S1', 'S1 Score', self.coder('response_reversed')),
+                Keypath('S2', 'S2 Score', self.coder('response_reversed')),
+                Keypath('S3', 'S3 Score', self.coder('response')),
+                Keypath('S4', 'S4 Score', self.coder('response_reversed')),
+                Keypath('S5', 'S5 Score', self.coder('response')),
+                Keypath('S6', 'S6 Score', self.coder('response')),
             ]
         }
-        return keypaths[row_type]
 
-    @staticmethod
-    def code_response(response_value):
-        coding_scheme = {
+    codings = {
+        'response': {
             None: None,
             '1': 1,
             '2': 2,
@@ -131,12 +147,8 @@ class WillQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
             '4': 4,
             '5': 5,
             '6': 6,
-        }
-        return coding_scheme[response_value]
-
-    @staticmethod
-    def code_response_reversed(response_value):
-        coding_scheme = {
+        },
+        'response_reversed': {
             None: None,
             '1': 6,
             '2': 5,
@@ -144,16 +156,14 @@ class WillQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
             '4': 3,
             '5': 2,
             '6': 1,
-        }
-        return coding_scheme[response_value]
-
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'WILL[MT]')
+        },
+    }
 
 
 class MoodQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
 
     prefix = 'MOOD'
+    data_key_pattern = r'MOOD[DAS]'
     major_characters = ['D', 'A', 'S']
 
     number_of_scores = 7
@@ -170,31 +180,24 @@ class MoodQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
         Keypath('timeOnQuestion', 'Time On Question'),
     ]
 
-    @staticmethod
-    def code_response(response_value):
-        coding_scheme = {
+    codings = {
+        'response': {
             None: None,
             '1': 1,
             '0': 0,
-        }
-        return coding_scheme[response_value]
-
-    @staticmethod
-    def code_response_reversed(response_value):
-        coding_scheme = {
+        },
+        'response_reversed': {
             None: None,
             '1': 0,
             '0': 1,
-        }
-        return coding_scheme[response_value]
-
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'MOOD[DAS]')
+        },
+    }
 
 
 class IMPQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
 
     prefix = 'IMP'
+    data_key_pattern = r'IMP[AMN]'
     major_characters = ['A', 'M', 'N']
 
     number_of_scores = 11
@@ -215,80 +218,73 @@ class IMPQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
         Keypath('timeOnQuestion', 'Time On Question'),
     ]
 
-    def get_derived_value_keypaths(self, row=None):
-        row_type = self.get_question_subtype(row, 'M')
-        keypaths = {
+    question_subtype_for_null_row = 'M'
+
+    def create_derived_value_keypaths(self):
+        return {
             'A': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response),
-                Keypath('S7', 'S7 Score', transformer_fn=self.code_response),
-                Keypath('S8', 'S8 Score', transformer_fn=self.code_response),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response')),
+                Keypath('S7', 'S7 Score', transformer_fn=self.coder('response')),
+                Keypath('S8', 'S8 Score', transformer_fn=self.coder('response')),
                 Keypath('S9', 'S9 Score', transformer_fn=self.blank),
                 Keypath('S10', 'S10 Score', transformer_fn=self.blank),
                 Keypath('S11', 'S11 Score', transformer_fn=self.blank),
             ],
             'M': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response),
-                Keypath('S7', 'S7 Score', transformer_fn=self.code_response),
-                Keypath('S8', 'S8 Score', transformer_fn=self.code_response),
-                Keypath('S9', 'S9 Score', transformer_fn=self.code_response),
-                Keypath('S10', 'S10 Score', transformer_fn=self.code_response),
-                Keypath('S11', 'S11 Score', transformer_fn=self.code_response_reversed),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response')),
+                Keypath('S7', 'S7 Score', transformer_fn=self.coder('response')),
+                Keypath('S8', 'S8 Score', transformer_fn=self.coder('response')),
+                Keypath('S9', 'S9 Score', transformer_fn=self.coder('response')),
+                Keypath('S10', 'S10 Score', transformer_fn=self.coder('response')),
+                Keypath('S11', 'S11 Score', transformer_fn=self.coder('response_reversed')),
             ],
             'N': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S7', 'S7 Score', transformer_fn=self.code_response),
-                Keypath('S8', 'S8 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S9', 'S9 Score', transformer_fn=self.code_response),
-                Keypath('S10', 'S10 Score', transformer_fn=self.code_response),
-                Keypath('S11', 'S11 Score', transformer_fn=self.code_response_reversed),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S7', 'S7 Score', transformer_fn=self.coder('response')),
+                Keypath('S8', 'S8 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S9', 'S9 Score', transformer_fn=self.coder('response')),
+                Keypath('S10', 'S10 Score', transformer_fn=self.coder('response')),
+                Keypath('S11', 'S11 Score', transformer_fn=self.coder('response_reversed')),
             ]
         }
-        return keypaths[row_type]
 
-    @staticmethod
-    def code_response(response_value):
-        coding_scheme = {
+    codings = {
+        'response': {
             None: None,
             '1': 1,
             '2': 2,
             '3': 3,
             '4': 4,
-        }
-        return coding_scheme[response_value]
-
-    @staticmethod
-    def code_response_reversed(response_value):
-        coding_scheme = {
+        },
+        'response_reversed': {
             None: None,
             '1': 4,
             '2': 3,
             '3': 2,
             '4': 1,
-        }
-        return coding_scheme[response_value]
-
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'IMP[AMN]')
+        },
+    }
 
 
 class EMREGQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
 
     prefix = 'EMREG'
+    data_key_pattern = r'EMREG[NGIASC]'
     major_characters = ['N', 'G', 'I', 'A', 'S', 'C']
 
     number_of_scores = 8
@@ -306,91 +302,84 @@ class EMREGQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
         Keypath('timeOnQuestion', 'Time On Question'),
     ]
 
-    def get_derived_value_keypaths(self, row=None):
-        row_type = self.get_question_subtype(row, 'S')
-        keypaths = {
+    question_subtype_for_null_row = 'S'
+
+    def create_derived_value_keypaths(self):
+        return {
             'N': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response')),
             ],
             'G': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response_reversed),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response_reversed')),
             ],
             'I': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response_reversed),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response_reversed')),
             ],
             'A': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response_reversed),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response_reversed')),
             ],
             'S': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S7', 'S7 Score', transformer_fn=self.code_response),
-                Keypath('S8', 'S8 Score', transformer_fn=self.code_response),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S7', 'S7 Score', transformer_fn=self.coder('response')),
+                Keypath('S8', 'S8 Score', transformer_fn=self.coder('response')),
             ],
             'C': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response_reversed),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response_reversed')),
             ]
         }
-        return keypaths[row_type]
 
-    @staticmethod
-    def code_response(response_value):
-        coding_scheme = {
+    codings = {
+        'response': {
             None: None,
             '1': 1,
             '2': 2,
             '3': 3,
             '4': 4,
             '5': 5,
-        }
-        return coding_scheme[response_value]
-
-    @staticmethod
-    def code_response_reversed(response_value):
-        coding_scheme = {
+        },
+        'response_reversed': {
             None: None,
             '1': 5,
             '2': 4,
             '3': 3,
             '4': 2,
             '5': 1,
-        }
-        return coding_scheme[response_value]
-
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'EMREG[NGIASC]')
+        },
+    }
 
 
 class PersonQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
 
     prefix = 'PERSON'
+    data_key_pattern = r'PERSON[NEOAC]'
     major_characters = ['N', 'E', 'O', 'A', 'C']
 
     number_of_scores = 10
@@ -410,105 +399,98 @@ class PersonQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
         Keypath('timeOnQuestion', 'Time On Question'),
     ]
 
-    def get_derived_value_keypaths(self, row=None):
-        row_type = self.get_question_subtype(row, 'N')
-        keypaths = {
+    question_subtype_for_null_row = 'N'
+
+    def create_derived_value_keypaths(self):
+        return {
             'N': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S7', 'S7 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S8', 'S8 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S9', 'S9 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S10', 'S10 Score', transformer_fn=self.code_response_reversed),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S7', 'S7 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S8', 'S8 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S9', 'S9 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S10', 'S10 Score', transformer_fn=self.coder('response_reversed')),
             ],
             'E': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S7', 'S7 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S8', 'S8 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S9', 'S9 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S10', 'S10 Score', transformer_fn=self.code_response_reversed),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S7', 'S7 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S8', 'S8 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S9', 'S9 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S10', 'S10 Score', transformer_fn=self.coder('response_reversed')),
             ],
             'O': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S7', 'S7 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S8', 'S8 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S9', 'S9 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S10', 'S10 Score', transformer_fn=self.code_response_reversed),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S7', 'S7 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S8', 'S8 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S9', 'S9 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S10', 'S10 Score', transformer_fn=self.coder('response_reversed')),
             ],
             'A': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S7', 'S7 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S8', 'S8 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S9', 'S9 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S10', 'S10 Score', transformer_fn=self.code_response_reversed),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S7', 'S7 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S8', 'S8 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S9', 'S9 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S10', 'S10 Score', transformer_fn=self.coder('response_reversed')),
             ],
             'C': [
-                Keypath('S1', 'S1 Score', transformer_fn=self.code_response),
-                Keypath('S2', 'S2 Score', transformer_fn=self.code_response),
-                Keypath('S3', 'S3 Score', transformer_fn=self.code_response),
-                Keypath('S4', 'S4 Score', transformer_fn=self.code_response),
-                Keypath('S5', 'S5 Score', transformer_fn=self.code_response),
-                Keypath('S6', 'S6 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S7', 'S7 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S8', 'S8 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S9', 'S9 Score', transformer_fn=self.code_response_reversed),
-                Keypath('S10', 'S10 Score', transformer_fn=self.code_response_reversed),
+                Keypath('S1', 'S1 Score', transformer_fn=self.coder('response')),
+                Keypath('S2', 'S2 Score', transformer_fn=self.coder('response')),
+                Keypath('S3', 'S3 Score', transformer_fn=self.coder('response')),
+                Keypath('S4', 'S4 Score', transformer_fn=self.coder('response')),
+                Keypath('S5', 'S5 Score', transformer_fn=self.coder('response')),
+                Keypath('S6', 'S6 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S7', 'S7 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S8', 'S8 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S9', 'S9 Score', transformer_fn=self.coder('response_reversed')),
+                Keypath('S10', 'S10 Score', transformer_fn=self.coder('response_reversed')),
             ]
         }
-        return keypaths[row_type]
 
-    @staticmethod
-    def code_response(response_value):
-        coding_scheme = {
+    codings = {
+        'response': {
             None: None,
             '1': 1,
             '2': 2,
             '3': 3,
             '4': 4,
             '5': 5,
-        }
-        return coding_scheme[response_value]
-
-    @staticmethod
-    def code_response_reversed(response_value):
-        coding_scheme = {
+        },
+        'response_reversed': {
             None: None,
             '1': 5,
             '2': 4,
             '3': 3,
             '4': 2,
             '5': 1,
-        }
-        return coding_scheme[response_value]
-
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'PERSON[NEOAC]')
+        },
+    }
 
 
 class RESTRQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
 
     prefix = 'RESTR-'
+    data_key_pattern = r'RESTR-[CW]'
     major_characters = ['C', 'W']
 
     number_of_scores = 6
@@ -523,6 +505,3 @@ class RESTRQuestionDataExtractor(MajorCharacterQuestionDataExtractor):
         Keypath('answers.S6.answer', 'S6'),
         Keypath('timeOnQuestion', 'Time On Question'),
     ]
-
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'RESTR-[CW]')
@@ -1,6 +1,7 @@
 from utils import irange
 
 from .questiondataextractor import QuestionDataExtractor
+from .subtypekeypaths import SubtypeKeypaths
 
 from keypath_extractor import Keypath
 
@@ -81,26 +82,20 @@ class MajorMinorQuestionDataExtractor(QuestionDataExtractor):
 
             ]
         ]
+
+        The keypaths are shared by every extractor of the class and
+        each subtype's keypaths are only created when first used.
         """
-        major_minor_keypaths = []
-        for major in self.major_range:
-            for minor in self.minor_range:
-                key = '{}{}-{}'.format(self.prefix, major, minor)
-                key_keypaths = []
-                major_minor_keypaths.append(key_keypaths)
-                for keypath in keypaths:
-                    major_keypath = '.'.join(['data', key, keypath.source_keypath])
-                    new_keypath = Keypath(major_keypath, keypath.destination_keypath, is_optional=keypath.is_optional,
-                                          transformer_fn=keypath.transformer_fn)
-                    key_keypaths.append(new_keypath)
-        return major_minor_keypaths
+        subtype_keys = [
+            '{}{}-{}'.format(self.prefix, major, minor) for major in self.major_range for minor in self.minor_range
+        ]
+        return SubtypeKeypaths.for_class(type(self), subtype_keys, keypaths)
 
     def get_value_keypaths(self):
         return self.major_minor_keypaths
 
-    def can_process_data(self, data):
-        pattern = self.prefix + r'[12345]-1?\d'
-        return self.can_process_data_with_pattern(data, pattern)
+    def get_data_key_pattern(self):
+        return self.prefix + r'[12345]-1?\d'
 
 
 class FreqQuestionDataExtractor(MajorMinorQuestionDataExtractor):
@@ -121,44 +116,35 @@ class FreqQuestionDataExtractor(MajorMinorQuestionDataExtractor):
 
     def get_derived_value_keypaths(self, row=None):
         return [
-            Keypath('FE', 'FE Score', self.code_answer),
-            Keypath('FC Answer', 'FC Score', self.code_answer),
-            Keypath('Type', 'Type Value', self.code_food_type),
-            Keypath('Selected', 'Selected Value', self.code_food_selected),
+            Keypath('FE', 'FE Score', self.coder('answer')),
+            Keypath('FC Answer', 'FC Score', self.coder('answer')),
+            Keypath('Type', 'Type Value', self.coder('food_type')),
+            Keypath('Selected', 'Selected Value', self.coder('food_selected')),
         ]
 
-    @staticmethod
-    def code_food_type(food_value):
-        coding_scheme = {
+    codings = {
+        'food_type': {
             None: None,
             'U': 0,
             'H': 1,
-        }
-        return coding_scheme[food_value]
-
-    @staticmethod
-    def code_food_selected(food_selected_value):
-        coding_scheme = {
+        },
+        'food_selected': {
             None: None,
             'Selected': 1,
             'MB':       2,
             'upload':   3,
             'random':   4,
             'add':      5,
-        }
-        return coding_scheme[food_selected_value]
-
-    @staticmethod
-    def code_answer(answer_value):
-        coding_scheme = {
+        },
+        'answer': {
             None: None,
             'None':      0,
             '1-2 times': 1,
             '3-4 times': 2,
             '5-6 times': 3,
             '7+ times':  4,
-        }
-        return coding_scheme[answer_value]
+        },
+    }
 
 
 class TasteQuestionDataExtractor(MajorMinorQuestionDataExtractor):
@@ -177,30 +163,25 @@ class TasteQuestionDataExtractor(MajorMinorQuestionDataExtractor):
 
     def get_derived_value_keypaths(self, row=None):
         return [
-            Keypath('Type', 'Type Value', self.code_food_type),
-            Keypath('Selected', 'Selected Value', self.code_food_selected),
+            Keypath('Type', 'Type Value', self.coder('food_type')),
+            Keypath('Selected', 'Selected Value', self.coder('food_selected')),
         ]
 
-    @staticmethod
-    def code_food_type(food_value):
-        coding_scheme = {
+    codings = {
+        'food_type': {
             None: None,
             'U': 0,
             'H': 1,
-        }
-        return coding_scheme[food_value]
-
-    @staticmethod
-    def code_food_selected(food_selected_value):
-        coding_scheme = {
+        },
+        'food_selected': {
             None: None,
             'Selected': 1,
             'MB':       2,
             'upload':   3,
             'random':   4,
             'add':      5,
-        }
-        return coding_scheme[food_selected_value]
+        },
+    }
 
 
 class AttractQuestionDataExtractor(MajorMinorQuestionDataExtractor):
@@ -219,27 +200,22 @@ class AttractQuestionDataExtractor(MajorMinorQuestionDataExtractor):
 
     def get_derived_value_keypaths(self, row=None):
         return [
-            Keypath('Type', 'Type Value', self.code_food_type),
-            Keypath('Selected', 'Selected Value', self.code_food_selected),
+            Keypath('Type', 'Type Value', self.coder('food_type')),
+            Keypath('Selected', 'Selected Value', self.coder('food_selected')),
         ]
 
-    @staticmethod
-    def code_food_type(food_value):
-        coding_scheme = {
+    codings = {
+        'food_type': {
             None: None,
             'U': 0,
             'H': 1,
-        }
-        return coding_scheme[food_value]
-
-    @staticmethod
-    def code_food_selected(food_selected_value):
-        coding_scheme = {
+        },
+        'food_selected': {
             None: None,
             'Selected': 1,
             'MB':       2,
             'upload':   3,
             'random':   4,
             'add':      5,
-        }
-        return coding_scheme[food_selected_value]
+        },
+    }
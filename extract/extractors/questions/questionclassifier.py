@@ -0,0 +1,44 @@
+import re
+
+
+class QuestionClassifier:
+    """
+    Map the data keys of a 'tellusmore' row, e.g. EX-A, FOODIMP, FREQ1-1 and WILLM, to the
+    question extractor classes whose data key pattern they match. Each distinct data key is
+    matched against the compiled patterns once and the classes it matches are cached, so a
+    row is classified in one pass over its data keys with a dict lookup per key. The classes
+    found for the last row classified are kept, so the question extractors offered the same
+    row one after the other share the result.
+    """
+
+    def __init__(self):
+        self.patterns = {}  # dict of compiled data key pattern keyed by question extractor class
+        self.key_classes = {}  # dict of frozenset of question extractor classes keyed by data key
+        self.last_row = None
+        self.last_row_classes = frozenset()
+
+    def add(self, extractor_class, pattern):
+        if extractor_class not in self.patterns:
+            self.patterns[extractor_class] = re.compile(pattern)
+            self.key_classes = {}
+            self.last_row = None
+
+    def classes_for_key(self, data_key):
+        if data_key not in self.key_classes:
+            self.key_classes[data_key] = frozenset(
+                extractor_class for extractor_class, pattern in self.patterns.items() if pattern.match(data_key)
+            )
+        return self.key_classes[data_key]
+
+    def classify_data(self, data):
+        """Return the set of question extractor classes that match any of the data keys"""
+        classes = set()
+        for data_key in data:
+            classes |= self.classes_for_key(data_key)
+        return classes
+
+    def classify_row(self, row):
+        if row is not self.last_row:
+            self.last_row_classes = frozenset(self.classify_data(row['data']))
+            self.last_row = row
+        return self.last_row_classes
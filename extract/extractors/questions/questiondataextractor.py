@@ -1,9 +1,12 @@
-import re
-
 from utils import irange
 
 from extractors.dataextractor import DataExtractor
 
+from .codebook import Codebook
+from .questionclassifier import QuestionClassifier
+from .scorematrix import ScoreMatrix
+from .subtypekeypaths import SubtypeKeypaths
+
 from keypath_extractor import Keypath
 
 
@@ -12,9 +15,22 @@ class QuestionDataExtractor(DataExtractor):
 
     type = 'tellusmore'
 
+    # Shared by all of the question extractors to find the questions in a row's data keys
+    classifier = QuestionClassifier()
+
+    # When True the sum, missing and subscale scores of every row are calculated together
+    # with a ScoreMatrix once all of the rows have been extracted (see remaining_rows)
+    batch_scoring = False
+
+    # Optional subscales: a dict of subscale score column name to the score columns it sums
+    subscales = {}
+
     def __init__(self):
         super().__init__()
         self.csv_rows = []
+        self.unscored_rows = []
+        self.classifier.add(type(self), self.get_data_key_pattern())
+        self.codebook = Codebook.for_class(type(self))
 
     def get_filename(self):
         return 'Q-{}'.format(self.prefix)
@@ -35,56 +51,125 @@ class QuestionDataExtractor(DataExtractor):
                 # we're only using the destination keypath to get the column name
                 Keypath('Does not matter', 'Sum Scores'),
                 Keypath('Does not matter', 'Missing Scores'),
-            ]
+            ] + [Keypath('Does not matter', subscale) for subscale in self.subscales]
         return keypaths
 
+    def get_data_key_pattern(self):
+        """The regular expression that matches the start of the row data keys of this question, e.g. WILL[MT]"""
+        return self.data_key_pattern
+
     def can_process_row(self, row):
-        return super().can_process_row(row) and self.can_process_data(row['data'])
+        return super().can_process_row(row) and type(self) in self.classifier.classify_row(row)
+
+    def can_process_data(self, data):
+        return type(self) in self.classifier.classify_data(data)
 
     def get_column_names(self):
         return super().get_column_names() + self.get_question_type_column_names()
 
-    @staticmethod
-    def can_process_data_with_pattern(data, pattern):
-        data_keys = data.keys()
-        for data_key in data_keys:
-            if re.match(pattern, data_key):
-                print('QUESTION: ', data_key)
-                return True
-        return False
+    def coder(self, name):
+        """Return the coder of one of the codings of this question, for use as a keypath transformer function"""
+        return self.codebook.coder(name)
 
     def extract_values(self, data):
+        """
+        Extract the values of the row, one set of values per question subtype, then code
+        and score them as one batch and add the question type columns to each set
+        """
         value_keypaths = self.get_value_keypaths()
+        common_keypaths = self.get_common_keypaths()
         if not self.keypaths_are_nested(value_keypaths):
-            values = super().extract_values(data)
-            values = [self.add_calculations(values[0])]
+            rows = [self.extract_values_with_keypaths(common_keypaths + value_keypaths, [], data)]
+            self.add_calculations(rows, self.get_derived_value_keypaths())
             prefixes = self.get_question_type_prefixes(value_keypaths[0].source_keypath)
-            values = self.add_question_type_column_names(values, prefixes)
-            return values
+            return self.add_question_type_column_names(rows, prefixes)
+
+        if isinstance(value_keypaths, SubtypeKeypaths):
+            return self.extract_subtype_values(value_keypaths, data)
 
+        rows = []
+        question_type_prefixes = []
+        for nested_value_keypaths in value_keypaths:
+            rows.append(self.extract_values_with_keypaths(common_keypaths + nested_value_keypaths, [], data))
+            question_type_prefixes.append(self.get_question_type_prefixes(nested_value_keypaths[0].source_keypath))
+        self.add_calculations(rows, self.get_derived_value_keypaths(data))
+        for values, prefixes in zip(rows, question_type_prefixes):
+            self.add_question_type_column_names(values, prefixes)
+        return rows
+
+    def extract_subtype_values(self, subtype_keypaths, data):
+        """
+        Extract one row of values per question subtype. Only the subtypes whose key,
+        e.g. FREQ1-1, is in the row's data are looked up; the other subtypes get the
+        same placeholder values that a failed lookup of their keypaths would give.
+        """
         rows = []
         common_keypaths = self.get_common_keypaths()
-        nested_value_keypaths = value_keypaths
-        derived_value_keypaths = self.get_derived_value_keypaths(data)
-        for value_keypaths in nested_value_keypaths:
-            all_value_keypaths = common_keypaths + value_keypaths
-            values = self.extract_values_with_keypaths(all_value_keypaths, derived_value_keypaths, data)
-            values = self.add_calculations(values)
-            prefixes = self.get_question_type_prefixes(value_keypaths[0].source_keypath)
-            values = self.add_question_type_column_names(values, prefixes)
-            rows.append(values)
+        row_data = data['data']
+        for index, subtype_key in enumerate(subtype_keypaths.subtype_keys):
+            if subtype_key in row_data:
+                rows.append(self.extract_values_with_keypaths(common_keypaths + subtype_keypaths[index], [], data))
+            else:
+                rows.append({})
+        self.add_calculations(rows, self.get_derived_value_keypaths(data))
+        for values, subtype_key in zip(rows, subtype_keypaths.subtype_keys):
+            self.add_question_type_column_names(values, self.split_question_type(subtype_key))
         return rows
 
-    def add_calculations(self, values):
-        if self.should_add_sum_scores_and_missing_scores_columns():
-            sum_scores = DataExtractor.EMPTY_CELL_VALUE
-            missing_scores = DataExtractor.EMPTY_CELL_VALUE
-            if values:
-                sum_scores = self.calculate_sum_scores(values, self.number_of_scores)
-                missing_scores = self.calculate_missing_scores(values, self.number_of_scores)
-            values['Sum Scores'] = sum_scores
-            values['Missing Scores'] = missing_scores
-        return values
+    def add_calculations(self, rows, derived_value_keypaths):
+        """
+        Code the derived value columns of a batch of rows and add their sum, missing and
+        subscale scores. With batch scoring only the rows without values are scored here.
+        """
+        self.codebook.code_rows(rows, derived_value_keypaths)
+        if not self.should_add_sum_scores_and_missing_scores_columns():
+            return rows
+        if self.scores_in_batch():
+            for values in rows:
+                if not values:
+                    self.add_scores(values, DataExtractor.EMPTY_CELL_VALUE, DataExtractor.EMPTY_CELL_VALUE,
+                                    {subscale: DataExtractor.EMPTY_CELL_VALUE for subscale in self.subscales})
+            return rows
+
+        score_column_names = self.score_column_name_sequence(self.number_of_scores)
+        scores = self.codebook.score_rows(rows, score_column_names, DataExtractor.EMPTY_CELL_VALUE)
+        subscale_scores = {
+            subscale: self.codebook.score_rows(rows, column_names, DataExtractor.EMPTY_CELL_VALUE)
+            for subscale, column_names in self.subscales.items()
+        }
+        for index, (values, (sum_scores, missing_scores)) in enumerate(zip(rows, scores)):
+            self.add_scores(values, sum_scores, missing_scores,
+                            {subscale: subscale_scores[subscale][index][0] for subscale in self.subscales})
+        return rows
+
+    @staticmethod
+    def add_scores(values, sum_scores, missing_scores, subscale_scores):
+        values['Sum Scores'] = sum_scores
+        values['Missing Scores'] = missing_scores
+        values.update(subscale_scores)
+
+    def scores_in_batch(self):
+        return self.batch_scoring and self.should_add_sum_scores_and_missing_scores_columns()
+
+    def remaining_rows(self):
+        """
+        Return the rows held back for batch scoring, for output to CSV once every row has been
+        extracted, after scoring all of them with one ScoreMatrix. Rows without values were
+        given empty scores when they were extracted.
+        """
+        rows, self.unscored_rows = self.unscored_rows, []
+        unscored_rows = [values for values in rows if 'Sum Scores' not in values]
+        if unscored_rows:
+            score_column_names = self.score_column_name_sequence(self.number_of_scores)
+            score_matrix = ScoreMatrix(unscored_rows, score_column_names, DataExtractor.EMPTY_CELL_VALUE)
+            sum_scores = score_matrix.sum_scores()
+            missing_scores = score_matrix.missing_scores()
+            subscale_scores = score_matrix.subscale_scores(self.subscales)
+            for index, values in enumerate(unscored_rows):
+                self.add_scores(values, sum_scores[index], missing_scores[index],
+                                {subscale: subscale_scores[subscale][index] for subscale in self.subscales})
+        self.csv_rows = rows
+        return self.extracted_rows()
 
     def should_add_sum_scores_and_missing_scores_columns(self):
         return hasattr(self, 'add_sum_scores_and_missing_scores_columns') and self.add_sum_scores_and_missing_scores_columns
@@ -112,7 +197,10 @@ class QuestionDataExtractor(DataExtractor):
         e.g. data.EFFECT-A -> ('EFFECT', 'A')
         """
         paths = keypath.split('.')
-        question_type = paths[1]
+        return self.split_question_type(paths[1])
+
+    def split_question_type(self, question_type):
+        """Return a (prefix, character) tuple for a question type, e.g. EFFECT-A -> ('EFFECT', 'A')"""
         if '-' in question_type:
             # e.g. EFFECT-A -> 'EFFECT', 'A'
             return question_type.split('-')
@@ -136,7 +224,12 @@ class QuestionDataExtractor(DataExtractor):
             return values
 
     def extract_row_data(self, row):
+        self.timer.start()
         self.csv_rows = self.extract_values(row)
+        self.timer.stop(self, 'extract', len(self.csv_rows))
+        if self.scores_in_batch():
+            self.unscored_rows.extend(self.csv_rows)
+            self.csv_rows = []
 
     @staticmethod
     def score_column_name_sequence(number_of_scores):
@@ -148,25 +241,6 @@ class QuestionDataExtractor(DataExtractor):
         """
         return ['S' + str(response) for response in irange(1, number_of_scores)]
 
-    def calculate_sum_scores(self, values, number_of_scores):
-        sum_scores = 0
-        column_names_to_count = self.score_column_name_sequence(number_of_scores)
-        for column_name in column_names_to_count:
-            if column_name in values:
-                score = values[column_name]
-                if score and score != DataExtractor.EMPTY_CELL_VALUE:
-                    sum_scores += int(score)  # Scores may appear as quoted numbers
-        return sum_scores
-
-    def calculate_missing_scores(self, values, number_of_scores):
-        sum_missing = 0
-        for column_name in self.score_column_name_sequence(number_of_scores):
-            if column_name in values:
-                value = values[column_name]
-                if value == DataExtractor.EMPTY_CELL_VALUE or value is None:
-                    sum_missing += 1
-        return sum_missing
-
     @staticmethod
     def blank(response_value):
         """A placeholder method that does nothing that's used when a method is required"""
@@ -176,6 +250,7 @@ class QuestionDataExtractor(DataExtractor):
 class EXQuestionDataExtractor(QuestionDataExtractor):
 
     prefix = 'EX'
+    data_key_pattern = r'EX-[AF]'
     no_subtype = True
 
     def get_value_keypaths(self):
@@ -192,26 +267,23 @@ class EXQuestionDataExtractor(QuestionDataExtractor):
 
     def get_derived_value_keypaths(self, row=None):
         return [
-            Keypath('EX A Answer', 'EX A Answer Score', self.code_response),
+            Keypath('EX A Answer', 'EX A Answer Score', self.coder('response')),
         ]
 
-    @staticmethod
-    def code_response(response_value):
-        coding_scheme = {
+    codings = {
+        'response': {
             None:                              None,
             'I am inactive':                   0,
             'My activity levels are low':      1,
             'My activity levels are moderate': 2,
-        }
-        return coding_scheme[response_value]
-
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'EX-[AF]')
+        },
+    }
 
 
 class FoodIMPQuestionExtractor(QuestionDataExtractor):
 
     prefix = 'FOODIMP'
+    data_key_pattern = r'FOODIMP'
     no_subtype = True
 
     number_of_scores = 16
@@ -240,60 +312,49 @@ class FoodIMPQuestionExtractor(QuestionDataExtractor):
 
     def get_derived_value_keypaths(self, row=None):
         return [
-            Keypath('S1',  'S1 Score', self.code_response),
-            Keypath('S2',  'S2 Score', self.code_response),
-            Keypath('S3',  'S3 Score', self.code_response),
-            Keypath('S4',  'S4 Score', self.code_response),
-            Keypath('S5',  'S5 Score', self.code_response),
-            Keypath('S6',  'S6 Score', self.code_response),
-            Keypath('S7',  'S7 Score', self.code_response),
-            Keypath('S8',  'S8 Score', self.code_response_reversed),
-            Keypath('S9',  'S9 Score', self.code_response),
-            Keypath('S10', 'S10 Score', self.code_response_reversed),
-            Keypath('S11', 'S11 Score', self.code_response),
-            Keypath('S12', 'S12 Score', self.code_response_reversed),
-            Keypath('S13', 'S13 Score', self.code_response),
-            Keypath('S14', 'S14 Score', self.code_response_multiple),
-            Keypath('S15', 'S15 Score', self.code_response_multiple),
-            Keypath('S16', 'S16 Score', self.code_response_multiple),
+            Keypath('S1',  'S1 Score', self.coder('response')),
+            Keypath('S2',  'S2 Score', self.coder('response')),
+            Keypath('S3',  'S3 Score', self.coder('response')),
+            Keypath('S4',  'S4 Score', self.coder('response')),
+            Keypath('S5',  'S5 Score', self.coder('response')),
+            Keypath('S6',  'S6 Score', self.coder('response')),
+            Keypath('S7',  'S7 Score', self.coder('response')),
+            Keypath('S8',  'S8 Score', self.coder('response_reversed')),
+            Keypath('S9',  'S9 Score', self.coder('response')),
+            Keypath('S10', 'S10 Score', self.coder('response_reversed')),
+            Keypath('S11', 'S11 Score', self.coder('response')),
+            Keypath('S12', 'S12 Score', self.coder('response_reversed')),
+            Keypath('S13', 'S13 Score', self.coder('response')),
+            Keypath('S14', 'S14 Score', self.coder('response_multiple')),
+            Keypath('S15', 'S15 Score', self.coder('response_multiple')),
+            Keypath('S16', 'S16 Score', self.coder('response_multiple')),
         ]
 
-    @staticmethod
-    def code_response(response_value):
-        coding_scheme = {
+    codings = {
+        'response': {
             None: None,
             '1': 1,
             '0': 0,
-        }
-        return coding_scheme[response_value]
-
-    @staticmethod
-    def code_response_reversed(response_value):
-        coding_scheme = {
+        },
+        'response_reversed': {
             None: None,
             '1': 0,
             '0': 1,
-        }
-        return coding_scheme[response_value]
-
-    @staticmethod
-    def code_response_multiple(response_value):
-        coding_scheme = {
+        },
+        'response_multiple': {
             None: None,
             '0': 0,
             '1': 0,
             '2': 1,
             '3': 1,
-        }
-        return coding_scheme[response_value]
-
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'FOODIMP')
+        },
+    }
 
 
 class GoalsQuestionDataExtractor(QuestionDataExtractor):
 
     prefix = 'GOALS'
+    data_key_pattern = r'GOALS'
     no_subtype = True
 
     def get_value_keypaths(self):
@@ -310,13 +371,11 @@ class GoalsQuestionDataExtractor(QuestionDataExtractor):
             Keypath('data.GOALS.timeOnQuestion', 'Time On Question'),
         ]
 
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'GOALS')
-
 
 class IntentQuestionDataExtractor(QuestionDataExtractor):
 
     prefix = 'INTENT'
+    data_key_pattern = r'INTENT-[UH]'
     no_subtype = True
 
     def get_value_keypaths(self):
@@ -327,13 +386,11 @@ class IntentQuestionDataExtractor(QuestionDataExtractor):
             Keypath('data.INTENT-U.timeOnQuestion', 'Unhealthy Foods Answer'),
         ]
 
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'INTENT-[UH]')
-
 
 class EffectQuestionDataExtractor(QuestionDataExtractor):
 
     prefix = 'EFFECT'
+    data_key_pattern = r'EFFECT-[HUW]'
     no_subtype = True
 
     def get_value_keypaths(self):
@@ -346,13 +403,11 @@ class EffectQuestionDataExtractor(QuestionDataExtractor):
             Keypath('data.EFFECT-W.timeOnQuestion', 'W Time on Question'),
         ]
 
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'EFFECT-[HUW]')
-
 
 class MINDFQuestionDataExtractor(QuestionDataExtractor):
 
     prefix = 'MINDF'
+    data_key_pattern = r'MINDF'
     no_subtype = True
 
     number_of_scores = 15
@@ -377,6 +432,3 @@ class MINDFQuestionDataExtractor(QuestionDataExtractor):
             Keypath('data.MINDF.answers.S15.answer', 'S15'),
             Keypath('data.MINDF.timeOnQuestion', 'Time On Question'),
         ]
-
-    def can_process_data(self, data):
-        return self.can_process_data_with_pattern(data, r'MINDF')
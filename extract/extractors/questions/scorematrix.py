@@ -0,0 +1,47 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ScoreMatrix:
+    """
+    The S1..Sn scores of a batch of question rows, e.g. every row of a questionnaire in an
+    export, collected into a 2-D NumPy array with one row per question row and NaN for a score
+    that is not a number. The sum, missing and subscale scores of every row are then each one
+    vectorized reduction. As with Codebook.score_rows, a score whose value is empty or None is
+    missing and a score column that is not in the row's values is neither summed nor missing.
+    NumPy is optional: check is_available before using this class.
+    """
+
+    @staticmethod
+    def is_available():
+        return numpy is not None
+
+    def __init__(self, rows, score_column_names, empty_value):
+        self.column_indices = {column_name: index for index, column_name in enumerate(score_column_names)}
+        self.scores = numpy.full((len(rows), len(score_column_names)), numpy.nan)
+        self.missing = numpy.zeros((len(rows), len(score_column_names)), dtype=bool)
+        for row_index, values in enumerate(rows):
+            for column_index, column_name in enumerate(score_column_names):
+                if column_name in values:
+                    score = values[column_name]
+                    if score is None or score == empty_value:
+                        self.missing[row_index, column_index] = True
+                    elif score:
+                        self.scores[row_index, column_index] = int(score)  # Scores may appear as quoted numbers
+
+    def sum_scores(self, column_names=None):
+        """Return the list of the sum of the scores of each row, or of the named score columns only"""
+        scores = self.scores
+        if column_names is not None:
+            scores = scores[:, [self.column_indices[column_name] for column_name in column_names]]
+        return numpy.nansum(scores, axis=1).astype(int).tolist()
+
+    def missing_scores(self):
+        """Return the list of the number of missing scores of each row"""
+        return self.missing.sum(axis=1).tolist()
+
+    def subscale_scores(self, subscales):
+        """Return a dict of the list of the sum scores of each row keyed by subscale name"""
+        return {name: self.sum_scores(column_names) for name, column_names in subscales.items()}
@@ -0,0 +1,44 @@
+from keypath_extractor import Keypath
+
+
+class SubtypeKeypaths:
+    """
+    The nested keypaths of a question with subtypes, e.g. FREQ1-1...FREQ5-12 or WILLM and WILLT,
+    stored compactly as the base keypaths and the subtype data keys. It can be used as a list
+    with one list of keypaths per subtype; each subtype's keypaths, e.g. data.FREQ1-1.answers.FE.answer,
+    are only created the first time the subtype is used. One instance is shared by every extractor
+    of a question class so the keypaths are built at most once per class.
+    """
+
+    # dict of SubtypeKeypaths keyed by question extractor class
+    shared = {}
+
+    def __init__(self, subtype_keys, keypaths):
+        self.subtype_keys = subtype_keys
+        self.keypaths = keypaths
+        self.subtype_keypaths = [None] * len(subtype_keys)
+
+    @classmethod
+    def for_class(cls, extractor_class, subtype_keys, keypaths):
+        if extractor_class not in cls.shared:
+            cls.shared[extractor_class] = cls(subtype_keys, keypaths)
+        return cls.shared[extractor_class]
+
+    def __len__(self):
+        return len(self.subtype_keys)
+
+    def __getitem__(self, index):
+        if self.subtype_keypaths[index] is None:
+            self.subtype_keypaths[index] = self.create_subtype_keypaths(self.subtype_keys[index])
+        return self.subtype_keypaths[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def create_subtype_keypaths(self, subtype_key):
+        return [
+            Keypath('.'.join(['data', subtype_key, keypath.source_keypath]), keypath.destination_keypath,
+                    is_optional=keypath.is_optional, transformer_fn=keypath.transformer_fn)
+            for keypath in self.keypaths
+        ]
@@ -1,53 +1,165 @@
 import os
 import re
 import json
-import pprint
-import requests
+import time
+import argparse
 import datetime
+import requests
+import concurrent.futures
+
+from journal import UploadJournal
+from multipart import MultipartUpload
+
+
+class CkanClient:
+    """
+    Call the CKAN action API through one requests.Session, so that its connections are kept
+    alive and reused, with a connection pool big enough for every upload thread. A request
+    that fails to connect or gets a 5xx response is retried after a backoff that doubles
+    with each attempt if its action can safely be sent again, so the body of a request must
+    be one that can be sent again, e.g. a MultipartUpload, which reads its file from the start
+    each time it is sent. resource_create is not retried, because CKAN may have created the
+    resource before a proxy answered with a 502 or 504: add_ckan_resource retries it instead.
+    """
+
+    # The actions that have the same outcome when a request is sent again. A package_create
+    # that succeeded gets a CONFLICT response when it is sent again, and the dataset is updated.
+    retried_actions = {'package_create', 'package_update', 'package_show', 'resource_update'}
+
+    def __init__(self, api_url, api_key, pool_size=8, retries=3, backoff=0.5, timeout=60):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def post(self, action, headers=None, **request_kwargs):
+        url = '{}/action/{}'.format(self.api_url, action)
+        headers = dict(headers or {}, Authorization=self.api_key)
+        retries = self.retries if action in self.retried_actions else 0
+        for attempt in range(retries + 1):
+            try:
+                response = self.session.post(url, headers=headers, timeout=self.timeout, **request_kwargs)
+            except requests.ConnectionError:
+                if attempt == retries:
+                    raise
+            else:
+                if response.status_code < 500 or attempt == retries:
+                    return response
+            self.back_off(attempt)
+
+    def back_off(self, attempt):
+        time.sleep(self.backoff * 2 ** attempt)
+
+    def close(self):
+        self.session.close()
 
-from settings import CKAN_API_URL, CKAN_API_KEY, CSV_PATH
 
+def get_action_result(response, action, name):
+    """
+    Return the result of a CKAN action, or raise requests.HTTPError naming the action, the
+    dataset or resource it was called for and the status of the response if it failed
+    """
+    if response.status_code == 200:
+        response_dict = response.json()
+        if response_dict['success'] is True:
+            return response_dict['result']
+    raise requests.HTTPError('{} of {} failed: {} {}'.format(action, name, response.status_code, response.reason),
+                             response=response)
 
-def create_or_update_ckan_dataset(dataset_dict):
-    url = CKAN_API_URL + '/action/package_create'
+
+def create_or_update_ckan_dataset(client, dataset_dict):
     data = json.dumps(dataset_dict).encode('utf-8')
     headers = {
-        'Authorization': CKAN_API_KEY,
         'content-type': 'application/json',
     }
-    response = requests.post(url, data=data, headers=headers)
-    response_dict = response.json()
-    if response_dict['success'] is False:
-        if response.reason == 'CONFLICT':
-            url = CKAN_API_URL + '/action/package_update'
-            response = requests.post(url, data=data, headers=headers)
-            response_dict = response.json()
-    assert response.status_code == 200
-    assert response_dict['success'] is True
-    created_dataset = response_dict['result']
+    action = 'package_create'
+    response = client.post(action, data=data, headers=headers)
+    # CKAN answers a package_create of a dataset that already exists with a conflict
+    if response.status_code == 409:
+        action = 'package_update'
+        response = client.post(action, data=data, headers=headers)
+    created_dataset = get_action_result(response, action, 'dataset {}'.format(dataset_dict['name']))
     return created_dataset
 
 
-def add_ckan_resource(dataset_name, resource_name, resource_path):
+def get_resource_dict(dataset_name, resource_name, compress=False):
     resource_title = resource_name.upper()
     resource_dict = {
         'name': resource_name,
         'title': resource_title,
         'package_id': dataset_name,
-        'mimetype': 'text/csv',
-    }
-    url = CKAN_API_URL + '/action/resource_create'
-    data = resource_dict
-    headers = {
-        'Authorization': CKAN_API_KEY,
+        'mimetype': 'application/gzip' if compress else 'text/csv',
     }
-    files = [('upload', open(resource_path, 'r', encoding='utf-8'))]
-    response = requests.post(url, data=data, headers=headers, files=files)
-    response_dict = response.json()
-    created_resource = response_dict['result']
+    return resource_dict
+
+
+def is_compressed(resource_path, compress):
+    """Only CSV files are compressed"""
+    return compress and str(resource_path).endswith('.csv')
+
+
+def upload_ckan_resource(client, action, resource_dict, resource_path, compress=False):
+    """Stream a file to a CKAN resource action, gzipping it on the fly if compress is set"""
+    with MultipartUpload(resource_dict, 'upload', resource_path, compress=compress) as upload:
+        response = client.post(action, data=upload, headers={'Content-Type': upload.content_type})
+    return response
+
+
+def get_ckan_dataset(client, dataset_name):
+    data = json.dumps({'id': dataset_name}).encode('utf-8')
+    response = client.post('package_show', data=data, headers={'content-type': 'application/json'})
+    return get_action_result(response, 'package_show', 'dataset {}'.format(dataset_name))
+
+
+def add_ckan_resource(client, dataset_name, resource_name, resource_path, compress=False, existing_resource_ids=()):
+    """
+    Upload a file to a new resource. A resource_create that fails to connect or gets a 5xx
+    response may still have created the resource, so before it is retried the dataset is
+    checked for a resource of the file that is not one of the existing_resource_ids, the
+    resources of the dataset before the upload: if there is one the file is uploaded to it.
+    """
+    compress = is_compressed(resource_path, compress)
+    data = get_resource_dict(dataset_name, resource_name, compress)
+    for attempt in range(client.retries + 1):
+        if attempt:
+            client.back_off(attempt - 1)
+            dataset = get_ckan_dataset(client, dataset_name)
+            resource_id = find_resource_id(dataset, resource_name, resource_path.name, existing_resource_ids)
+            if resource_id:
+                resource = update_ckan_resource(client, resource_id, dataset_name, resource_name, resource_path, compress)
+                if resource:
+                    return resource
+        try:
+            response = upload_ckan_resource(client, 'resource_create', data, resource_path, compress)
+        except requests.ConnectionError:
+            if attempt == client.retries:
+                raise
+        else:
+            if response.status_code < 500:
+                break
+    # The response of the last attempt if every attempt got a 5xx response
+    created_resource = get_action_result(
+        response, 'resource_create', 'resource {} of dataset {}'.format(resource_name, dataset_name))
     return created_resource
 
 
+def update_ckan_resource(client, resource_id, dataset_name, resource_name, resource_path, compress=False):
+    """Upload a file to an existing resource; return the resource, or None if there is no resource with the id"""
+    compress = is_compressed(resource_path, compress)
+    data = dict(get_resource_dict(dataset_name, resource_name, compress), id=resource_id)
+    response = upload_ckan_resource(client, 'resource_update', data, resource_path, compress)
+    if response.status_code == 404:
+        return None
+    updated_resource = get_action_result(
+        response, 'resource_update', 'resource {} of dataset {}'.format(resource_name, dataset_name))
+    return updated_resource
+
+
 def get_formatted_date(dataset_title):
     date_digits = dataset_title.split('-')[0]    # '200818'
     ddmmyy_list = re.findall('..', date_digits)  # ['20', '08', '18']
@@ -56,8 +168,7 @@ def get_formatted_date(dataset_title):
     return formatted_date                        # '20 August 2018'
 
 
-def create_dataset(dataset_path, dataset_name):
-    print('CREATE CKAN DATASET: {}'.format(dataset_path))
+def get_dataset_dict(dataset_name):
     dataset_title = dataset_name.upper()
     dataset_date = get_formatted_date(dataset_title)
     description = 'The Food Control app data for user ID {} on {}.'.format(dataset_title, dataset_date)
@@ -68,16 +179,141 @@ def create_dataset(dataset_path, dataset_name):
         'notes': description,
         'owner_org': owner_organization,
     }
-    created_dataset = create_or_update_ckan_dataset(dataset_dict)
-    # pprint.pprint(created_dataset)
+    return dataset_dict
+
+
+def create_dataset(client, executor, dataset_path, dataset_name, compress=False):
+    """
+    Create or update the dataset of an export folder and submit the upload of each of its
+    files to the executor. Return the futures of the uploads rather than waiting for them,
+    so that the uploads of this dataset and of the others share the executor's threads.
+    """
+    print('CREATE CKAN DATASET: {}'.format(dataset_path))
+    dataset = create_or_update_ckan_dataset(client, get_dataset_dict(dataset_name))
+    resource_ids = get_resource_ids(dataset)
     csv_filenames = os.listdir(dataset_path)
+    resource_futures = []
     for csv_filename in csv_filenames:
         resource_path = dataset_path / csv_filename
         print('\tADD CKAN RESOURCE: {}'.format(resource_path))
         resource_name = csv_filename.split('.')[0]
-        add_ckan_resource(dataset_name, resource_name, resource_path)
+        resource_futures.append(executor.submit(
+            add_ckan_resource, client, dataset_name, resource_name, resource_path, compress, resource_ids))
+    return resource_futures
+
+
+def get_resource_ids(dataset):
+    return {resource['id'] for resource in dataset.get('resources', [])}
+
+
+def find_resource_id(dataset, resource_name, filename, excluded_resource_ids=()):
+    """
+    Return the id of the resource of a dataset that a file was uploaded to without being
+    journalled, e.g. by an import without --sync or by a resource_create that failed after
+    the resource was created, or None if there is no such resource.
+    The file may have been uploaded compressed, as <filename>.gz.
+    """
+    uploaded_filenames = {filename.lower(), filename.lower() + '.gz'}
+    for resource in dataset.get('resources', []):
+        uploaded_filename = resource.get('url', '').rsplit('/', 1)[-1]
+        if resource['id'] in excluded_resource_ids:
+            continue
+        if resource['name'] == resource_name and uploaded_filename.lower() in uploaded_filenames:
+            return resource['id']
+    return None
+
+
+def sync_dataset(client, executor, journal, dataset_path, dataset_name, compress=False):
+    """
+    Create or update the dataset of an export folder if any of its files are new or have
+    changed since they were uploaded, and submit the upload of each of those files to the
+    executor. A changed file is uploaded to its resource and a new file to a new resource.
+    Return the futures of the uploads, as create_dataset does.
+    """
+    changed_files = []
+    for filename in os.listdir(dataset_path):
+        file_state = journal.find_change(dataset_name, filename, dataset_path / filename)
+        if file_state:
+            changed_files.append((filename, file_state))
+    if not changed_files:
+        print('UNCHANGED CKAN DATASET: {}'.format(dataset_path))
+        return []
+    print('SYNC CKAN DATASET: {}'.format(dataset_path))
+    dataset = create_or_update_ckan_dataset(client, get_dataset_dict(dataset_name))
+    resource_ids = get_resource_ids(dataset)
+    resource_futures = []
+    for filename, file_state in changed_files:
+        resource_name = filename.split('.')[0]
+        resource_id = journal.get_resource_id(dataset_name, filename) or find_resource_id(dataset, resource_name, filename)
+        resource_futures.append(executor.submit(
+            sync_ckan_resource, client, journal, dataset_name, resource_name, dataset_path / filename, file_state,
+            resource_id, compress, resource_ids))
+    return resource_futures
+
+
+def sync_ckan_resource(client, journal, dataset_name, resource_name, resource_path, file_state, resource_id=None,
+                       compress=False, existing_resource_ids=()):
+    """Upload a file to its resource, or to a new resource if it has none or it was deleted, and journal the upload"""
+    resource = None
+    if resource_id:
+        print('\tUPDATE CKAN RESOURCE: {}'.format(resource_path))
+        resource = update_ckan_resource(client, resource_id, dataset_name, resource_name, resource_path, compress)
+    if resource is None:
+        print('\tADD CKAN RESOURCE: {}'.format(resource_path))
+        resource = add_ckan_resource(client, dataset_name, resource_name, resource_path, compress, existing_resource_ids)
+    journal.record(dataset_name, resource_path.name, file_state, resource['id'])
+    return resource
+
+
+def import_datasets(client, csv_path, workers=8, journal=None, compress=False):
+    """
+    Create a dataset for each export folder in csv_path and upload its files, using a pool
+    of worker threads for both. With a journal only the new and changed files are uploaded,
+    and with compress the CSV files are gzipped as they are uploaded.
+    Return the number of resources uploaded; the first upload that fails raises its exception
+    once the submitted uploads have finished.
+    """
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        if journal:
+            dataset_futures = [
+                executor.submit(sync_dataset, client, executor, journal, csv_path / filename, filename, compress)
+                for filename in os.listdir(csv_path)
+            ]
+        else:
+            dataset_futures = [
+                executor.submit(create_dataset, client, executor, csv_path / filename, filename, compress)
+                for filename in os.listdir(csv_path)
+            ]
+        resource_futures = []
+        for dataset_future in dataset_futures:
+            resource_futures.extend(dataset_future.result())
+        for resource_future in resource_futures:
+            resource_future.result()
+    return len(resource_futures)
+
+
+if __name__ == '__main__':
+    # The settings are only needed to run the import, not to use its functions
+    from settings import CKAN_API_URL, CKAN_API_KEY, CSV_PATH
 
+    parser = argparse.ArgumentParser(description='Upload the extracted CSV files to CKAN')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='the number of datasets and files to upload at the same time')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='the number of times to retry a request that fails to connect or gets a 5xx response')
+    parser.add_argument('--sync', metavar='JOURNAL',
+                        help='only upload the files that are new or have changed since they were journalled in JOURNAL, '
+                             'updating the resources of changed files; an interrupted sync resumes from the journal')
+    parser.add_argument('--gzip', action='store_true',
+                        help='gzip the CSV files as they are uploaded, as <filename>.gz resources')
+    args = parser.parse_args()
 
-filenames = os.listdir(CSV_PATH)
-for filename in filenames:
-    create_dataset(CSV_PATH / filename, filename)
+    ckan_client = CkanClient(CKAN_API_URL, CKAN_API_KEY, pool_size=args.workers, retries=args.retries)
+    upload_journal = UploadJournal(args.sync) if args.sync else None
+    try:
+        resource_count = import_datasets(ckan_client, CSV_PATH, args.workers, upload_journal, args.gzip)
+    finally:
+        ckan_client.close()
+        if upload_journal:
+            upload_journal.close()
+    print('UPLOADED {} CKAN RESOURCES'.format(resource_count))
@@ -0,0 +1,83 @@
+import os
+import json
+import hashlib
+import threading
+from collections import namedtuple
+
+# The state of a file when it was uploaded: its size, modification time in nanoseconds and SHA-256 digest
+FileState = namedtuple('FileState', ['size', 'mtime', 'sha256'])
+
+
+class UploadJournal:
+    """
+    The files of each dataset that have been uploaded to CKAN, with the state of each file
+    when it was uploaded and the id of the CKAN resource it was uploaded to. A file is only
+    uploaded again once it has changed: a file with the same size and modification time is
+    unchanged, and otherwise its SHA-256 digest decides, so a file that was written again
+    with the same content is not uploaded again. Each upload is appended to the journal file
+    as a line of JSON as soon as it has finished, so a synchronisation that crashes resumes
+    from the last upload. The journal is rewritten with one line per file when it is opened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}  # dict of dict of file state and resource id keyed by (dataset name, filename)
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as journal_file:
+                for line in journal_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # The line being written when a synchronisation crashed
+                        continue
+                    self.entries[(entry['dataset'], entry['filename'])] = entry
+        self.compact()
+        self.journal_file = open(path, 'a', encoding='utf-8')
+
+    def compact(self):
+        """Rewrite the journal with the last entry of each file only"""
+        temporary_path = '{}.tmp'.format(self.path)
+        with open(temporary_path, 'w', encoding='utf-8') as journal_file:
+            for entry in self.entries.values():
+                journal_file.write(json.dumps(entry) + '\n')
+        os.replace(temporary_path, self.path)
+
+    @staticmethod
+    def hash_file(path, chunk_size=1024 * 1024):
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as uploaded_file:
+            for chunk in iter(lambda: uploaded_file.read(chunk_size), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def get_resource_id(self, dataset_name, filename):
+        entry = self.entries.get((dataset_name, filename))
+        return entry['resource_id'] if entry else None
+
+    def find_change(self, dataset_name, filename, path):
+        """
+        Return the FileState of a file that is new or has changed since it was uploaded,
+        or None if it is unchanged. The digest is only computed when the size or the
+        modification time differ; a file with the same digest is recorded with its new
+        modification time, so it is not hashed again.
+        """
+        stat = os.stat(path)
+        entry = self.entries.get((dataset_name, filename))
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            return None
+        file_state = FileState(stat.st_size, stat.st_mtime_ns, self.hash_file(path))
+        if entry and entry['sha256'] == file_state.sha256:
+            self.record(dataset_name, filename, file_state, entry['resource_id'])
+            return None
+        return file_state
+
+    def record(self, dataset_name, filename, file_state, resource_id):
+        entry = dict(file_state._asdict(), dataset=dataset_name, filename=filename, resource_id=resource_id)
+        with self.lock:
+            self.entries[(dataset_name, filename)] = entry
+            self.journal_file.write(json.dumps(entry) + '\n')
+            self.journal_file.flush()
+
+    def close(self):
+        self.journal_file.close()
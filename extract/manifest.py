@@ -0,0 +1,52 @@
+import os
+import json
+from collections import defaultdict
+
+
+class RowManifest:
+    """
+    The rows each extractor has already processed into an output folder, identified by their
+    (userId, sessionId, creationDate) key and saved as JSON in the folder between runs. An
+    incremental extraction skips the rows in the manifest, appends the new rows to the CSV
+    files and adds their keys, so overlapping exports are only processed once.
+    """
+
+    filename = 'manifest.json'
+
+    def __init__(self, folder):
+        self.path = folder / self.filename
+        self.keys = defaultdict(set)  # dict of set of row keys keyed by extractor filename
+        self.new_row_count = 0
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as manifest_file:
+                for extractor_filename, keys in json.load(manifest_file).items():
+                    self.keys[extractor_filename] = set(tuple(key) for key in keys)
+
+    @staticmethod
+    def get_key(row):
+        return row['userId'], row['sessionId'], row['creationDate']
+
+    def has_row(self, extractor, row):
+        return self.get_key(row) in self.keys[extractor.get_filename()]
+
+    def add_row(self, extractor, row):
+        self.keys[extractor.get_filename()].add(self.get_key(row))
+        self.new_row_count += 1
+
+    def has_extractor(self, extractor):
+        """Return True if rows of the extractor were processed by an earlier run"""
+        return bool(self.keys.get(extractor.get_filename()))
+
+    def forget_extractor(self, extractor):
+        self.keys.pop(extractor.get_filename(), None)
+
+    def save(self):
+        """Write the manifest to a temporary file and move it into place, so a crash cannot leave half a manifest"""
+        temporary_path = self.path.with_name(self.filename + '.tmp')
+        with open(temporary_path, 'w', encoding='utf-8') as manifest_file:
+            # The keys are sorted by their JSON text, because a key's values may be of mixed
+            # types, e.g. a None sessionId and an int sessionId, which cannot be compared
+            json.dump({
+                extractor_filename: sorted(keys, key=json.dumps) for extractor_filename, keys in self.keys.items()
+            }, manifest_file)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,87 @@
+import os
+import uuid
+import zlib
+
+
+class MultipartUpload:
+    """
+    A multipart/form-data request body of text fields and one file, for requests to stream
+    as it iterates over it rather than read into memory. The file is read in binary chunks
+    and, if compress is set, gzipped on the fly and uploaded as <filename>.gz. The length of
+    an uncompressed body is known up front and sent as its Content-Length; a compressed body
+    is sent with chunked transfer encoding. Each iteration reads the file from the start, so
+    a failed request can be sent again, and the file is closed at the end of each iteration
+    or when the upload is closed, which the with statement does:
+
+        with MultipartUpload(fields, 'upload', path) as upload:
+            session.post(url, data=upload, headers={'Content-Type': upload.content_type})
+    """
+
+    chunk_size = 64 * 1024
+
+    compression_level = 6
+
+    def __init__(self, fields, file_field_name, file_path, file_content_type='text/csv', compress=False):
+        self.file_path = file_path
+        self.compress = compress
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={}'.format(self.boundary)
+        filename = os.path.basename(file_path)
+        if compress:
+            filename += '.gz'
+            file_content_type = 'application/gzip'
+        self.filename = filename
+        parts = []
+        for name, value in fields.items():
+            parts.append('--{}\r\nContent-Disposition: form-data; name="{}"\r\n\r\n{}\r\n'.format(
+                self.boundary, self.quote(name), value))
+        parts.append('--{}\r\nContent-Disposition: form-data; name="{}"; filename="{}"\r\nContent-Type: {}\r\n\r\n'.format(
+            self.boundary, self.quote(file_field_name), self.quote(filename), file_content_type))
+        self.preamble = ''.join(parts).encode('utf-8')
+        self.epilogue = '\r\n--{}--\r\n'.format(self.boundary).encode('utf-8')
+        self.chunks = None
+
+    @staticmethod
+    def quote(value):
+        return value.replace('\\', '\\\\').replace('"', '\\"')
+
+    def __len__(self):
+        """Return the length of the body, or 0 when it is compressed and so unknown until it has been sent"""
+        if self.compress:
+            return 0
+        return len(self.preamble) + os.path.getsize(self.file_path) + len(self.epilogue)
+
+    def __bool__(self):
+        # A compressed body has no length but is not empty
+        return True
+
+    def __iter__(self):
+        self.close()
+        self.chunks = self.iterate_chunks()
+        return self.chunks
+
+    def iterate_chunks(self):
+        yield self.preamble
+        with open(self.file_path, 'rb') as upload_file:
+            compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if self.compress else None
+            for chunk in iter(lambda: upload_file.read(self.chunk_size), b''):
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                    if not chunk:
+                        continue
+                yield chunk
+            if compressor:
+                yield compressor.flush()
+        yield self.epilogue
+
+    def close(self):
+        """Close the file of an iteration that was not finished, e.g. of a request that failed"""
+        if self.chunks is not None:
+            self.chunks.close()
+            self.chunks = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,302 @@
+import os
+import csv
+import sqlite3
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# The value extractors use for a missing, blank or null cell (DataExtractor.EMPTY_CELL_VALUE)
+EMPTY_CELL_VALUE = '[]'
+
+
+def unique_column_names(column_names):
+    """
+    Number each column name from its second occurrence on, e.g. Eligibility's second
+    'Allergies' column becomes 'Allergies 2', for outputs that need unique column names
+    """
+    unique_names = []
+    occurrences = {}
+    for column_name in column_names:
+        occurrences[column_name] = occurrences.get(column_name, 0) + 1
+        if occurrences[column_name] > 1:
+            column_name = '{} {}'.format(column_name, occurrences[column_name])
+        unique_names.append(column_name)
+    return unique_names
+
+
+class CsvOutput:
+    """
+    The CSV file written by one extractor. The column header row is written when the
+    file is opened, so the data rows never need to be read back to prepend it, and
+    the data rows are buffered and written in batches.
+    """
+
+    batch_size = 1000
+
+    def __init__(self, output_filename, column_names, append=False):
+        self.output_filename = output_filename
+        self.append = append
+        if append:
+            # Append to the rows of an earlier run, which must have the same columns
+            self.check_column_names(output_filename, column_names)
+            self.csv_file = open(output_filename, 'a', encoding='utf-8')
+            self.csv_writer = csv.writer(self.csv_file, quoting=csv.QUOTE_NONNUMERIC, lineterminator='\n')
+        else:
+            self.csv_file = open(output_filename, 'w', encoding='utf-8')
+            self.csv_writer = csv.writer(self.csv_file, quoting=csv.QUOTE_NONNUMERIC, lineterminator='\n')
+            self.csv_writer.writerow(column_names)
+        self.rows = []
+
+    @staticmethod
+    def check_column_names(output_filename, column_names):
+        with open(output_filename, 'r', encoding='utf-8') as csv_file:
+            header = next(csv.reader(csv_file), [])
+        if header != list(column_names):
+            raise ValueError('the columns of {} have changed; extract it again without --incremental'.format(output_filename))
+
+    def write_rows(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.csv_writer.writerows(self.rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.csv_file.close()
+
+
+class ParquetOutput:
+    """
+    The Parquet file written by one extractor, with the same interface as CsvOutput. Unlike
+    the CSV file its columns are typed (bool, int64, double or string) and an empty cell is
+    a null rather than '[]'. The rows are buffered and each batch is written as a row group.
+    The type of each column is inferred from the first row group, so a column that is empty
+    in every row of it is a string column. When a later row group has a value that does not
+    fit a column's type the column is widened, from int64 to double to string, or from bool
+    to string, and the row groups already written are rewritten with the wider types: an int
+    in a double column is stored as a double and any value in a string column as its CSV text.
+    A column name that occurs more than once, e.g. Eligibility's 'Allergies', is numbered
+    from its second occurrence on, e.g. 'Allergies 2', because Parquet column names are unique.
+    PyArrow is optional: check is_available before using this class.
+    """
+
+    batch_size = 10000
+
+    compression = 'snappy'
+
+    def __init__(self, output_filename, column_names):
+        self.output_filename = output_filename
+        self.column_names = unique_column_names(column_names)
+        self.parquet_writer = None
+        # The file being written, which is a temporary file once the columns have been widened
+        self.writer_filename = str(output_filename)
+        self.schema = None
+        self.rows = []
+
+    @staticmethod
+    def is_available():
+        return pyarrow is not None
+
+    @staticmethod
+    def infer_type(values, column_type=None):
+        """Return the narrowest Arrow type of a column's values, and of the values of column_type, ignoring nulls"""
+        value_types = {type(value) for value in values if value is not None}
+        if column_type is not None:
+            value_types.add({pyarrow.bool_(): bool, pyarrow.int64(): int, pyarrow.float64(): float}.get(column_type, str))
+        if not value_types:
+            return pyarrow.string()
+        if value_types == {bool}:
+            return pyarrow.bool_()
+        if value_types == {int}:
+            return pyarrow.int64()
+        if value_types <= {int, float}:
+            return pyarrow.float64()
+        return pyarrow.string()
+
+    @staticmethod
+    def convert_values(values, column_type):
+        """Return a column's values converted to its type, which infer_type has made wide enough to hold them"""
+        if column_type == pyarrow.string():
+            return [value if value is None or type(value) is str else str(value) for value in values]
+        return values
+
+    def create_table(self, columns):
+        arrays = []
+        for field, column in zip(self.schema, columns):
+            arrays.append(pyarrow.array(self.convert_values(column, field.type), type=field.type))
+        return pyarrow.Table.from_arrays(arrays, schema=self.schema)
+
+    def write_rows(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows and self.parquet_writer is not None:
+            return
+        # Columns of values with nulls in place of the empty cell values
+        columns = [
+            [None if value == EMPTY_CELL_VALUE else value for value in column]
+            for column in zip(*self.rows)
+        ] or [[] for _ in self.column_names]
+        if self.schema is None:
+            self.schema = pyarrow.schema([
+                (column_name, self.infer_type(column)) for column_name, column in zip(self.column_names, columns)
+            ])
+            self.parquet_writer = pyarrow.parquet.ParquetWriter(
+                self.writer_filename, self.schema, compression=self.compression)
+        else:
+            schema = pyarrow.schema([
+                (field.name, self.infer_type(column, field.type)) for field, column in zip(self.schema, columns)
+            ])
+            if not schema.equals(self.schema):
+                self.widen(schema)
+        self.parquet_writer.write_table(self.create_table(columns))
+        self.rows = []
+
+    def widen(self, schema):
+        """
+        Change the schema to one with wider column types. A Parquet file has one schema, so the
+        row groups written so far are read back one at a time and written again with the wider
+        types to a temporary file, which is written to from now on and replaces the output file
+        when it is closed. A column is widened at most twice, so this happens at most a few times.
+        """
+        self.close_writer()
+        self.schema = schema
+        self.writer_filename = '{}.tmp'.format(self.output_filename)
+        self.parquet_writer = pyarrow.parquet.ParquetWriter(
+            self.writer_filename, self.schema, compression=self.compression)
+        with open(str(self.output_filename), 'rb') as parquet_file:
+            written_file = pyarrow.parquet.ParquetFile(parquet_file)
+            for index in range(written_file.num_row_groups):
+                row_group = written_file.read_row_group(index)
+                self.parquet_writer.write_table(self.create_table([column.to_pylist() for column in row_group.columns]))
+
+    def close_writer(self):
+        self.parquet_writer.close()
+        if self.writer_filename != str(self.output_filename):
+            os.replace(self.writer_filename, str(self.output_filename))
+
+    def close(self):
+        self.flush()
+        self.close_writer()
+
+
+class SqliteOutput:
+    """
+    The table of one extractor in an SQLite database shared by every export, with the same
+    interface as CsvOutput. The table has the extractor's columns, numbered as for Parquet
+    where a name repeats, after an Export column naming the export folder the row came from.
+    It is created with indexes on User ID and Session ID the first time it is written, and
+    the rows of an export written by an earlier run are deleted unless the new rows are
+    appended to them, as in incremental mode, so extracting an export again replaces its rows.
+    The rows are buffered and each batch is inserted with executemany in one transaction.
+    As in a Parquet file an empty cell is a NULL, and a list value is stored as its CSV text.
+    """
+
+    batch_size = 1000
+
+    # How long, in seconds, to wait for another process writing to the database
+    timeout = 60
+
+    export_column_name = 'Export'
+
+    def __init__(self, database_filename, table_name, column_names, export_name, append=False):
+        self.table_name = table_name
+        self.export_name = export_name
+        self.column_names = [self.export_column_name] + unique_column_names(column_names)
+        self.connection = sqlite3.connect(str(database_filename), timeout=self.timeout)
+        # Let the database be read while an export is being written to it
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        try:
+            with self.connection:
+                # Lock the database before looking for the table so that only one process creates it
+                self.connection.execute('BEGIN IMMEDIATE')
+                self.create_table()
+                if not append:
+                    self.connection.execute('DELETE FROM {} WHERE {} = ?'.format(
+                        self.quote(table_name), self.quote(self.export_column_name)), [export_name])
+        except Exception:
+            self.connection.close()
+            raise
+        self.insert_sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            self.quote(table_name),
+            ', '.join(self.quote(column_name) for column_name in self.column_names),
+            ', '.join('?' for _ in self.column_names))
+        self.rows = []
+
+    @staticmethod
+    def quote(identifier):
+        return '"{}"'.format(identifier.replace('"', '""'))
+
+    def create_table(self):
+        table_columns = [row[1] for row in self.connection.execute('PRAGMA table_info({})'.format(self.quote(self.table_name)))]
+        if table_columns:
+            if table_columns != self.column_names:
+                raise ValueError('the columns of table {} have changed; delete the table or use another database'.format(
+                    self.table_name))
+            return
+        table = self.quote(self.table_name)
+        self.connection.execute('CREATE TABLE {} ({})'.format(
+            table, ', '.join(self.quote(column_name) for column_name in self.column_names)))
+        for index_columns in [['User ID', 'Session ID'], ['Session ID'], [self.export_column_name]]:
+            self.connection.execute('CREATE INDEX {} ON {} ({})'.format(
+                self.quote('{} {}'.format(self.table_name, ' '.join(index_columns))), table,
+                ', '.join(self.quote(column_name) for column_name in index_columns)))
+
+    def write_rows(self, rows):
+        for row in rows:
+            values = [self.export_name]
+            for value in row:
+                if value == EMPTY_CELL_VALUE:
+                    value = None
+                elif type(value) in (list, dict):
+                    value = str(value)
+                values.append(value)
+            self.rows.append(values)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            with self.connection:
+                self.connection.executemany(self.insert_sql, self.rows)
+            self.rows = []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.connection.close()
+
+
+class TeeOutput:
+    """Write the rows of one extractor to several outputs, e.g. a CsvOutput and a ParquetOutput"""
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def write_rows(self, rows):
+        for output in self.outputs:
+            output.write_rows(rows)
+
+    def flush(self):
+        for output in self.outputs:
+            output.flush()
+
+    def close(self):
+        # Close every output even if closing one of them fails
+        first_error = None
+        for output in self.outputs:
+            try:
+                output.close()
+            except Exception as error:
+                first_error = first_error or error
+        if first_error:
+            raise first_error
@@ -0,0 +1,365 @@
+"""
+Create synthetic Food Control JSON exports for benchmarking and testing the extraction.
+Each user gets one eligibility and additional info row, and each of their sessions gets a
+row of every game type, STOP game sessions of 4 rounds of 48 trials with raw events, and a
+row of every questionnaire. The rows are created from a seeded random number generator so
+the same arguments always create the same export.
+"""
+import json
+import random
+import argparse
+
+from settings import JSON_PATH
+
+STOP_GAME_TYPES = ['STOP', 'RESTRAINT', 'NASTOP', 'NARESTRAINT', 'GSTOP', 'GRESTRAINT', 'DOUBLE']
+
+TAP_RESPONSE_POINTS = {
+    'CORRECT_GO': 20,
+    'INCORRECT_GO': -50,
+    'MISS_GO': -20,
+    'CORRECT_STOP': 50,
+    'INCORRECT_STOP': -50,
+    'MISS_STOP': -50,
+}
+
+RAW_EVENT_NAMES = ['touchstart', 'touchend', 'touchmove', 'stimulus', 'stopsignal']
+
+# The first creation date of an export, in milliseconds
+FIRST_CREATION_DATE = 1530000000000
+
+
+class SyntheticExport:
+    """
+    A synthetic export of users x sessions. rounds and trials_per_round set the size of
+    the STOP game sessions, and the creation date of each row is a little after the last.
+    """
+
+    study_id = 'SYNTHETIC'
+
+    def __init__(self, users=10, sessions=2, rounds=4, trials_per_round=48, seed=0):
+        self.users = users
+        self.sessions = sessions
+        self.rounds = rounds
+        self.trials_per_round = trials_per_round
+        self.random = random.Random(seed)
+        self.creation_date = FIRST_CREATION_DATE
+
+    def create_rows(self):
+        rows = []
+        for user_number in range(self.users):
+            user_id = 'USER{:05d}'.format(user_number)
+            rows.append(self.create_row('eligibility', user_id, 0, self.create_eligibility_data()))
+            rows.append(self.create_row('additional-info', user_id, 0, self.create_additional_info_data()))
+            for session_id in range(self.sessions):
+                rows += self.create_session_rows(user_id, session_id)
+        return rows
+
+    def create_session_rows(self, user_id, session_id):
+        rows = []
+        for game_type in STOP_GAME_TYPES:
+            game_session_id = '{}-{}-{}'.format(user_id, game_type, session_id)
+            rows.append(self.create_row(game_type, user_id, session_id, [self.create_stop_data(game_session_id, game_type)]))
+        rows.append(self.create_row('MCII', user_id, session_id, self.create_mcii_data()))
+        rows.append(self.create_row('GOALVIS', user_id, session_id, self.create_goalvis_data()))
+        rows.append(self.create_row('measures', user_id, session_id, self.create_measures_data()))
+        rows.append(self.create_row('virtual-supermarket-selected', user_id, session_id, self.create_virtual_supermarket_data()))
+        for question_data in self.create_questionnaire_data():
+            question_data['TUMsessionID'] = 'TUM-{}-{}'.format(user_id, session_id)
+            rows.append(self.create_row('tellusmore', user_id, session_id, question_data))
+        return rows
+
+    def create_row(self, row_type, user_id, session_id, data):
+        self.creation_date += self.random.randint(5000, 60000)
+        return {
+            'type': row_type,
+            'studyId': self.study_id,
+            'userId': user_id,
+            'sessionId': session_id,
+            'captureDate': self.creation_date,
+            'creationDate': self.creation_date,
+            'data': data,
+        }
+
+    # Games
+    def create_stop_data(self, game_session_id, game_type):
+        session_start = self.creation_date
+        session_events = self.create_stop_session_events(game_session_id, is_double=game_type == 'DOUBLE')
+        return {
+            'sessionState': 'COMPLETE',
+            'sessionStart': session_start,
+            'sessionEnd': session_events[-1]['trialEnd'] + 1000,
+            'captureDate': session_start,
+            'sessionEvents': session_events,
+            'rawEvents': [
+                {'eventOn': self.random.choice(RAW_EVENT_NAMES), 'eventOff': self.random.choice(RAW_EVENT_NAMES)}
+                for _ in range(len(session_events) * 2)
+            ],
+        }
+
+    def create_stop_session_events(self, game_session_id, is_double=False):
+        session_events = []
+        points_running_total = 0
+        trial_start = self.creation_date + 1000
+        for round_id in range(1, self.rounds + 1):
+            for trial_id in range(1, self.trials_per_round + 1):
+                is_stop_trial = self.random.random() < 0.25
+                item_position_x = self.random.uniform(100, 500)
+                item_position_y = self.random.uniform(100, 800)
+                session_event = {
+                    'gameSessionID': game_session_id,
+                    'roundID': round_id,
+                    'trialID': trial_id,
+                    'trialType': ('DOUBLE' if is_double else 'STOP') if is_stop_trial else 'GO',
+                    'itemType': self.random.choice(['HEALTHY', 'NON_HEALTHY']),
+                    'itemID': '{}_{}'.format(self.random.choice(['1', '2']), self.random.randint(1, 30)),
+                    'selected': self.random.choice(['random', 'MB', 'user', 'upload']),
+                    'trialStart': trial_start,
+                    'trialEnd': trial_start + self.random.randint(900, 1200),
+                    'stimulusOnset': trial_start + 10,
+                    'stimulusOffset': trial_start + 800,
+                    'stopSignalDelay': 250 if is_stop_trial else None,
+                    'stopSignalOnset': trial_start + 260 if is_stop_trial else None,
+                    'stopSignalOffset': trial_start + 600 if is_stop_trial else None,
+                    'itemPositionX': item_position_x,
+                    'itemPositionY': item_position_y,
+                }
+                if is_double:
+                    points = self.add_double_tap_responses(session_event, is_stop_trial)
+                else:
+                    points = self.add_tap_response(session_event, is_stop_trial)
+                points_running_total += points
+                session_event['pointsThisTrial'] = points
+                session_event['pointsRunningTotal'] = points_running_total
+                session_events.append(session_event)
+                trial_start += 1300
+        return session_events
+
+    def add_tap_response(self, session_event, is_stop_trial):
+        """Add a tap response to a STOP game trial and return the points it scores"""
+        if is_stop_trial:
+            tap_response_type = self.random.choices(['CORRECT_STOP', 'INCORRECT_STOP', 'MISS_STOP'], [0.5, 0.4, 0.1])[0]
+        else:
+            tap_response_type = self.random.choices(['CORRECT_GO', 'INCORRECT_GO', 'MISS_GO'], [0.85, 0.05, 0.1])[0]
+        tap_response_start = None
+        if tap_response_type not in ('INCORRECT_GO', 'CORRECT_STOP'):
+            tap_response_start = self.random.randint(250, 700)
+        if tap_response_type.startswith('MISS'):
+            offset_x, offset_y = 300, 300
+        else:
+            offset_x, offset_y = self.random.uniform(-40, 40), self.random.uniform(-40, 40)
+        session_event.update({
+            'tapResponseType': tap_response_type,
+            'tapResponseStart': tap_response_start,
+            # Tap response positions are exported as strings
+            'tapResponsePositionX': str(session_event['itemPositionX'] + offset_x),
+            'tapResponsePositionY': str(session_event['itemPositionY'] + offset_y),
+        })
+        return TAP_RESPONSE_POINTS[tap_response_type]
+
+    def add_double_tap_responses(self, session_event, is_double_trial):
+        """Add the initial and second tap responses to a DOUBLE game trial and return the points it scores"""
+        if is_double_trial:
+            initial_tap_response_type = 'CORRECT'
+            second_tap_response_type = self.random.choice(['CORRECT', 'INCORRECT'])
+            points = 50 if second_tap_response_type == 'CORRECT' else -50
+        else:
+            initial_tap_response_type = self.random.choice(['CORRECT_GO', 'CORRECT_GO', 'INCORRECT_GO'])
+            second_tap_response_type = 'N/A'
+            points = 20 if initial_tap_response_type == 'CORRECT_GO' else -20
+        initial_tap_response_start = self.random.randint(300, 600)
+        session_event.update({
+            'initialTapResponseType': initial_tap_response_type,
+            'initialTapResponseStart': initial_tap_response_start,
+            'initialTapResponsePositionX': session_event['itemPositionX'],
+            'initialTapResponsePositionY': session_event['itemPositionY'],
+            'secondTapResponseType': second_tap_response_type,
+            'secondTapResponseStart': self.random.randint(300, 600) if second_tap_response_type == 'CORRECT' else None,
+            'secondTapResponsePositionX': session_event['itemPositionX'],
+            'secondTapResponsePositionY': session_event['itemPositionY'],
+            'tapResponseType': initial_tap_response_type,
+            'tapResponseStart': initial_tap_response_start,
+        })
+        return points
+
+    def create_mcii_data(self):
+        plans = [
+            {'ifCode': 'IF{}'.format(plan), 'ifStatement': 'If I feel hungry', 'ifOption': plan,
+             'then': 'I will eat fruit', 'thenCode': 'THEN{}'.format(plan), 'thenOption': plan,
+             'visualiseTime': self.random.randint(5, 60), 'visualisePoints': self.random.randint(0, 10)}
+            for plan in range(1, 3)
+        ]
+        return {
+            # The session score is the sum of the visualise points of the plans
+            'sessionScore': sum(plan['visualisePoints'] for plan in plans),
+            'plans': plans,
+            'goals': [
+                {'goal': 'Eat healthily', 'goal-likelihood': self.random.randint(1, 5), 'outcome-thoughts': 'Feel better',
+                 'obstacle': 'Snacks', 'obstacle-thoughts': 'Avoid them'}
+            ],
+        }
+
+    def create_goalvis_data(self):
+        goals = [
+            {'goal': 'Eat healthily', 'goal-likelihood': self.random.randint(1, 5),
+             'visualiseTime': self.random.randint(5, 60), 'visualisePoints': self.random.randint(0, 10)}
+            for _ in range(2)
+        ]
+        return {
+            # The session score is the sum of the visualise points of the goals
+            'sessionScore': sum(goal['visualisePoints'] for goal in goals),
+            'goals': goals,
+        }
+
+    def create_measures_data(self):
+        return {
+            'emoji': self.random.randint(1, 5),
+            'fuel-gauge': round(self.random.random(), 2),
+            'last-eaten': self.random.choice(['', '1 hour ago', '3 hours ago']),
+        }
+
+    def create_virtual_supermarket_data(self):
+        return {
+            shop: {
+                'type': 'supermarket',
+                'name': shop,
+                'items': [
+                    {'id': item_id, 'name': 'Item {}'.format(item_id), 'selected': self.random.choice(['MB', 'random', 'upload'])}
+                    for item_id in range(1, 11)
+                ],
+            }
+            for shop in ['shop1', 'shop2']
+        }
+
+    def create_eligibility_data(self):
+        return {
+            'gender': self.random.choice(['male', 'female', 'other']),
+            'gender-other': '',
+            'dob': '1980-01-01',
+            'height': self.create_measurement(150, 200, 'cm'),
+            'weight': self.create_measurement(50, 120, 'kg'),
+            'allergies': 'no',
+            'allergies-other': '',
+            'eating-disorder': 'no',
+            'eating-disorder-other': '',
+            'bmi': round(self.random.uniform(18, 35), 1),
+            'age': self.random.randint(18, 65),
+            'eligible': True,
+            'height_cm': self.random.randint(150, 200),
+            'weight_kgs': self.random.randint(50, 120),
+        }
+
+    def create_additional_info_data(self):
+        return {
+            'first-language': 'English',
+            'first-language-other': '',
+            'ethnicity': 'prefer not to say',
+            'ethnicity-other': '',
+            'country': 'UK',
+            'hip': self.create_measurement(80, 120, 'cm'),
+            'waist': self.create_measurement(60, 110, 'cm'),
+            'health': 'good',
+            'health-other': '',
+            'weight-loss': 'yes',
+            'weight-loss-other': '',
+            'weight-loss-success': 'some',
+            'additional-details': '',
+            'smoking-status': 'never',
+            'smoking-status-other': '',
+            'weight-loss-success-other': '',
+            'waist_cm': self.random.randint(60, 110),
+            'hip_cm': self.random.randint(80, 120),
+        }
+
+    def create_measurement(self, minimum, maximum, units):
+        return {'unit1_val': self.random.randint(minimum, maximum), 'unit2_val': '', 'units': units}
+
+    # Questionnaires
+    def create_answers(self, number_of_scores, responses, missing=0.05):
+        """Return the S1..Sn answers of a questionnaire with a few left unanswered"""
+        return {
+            'S{}'.format(score): {'answer': self.random.choice(responses)}
+            for score in range(1, number_of_scores + 1) if self.random.random() >= missing
+        }
+
+    def create_subtype_question_data(self, prefix, subtypes, number_of_scores, responses):
+        """Return the data of one or two of the subtypes of a major character question, e.g. WILLM"""
+        return {
+            prefix + subtype: {'answers': self.create_answers(number_of_scores, responses), 'timeOnQuestion': self.random.randint(1, 30)}
+            for subtype in self.random.sample(subtypes, self.random.randint(1, min(2, len(subtypes))))
+        }
+
+    def create_major_minor_question_data(self, prefix, answers_fn):
+        """Return the data of about a fifth of the FREQ1-1...FREQ5-12 style subtypes of a major minor question"""
+        data = {}
+        for major in range(1, 6):
+            for minor in range(1, 13):
+                if self.random.random() < 0.2:
+                    data['{}{}-{}'.format(prefix, major, minor)] = {
+                        'answers': answers_fn(),
+                        'VsmInfo': {'id': self.random.randint(1, 99), 'type': self.random.choice(['U', 'H']),
+                                    'selected': self.random.choice(['Selected', 'MB', 'upload', 'random', 'add'])},
+                        'timeOnQuestion': self.random.randint(1, 30),
+                    }
+        return data
+
+    def create_questionnaire_data(self):
+        """Return the data of a row of every questionnaire"""
+        frequencies = ['None', '1-2 times', '3-4 times', '5-6 times', '7+ times']
+        return [
+            {
+                'EX-A': {'answers': [{'answer': self.random.choice(
+                    ['I am inactive', 'My activity levels are low', 'My activity levels are moderate'])}], 'timeOnQuestion': 3},
+                'EX-F': {'answers': {
+                    'exercise-{}-{}'.format(measure, intensity): {'answer': self.random.randint(0, 5)}
+                    for measure in ['times', 'minutes'] for intensity in ['moderate', 'vigorous', 'strengthening']
+                }},
+            },
+            {'FOODIMP': {'answers': self.create_answers(16, ['0', '1']), 'timeOnQuestion': 12}},
+            {'GOALS': {'answers': {
+                weight: {'answer': self.create_measurement(50, 120, 'kg')}
+                for weight in ['ideal-weight', 'achievable-weight', 'happy-weight']
+            }, 'timeOnQuestion': 5}},
+            {
+                'INTENT-H': {'answers': {'healthy-foods': {'answer': 'more fruit'}}, 'timeOnQuestion': 4},
+                'INTENT-U': {'answers': {'unhealthy-foods': {'answer': 'fewer crisps'}}, 'timeOnQuestion': 4},
+            },
+            {
+                'EFFECT-{}'.format(subtype): {'answers': {answer: {'answer': self.random.randint(1, 7)}}, 'timeOnQuestion': 2}
+                for subtype, answer in [('H', 'healthy'), ('U', 'unhealthy'), ('W', 'weight')]
+            },
+            {'MINDF': {'answers': self.create_answers(15, ['1', '2', '3', '4']), 'timeOnQuestion': 10}},
+            self.create_major_minor_question_data('FREQ', lambda: {
+                'FE': {'answer': self.random.choice(frequencies)},
+                'FC': {'answer': self.random.choice(frequencies), 'sliderValue': self.random.randint(0, 100)},
+            }),
+            self.create_major_minor_question_data('TASTE', lambda: [{'answer': str(self.random.randint(1, 7))}]),
+            self.create_major_minor_question_data('ATTRACT', lambda: [{'answer': str(self.random.randint(1, 7))}]),
+            self.create_subtype_question_data('IMP', ['A', 'M', 'N'], 11, ['1', '2', '3', '4']),
+            self.create_subtype_question_data('WILL', ['M', 'T'], 6, ['1', '2', '3', '4', '5', '6']),
+            self.create_subtype_question_data('MOOD', ['D', 'A', 'S'], 7, ['0', '1']),
+            self.create_subtype_question_data('EMREG', ['N', 'G', 'I', 'A', 'S', 'C'], 8, ['1', '2', '3', '4', '5']),
+            self.create_subtype_question_data('PERSON', ['N', 'E', 'O', 'A', 'C'], 10, ['1', '2', '3', '4', '5']),
+            self.create_subtype_question_data('RESTR-', ['C', 'W'], 6, ['1', '2', '3', '4', '5']),
+        ]
+
+
+def write_export(rows, json_filename):
+    path = JSON_PATH / json_filename
+    with open(path, 'w', encoding='utf-8') as json_file:
+        json.dump(rows, json_file)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create a synthetic Food Control JSON export in JSON_PATH')
+    parser.add_argument('json_filename', help='the filename of the export to create')
+    parser.add_argument('--users', type=int, default=10, help='the number of users')
+    parser.add_argument('--sessions', type=int, default=2, help='the number of sessions of each user')
+    parser.add_argument('--rounds', type=int, default=4, help='the number of rounds of each STOP game session')
+    parser.add_argument('--trials', type=int, default=48, help='the number of trials in each STOP game round')
+    parser.add_argument('--seed', type=int, default=0, help='the random number generator seed')
+    args = parser.parse_args()
+
+    export = SyntheticExport(args.users, args.sessions, args.rounds, args.trials, args.seed)
+    rows = export.create_rows()
+    print('Wrote {} rows to {}'.format(len(rows), write_export(rows, args.json_filename)))
@@ -0,0 +1,179 @@
+import json
+import uuid
+import threading
+import http.server
+import email.parser
+
+
+class CkanStub:
+    """
+    A local stand-in for the CKAN action API, served from a background thread, that keeps
+    its datasets and uploaded resources in memory. Failures can be queued for an action:
+    an HTTP status to respond with, or None to drop the connection without a response,
+    either instead of calling the action or, like a proxy that times out, after calling it.
+    """
+
+    def __init__(self, delay=0):
+        # Seconds to wait before answering each request, to keep requests in flight together
+        self.delay = delay
+        self.datasets = {}   # dict of dataset dict keyed by name
+        self.resources = {}  # dict of resource dict, including its 'upload' bytes, keyed by id
+        self.actions = []    # the action of each request in the order they arrived
+        self.headers = []    # the headers of each request in the order they arrived
+        self.failures = {}   # dict of list of (status, after action) keyed by action
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self.create_handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+
+    @property
+    def api_url(self):
+        return 'http://127.0.0.1:{}/api/3'.format(self.server.server_address[1])
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def fail(self, action, status, times=1, after_action=False):
+        self.failures.setdefault(action, []).extend([(status, after_action)] * times)
+
+    def count(self, action):
+        return self.actions.count(action)
+
+    def create_handler_class(self):
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                action = self.path.rsplit('/', 1)[-1]
+                body = self.read_body()
+                with stub.lock:
+                    stub.actions.append(action)
+                    stub.headers.append(self.headers)
+                    failures = stub.failures.get(action)
+                    failure, after_action = failures.pop(0) if failures else (False, False)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    threading.Event().wait(stub.delay)
+                    if after_action:
+                        with stub.lock:
+                            stub.call_action(action, self.parse_fields(body))
+                    if failure is None:
+                        self.close_connection = True
+                        return
+                    if failure:
+                        self.respond(failure, {'success': False, 'error': {'message': 'Stub failure'}})
+                        return
+                    fields = self.parse_fields(body)
+                    with stub.lock:
+                        status, response_dict = stub.call_action(action, fields)
+                    self.respond(status, response_dict)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+            def read_body(self):
+                if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+                    chunks = []
+                    while True:
+                        chunk_size = int(self.rfile.readline().split(b';')[0], 16)
+                        chunk = self.rfile.read(chunk_size + 2)[:chunk_size]
+                        if not chunk_size:
+                            return b''.join(chunks)
+                        chunks.append(chunk)
+                return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+            def parse_fields(self, body):
+                """Return a dict of the JSON or multipart form fields of a request body; an upload field's value is bytes"""
+                content_type = self.headers.get('Content-Type', '')
+                if content_type.startswith('application/json'):
+                    return json.loads(body.decode('utf-8'))
+                message = email.parser.BytesParser().parsebytes(
+                    'Content-Type: {}\r\n\r\n'.format(content_type).encode('utf-8') + body)
+                fields = {}
+                for part in message.get_payload():
+                    name = part.get_param('name', header='content-disposition')
+                    value = part.get_payload(decode=True)
+                    if part.get_filename() is None:
+                        value = value.decode('utf-8')
+                    else:
+                        fields[name + '_filename'] = part.get_filename()
+                        fields[name + '_content_type'] = part.get_content_type()
+                    fields[name] = value
+                return fields
+
+            def respond(self, status, response_dict):
+                body = json.dumps(response_dict).encode('utf-8')
+                # CKAN gives its conflict responses the reason CONFLICT
+                self.send_response(status, 'CONFLICT' if status == 409 else None)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def call_action(self, action, fields):
+        """Return the (status, response dict) of a CKAN action"""
+        if action == 'package_create':
+            if fields['name'] in self.datasets:
+                return 409, {'success': False, 'error': {'name': ['That URL is already in use.']}}
+            self.datasets[fields['name']] = dict(fields, id=str(uuid.uuid4()))
+            return 200, {'success': True, 'result': self.public_dataset(fields['name'])}
+        if action == 'package_show':
+            if fields['id'] not in self.datasets:
+                return 404, {'success': False, 'error': {'message': 'Not found'}}
+            return 200, {'success': True, 'result': self.public_dataset(fields['id'])}
+        if action == 'package_update':
+            if fields['name'] not in self.datasets:
+                return 404, {'success': False, 'error': {'message': 'Not found'}}
+            self.datasets[fields['name']].update(fields)
+            return 200, {'success': True, 'result': self.public_dataset(fields['name'])}
+        if action == 'resource_create':
+            if fields['package_id'] not in self.datasets:
+                return 404, {'success': False, 'error': {'message': 'Not found'}}
+            resource_id = str(uuid.uuid4())
+            self.resources[resource_id] = dict(fields, id=resource_id, url=self.get_download_url(resource_id, fields))
+            return 200, {'success': True, 'result': self.public_resource(resource_id)}
+        if action == 'resource_update':
+            if fields.get('id') not in self.resources:
+                return 404, {'success': False, 'error': {'message': 'Not found'}}
+            self.resources[fields['id']].update(fields, url=self.get_download_url(fields['id'], fields))
+            return 200, {'success': True, 'result': self.public_resource(fields['id'])}
+        return 400, {'success': False, 'error': {'message': 'Unknown action {}'.format(action)}}
+
+    def get_download_url(self, resource_id, fields):
+        return 'http://ckan/dataset/{}/resource/{}/download/{}'.format(
+            fields['package_id'], resource_id, fields.get('upload_filename', '').lower())
+
+    def public_dataset(self, dataset_name):
+        """Return a dataset dict with the list of its resources"""
+        resources = [
+            self.public_resource(resource_id) for resource_id, resource in self.resources.items()
+            if resource['package_id'] == dataset_name
+        ]
+        return dict(self.datasets[dataset_name], resources=resources)
+
+    def public_resource(self, resource_id):
+        """Return a resource dict without its uploaded bytes"""
+        return {key: value for key, value in self.resources[resource_id].items() if type(value) is not bytes}
+
+    def resources_by_name(self, dataset_name):
+        """Return a dict of the uploaded resources of a dataset keyed by resource name"""
+        return {
+            resource['name']: resource for resource in self.resources.values()
+            if resource['package_id'] == dataset_name
+        }
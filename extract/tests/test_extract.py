@@ -0,0 +1,69 @@
+import io
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+import contextlib
+
+from synthetic import SyntheticExport
+from extract import Extractor
+
+
+class IncrementalExtractionTestCase(unittest.TestCase):
+    """An incremental extraction that fails partway must not append rows twice when it is run again"""
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.folder = pathlib.Path(self.temporary_directory.name)
+        self.rows = SyntheticExport(users=2, sessions=2, trials_per_round=8).create_rows()
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def extract(self, folder, single_pass, rows=None):
+        extractor = Extractor(single_pass=single_pass, incremental=True, xlsx='skip')
+        with contextlib.redirect_stdout(io.StringIO()):
+            extractor.extract_from_json(self.rows if rows is None else rows, folder)
+        return extractor
+
+    def read_csv_files(self, folder):
+        return {path.name: path.read_text(encoding='utf-8') for path in folder.glob('*.csv')}
+
+    def assert_rerun_matches_one_run(self, single_pass):
+        expected_folder = self.folder / 'expected'
+        expected_folder.mkdir()
+        extractor = self.extract(expected_folder, single_pass)
+
+        # The GOALVIS extractor fails on its second new row, after the MCII extractor before it has appended rows
+        failing_extractor = extractor.extractor_factory.extractor_for_row_type('GOALVIS')
+        process_row = failing_extractor.process_row
+        calls = []
+
+        def fail_on_second_row(row):
+            calls.append(row)
+            if len(calls) == 2:
+                raise RuntimeError('extraction failed')
+            return process_row(row)
+
+        # An earlier run extracted the first half of the rows into the folder
+        folder = self.folder / 'rerun'
+        folder.mkdir()
+        self.extract(folder, single_pass, self.rows[:len(self.rows) // 2])
+        with unittest.mock.patch.object(failing_extractor, 'process_row', fail_on_second_row):
+            with self.assertRaises(RuntimeError):
+                self.extract(folder, single_pass)
+        self.extract(folder, single_pass)
+
+        expected_files = self.read_csv_files(expected_folder)
+        self.assertTrue(expected_files)
+        self.assertEqual(self.read_csv_files(folder), expected_files)
+
+    def test_rerun_after_a_failure_appends_no_rows_twice(self):
+        self.assert_rerun_matches_one_run(single_pass=False)
+
+    def test_rerun_after_a_failure_in_a_single_pass_appends_no_rows_twice(self):
+        self.assert_rerun_matches_one_run(single_pass=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
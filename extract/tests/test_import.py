@@ -0,0 +1,340 @@
+import io
+import os
+import gzip
+import pathlib
+import tempfile
+import unittest
+import importlib
+import unittest.mock
+import contextlib
+
+import requests
+
+from .ckanstub import CkanStub
+from journal import UploadJournal
+from multipart import MultipartUpload
+
+# import is a keyword, so the import script is loaded by name
+ckan_import = importlib.import_module('import')
+
+DATASET_FILES = {
+    '040918-user1-1': {
+        'G-GOALVIS.csv': '"User ID","Session ID"\n"user1","1"\n',
+        'Q-FREQ.csv': '"User ID","Session ID","QType"\n"user1","1","FREQ"\n',
+    },
+    '050918-user2-1': {
+        'G-MCII.csv': '"User ID","Session ID"\n"user2","1"\n',
+        'G-STOP.csv': '"User ID","Session ID"\n' + '"user2","1"\n' * 1000,
+        'Q-TASTE.csv': '"User ID","Session ID","QType"\n"user2","1","TASTE"\n',
+    },
+}
+
+
+class CkanStubTestCase(unittest.TestCase):
+    """Export folders of CSV files in a temporary CSV path to import into a stub CKAN"""
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.csv_path = pathlib.Path(self.temporary_directory.name)
+        for dataset_name, files in DATASET_FILES.items():
+            (self.csv_path / dataset_name).mkdir()
+            for filename, content in files.items():
+                (self.csv_path / dataset_name / filename).write_text(content, encoding='utf-8')
+        self.stub = CkanStub().start()
+
+    def tearDown(self):
+        self.stub.stop()
+        self.temporary_directory.cleanup()
+
+    def create_client(self, **client_kwargs):
+        client_kwargs.setdefault('backoff', 0)
+        client = ckan_import.CkanClient(self.stub.api_url, 'key', **client_kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def import_datasets(self, client, workers=4, journal=None, compress=False):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ckan_import.import_datasets(client, self.csv_path, workers, journal, compress)
+
+    def assert_uploaded(self, compressed=False):
+        self.assertEqual(set(self.stub.datasets), set(DATASET_FILES))
+        for dataset_name, files in DATASET_FILES.items():
+            resources = self.stub.resources_by_name(dataset_name)
+            self.assertEqual(set(resources), {filename.split('.')[0] for filename in files})
+            for filename, content in files.items():
+                resource = resources[filename.split('.')[0]]
+                upload = resource['upload']
+                if compressed:
+                    self.assertEqual(resource['upload_filename'], filename + '.gz')
+                    self.assertEqual(resource['mimetype'], 'application/gzip')
+                    upload = gzip.decompress(upload)
+                else:
+                    self.assertEqual(resource['upload_filename'], filename)
+                self.assertEqual(upload, content.encode('utf-8'))
+
+
+class CkanImportTestCase(CkanStubTestCase):
+
+    def test_uploads_every_file_of_every_dataset(self):
+        resource_count = self.import_datasets(self.create_client())
+        self.assertEqual(resource_count, 5)
+        self.assert_uploaded()
+        self.assertEqual(self.stub.datasets['040918-user1-1']['notes'],
+                         'The Food Control app data for user ID 040918-USER1-1 on 04 September 2018.')
+
+    def test_updates_a_dataset_that_exists(self):
+        self.stub.datasets['040918-user1-1'] = {'name': '040918-user1-1', 'title': 'OLD'}
+        self.import_datasets(self.create_client())
+        self.assertEqual(self.stub.count('package_update'), 1)
+        self.assertEqual(self.stub.datasets['040918-user1-1']['title'], '040918-USER1-1')
+        self.assert_uploaded()
+
+    def test_uploads_concurrently(self):
+        self.stub.delay = 0.05
+        self.import_datasets(self.create_client(pool_size=4), workers=4)
+        self.assertGreater(self.stub.max_in_flight, 1)
+        self.assert_uploaded()
+
+    def test_uploads_with_one_worker(self):
+        self.import_datasets(self.create_client(pool_size=1), workers=1)
+        self.assertEqual(self.stub.max_in_flight, 1)
+        self.assert_uploaded()
+
+    def test_retries_server_errors(self):
+        self.stub.fail('package_create', 502)
+        self.stub.fail('resource_create', 503, times=3)
+        self.import_datasets(self.create_client(retries=3))
+        self.assertEqual(self.stub.count('resource_create'), 5 + 3)
+        # The dataset is checked for each resource before it is created again
+        self.assertEqual(self.stub.count('package_show'), 3)
+        # The files are uploaded in full again after each failure
+        self.assert_uploaded()
+
+    def test_does_not_create_a_resource_twice_after_a_proxy_error(self):
+        self.stub.fail('resource_create', 502, times=2, after_action=True)
+        self.import_datasets(self.create_client(retries=3))
+        self.assertEqual(len(self.stub.resources), 5)
+        self.assertEqual(self.stub.count('resource_create'), 5)
+        # The resources that were created are updated with their files instead
+        self.assertEqual(self.stub.count('resource_update'), 2)
+        self.assert_uploaded()
+
+    def test_does_not_update_the_resources_of_an_earlier_import_after_a_proxy_error(self):
+        self.import_datasets(self.create_client())
+        earlier_uploads = {resource_id: resource['upload'] for resource_id, resource in self.stub.resources.items()}
+        for dataset_name, files in DATASET_FILES.items():
+            for filename in files:
+                (self.csv_path / dataset_name / filename).write_text('"User ID"\n', encoding='utf-8')
+        self.stub.fail('resource_create', 502, after_action=True)
+        self.import_datasets(self.create_client(retries=1))
+        self.assertEqual(len(self.stub.resources), 10)
+        # Only the resource the failed request created is updated
+        self.assertEqual(self.stub.count('resource_update'), 1)
+        for resource_id, upload in earlier_uploads.items():
+            self.assertEqual(self.stub.resources[resource_id]['upload'], upload)
+
+    def test_does_not_create_a_resource_twice_after_a_dropped_connection(self):
+        self.stub.fail('resource_create', None, after_action=True)
+        self.import_datasets(self.create_client(retries=1), compress=True)
+        self.assertEqual(len(self.stub.resources), 5)
+        self.assertEqual(self.stub.count('resource_update'), 1)
+        self.assert_uploaded(compressed=True)
+
+    def test_retries_dropped_connections(self):
+        self.stub.fail('resource_create', None, times=2)
+        self.import_datasets(self.create_client(retries=2))
+        self.assert_uploaded()
+
+    def test_gives_up_after_the_retries(self):
+        self.stub.fail('package_create', 500, times=10)
+        with self.assertRaises(requests.HTTPError):
+            self.import_datasets(self.create_client(retries=2), workers=1)
+        # Each dataset is tried once and retried twice
+        self.assertEqual(self.stub.count('package_create'), len(DATASET_FILES) * 3)
+
+    def test_gives_up_on_connection_errors(self):
+        self.stub.fail('package_create', None, times=10)
+        with self.assertRaises(requests.ConnectionError):
+            self.import_datasets(self.create_client(retries=1), workers=1)
+        self.assertEqual(self.stub.count('package_create'), len(DATASET_FILES) * 2)
+
+    def test_gives_up_on_resource_creates_after_the_retries(self):
+        self.stub.fail('resource_create', 504, times=10)
+        client = self.create_client(retries=2)
+        ckan_import.create_or_update_ckan_dataset(client, ckan_import.get_dataset_dict('040918-user1-1'))
+        with self.assertRaisesRegex(requests.HTTPError, 'resource_create of resource G-GOALVIS .* 504'):
+            ckan_import.add_ckan_resource(client, '040918-user1-1', 'G-GOALVIS', self.csv_path / '040918-user1-1' / 'G-GOALVIS.csv')
+        # Only add_ckan_resource retries resource_create, so it is tried once and retried twice
+        self.assertEqual(self.stub.count('resource_create'), 3)
+        self.assertEqual(self.stub.count('package_show'), 2)
+
+    def test_does_not_retry_client_errors(self):
+        self.stub.fail('package_create', 403)
+        with self.assertRaises(requests.HTTPError):
+            self.import_datasets(self.create_client(retries=3), workers=1)
+        self.assertEqual(self.stub.count('package_create'), len(DATASET_FILES))
+
+    def test_backs_off_exponentially(self):
+        delays = []
+        client = self.create_client(retries=3, backoff=0.5)
+        self.stub.fail('package_create', 503, times=3)
+        with unittest.mock.patch.object(ckan_import.time, 'sleep', delays.append):
+            self.import_datasets(client, workers=1)
+        self.assertEqual(delays, [0.5, 1.0, 2.0])
+
+
+class CkanUploadTestCase(CkanStubTestCase):
+
+    def upload_headers(self):
+        return [headers for action, headers in zip(self.stub.actions, self.stub.headers) if action == 'resource_create']
+
+    def test_streams_uploads_with_their_length(self):
+        self.import_datasets(self.create_client())
+        self.assert_uploaded()
+        for headers in self.upload_headers():
+            self.assertIsNotNone(headers['Content-Length'])
+            self.assertIsNone(headers['Transfer-Encoding'])
+
+    def test_the_length_of_an_upload_is_its_length(self):
+        path = self.csv_path / '050918-user2-1' / 'G-STOP.csv'
+        with MultipartUpload({'name': 'G-STOP'}, 'upload', path) as upload:
+            self.assertEqual(len(upload), len(b''.join(upload)))
+            # An upload can be sent again
+            self.assertEqual(len(upload), len(b''.join(upload)))
+
+    def test_gzips_csv_files(self):
+        self.import_datasets(self.create_client(), compress=True)
+        self.assert_uploaded(compressed=True)
+        for headers in self.upload_headers():
+            self.assertEqual(headers['Transfer-Encoding'], 'chunked')
+        stop_upload = self.stub.resources_by_name('050918-user2-1')['G-STOP']['upload']
+        self.assertLess(len(stop_upload), len(DATASET_FILES['050918-user2-1']['G-STOP.csv']))
+
+    def test_does_not_gzip_other_files(self):
+        (self.csv_path / '040918-user1-1' / 'G-STOP.xlsx').write_bytes(b'PK\x03\x04')
+        self.import_datasets(self.create_client(), compress=True)
+        resource = self.stub.resources_by_name('040918-user1-1')['G-STOP']
+        self.assertEqual(resource['upload_filename'], 'G-STOP.xlsx')
+        self.assertEqual(resource['upload'], b'PK\x03\x04')
+
+    def test_retries_gzipped_uploads(self):
+        self.stub.fail('resource_create', 503, times=2)
+        self.stub.fail('resource_create', None, times=2)
+        self.import_datasets(self.create_client(retries=4), compress=True)
+        self.assert_uploaded(compressed=True)
+
+    @unittest.skipUnless(os.path.isdir('/proc/self/fd'), 'needs /proc/self/fd to count open files')
+    def test_closes_the_uploaded_files(self):
+        client = self.create_client(retries=1)
+        # Open the pooled connections before counting the open files
+        self.import_datasets(client)
+        open_file_count = len(os.listdir('/proc/self/fd'))
+        self.stub.fail('resource_create', 503, times=3)
+        self.stub.fail('resource_create', None, times=3)
+        with self.assertRaises((requests.HTTPError, requests.ConnectionError)):
+            self.import_datasets(client, compress=True)
+        self.import_datasets(client, compress=True)
+        client.close()
+        self.assertLessEqual(len(os.listdir('/proc/self/fd')), open_file_count)
+
+
+class CkanSyncTestCase(CkanStubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.journal_path = str(self.csv_path / 'journal.jsonl')
+        # The journal is kept out of the CSV path, whose folders are the datasets
+        self.csv_path = self.csv_path / 'CSV'
+        self.csv_path.mkdir()
+        for dataset_name in DATASET_FILES:
+            os.rename(self.csv_path.parent / dataset_name, self.csv_path / dataset_name)
+
+    def sync(self, workers=4, **client_kwargs):
+        journal = UploadJournal(self.journal_path)
+        try:
+            return self.import_datasets(self.create_client(**client_kwargs), workers, journal)
+        finally:
+            journal.close()
+
+    def test_uploads_every_file_the_first_time(self):
+        self.assertEqual(self.sync(), 5)
+        self.assert_uploaded()
+        journal = UploadJournal(self.journal_path)
+        self.addCleanup(journal.close)
+        self.assertEqual(len(journal.entries), 5)
+
+    def test_skips_unchanged_files(self):
+        self.sync()
+        actions = list(self.stub.actions)
+        self.assertEqual(self.sync(), 0)
+        self.assertEqual(self.stub.actions, actions)
+
+    def test_skips_files_written_again_with_the_same_content(self):
+        self.sync()
+        resource_count = len(self.stub.resources)
+        path = self.csv_path / '040918-user1-1' / 'G-GOALVIS.csv'
+        path.write_bytes(path.read_bytes())
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(self.sync(), 0)
+        self.assertEqual(len(self.stub.resources), resource_count)
+
+    def test_updates_the_resources_of_changed_files(self):
+        self.sync()
+        resource_ids = set(self.stub.resources)
+        content = '"User ID","Session ID"\n"user1","2"\n'
+        (self.csv_path / '040918-user1-1' / 'G-GOALVIS.csv').write_text(content, encoding='utf-8')
+        self.assertEqual(self.sync(), 1)
+        self.assertEqual(self.stub.count('resource_update'), 1)
+        self.assertEqual(set(self.stub.resources), resource_ids)
+        self.assertEqual(self.stub.resources_by_name('040918-user1-1')['G-GOALVIS']['upload'], content.encode('utf-8'))
+
+    def test_adds_resources_for_new_files(self):
+        self.sync()
+        (self.csv_path / '040918-user1-1' / 'G-MCII.csv').write_text('"User ID"\n', encoding='utf-8')
+        self.assertEqual(self.sync(), 1)
+        self.assertEqual(self.stub.count('resource_create'), 6)
+        self.assertEqual(self.stub.count('resource_update'), 0)
+
+    def test_adds_a_resource_that_was_deleted(self):
+        self.sync()
+        resource_id = self.stub.resources_by_name('040918-user1-1')['G-GOALVIS']['id']
+        del self.stub.resources[resource_id]
+        (self.csv_path / '040918-user1-1' / 'G-GOALVIS.csv').write_text('"User ID"\n', encoding='utf-8')
+        self.assertEqual(self.sync(), 1)
+        self.assertEqual(self.stub.count('resource_create'), 6)
+        self.assertIn('G-GOALVIS', self.stub.resources_by_name('040918-user1-1'))
+
+    def test_updates_the_resources_of_an_import_without_a_journal(self):
+        self.import_datasets(self.create_client())
+        resource_ids = set(self.stub.resources)
+        self.assertEqual(self.sync(), 5)
+        self.assertEqual(self.stub.count('resource_update'), 5)
+        self.assertEqual(set(self.stub.resources), resource_ids)
+
+    def test_updates_the_resources_of_files_uploaded_compressed(self):
+        self.import_datasets(self.create_client(), compress=True)
+        resource_ids = set(self.stub.resources)
+        self.assertEqual(self.sync(), 5)
+        self.assertEqual(set(self.stub.resources), resource_ids)
+        self.assert_uploaded()
+
+    def test_resumes_after_a_crash(self):
+        self.stub.fail('resource_create', 500, times=2)
+        with self.assertRaises(requests.HTTPError):
+            self.sync(workers=1, retries=1)
+        uploaded_count = len(self.stub.resources)
+        self.assertEqual(uploaded_count, 4)
+        # Only the file whose upload failed is uploaded again
+        self.assertEqual(self.sync(), 1)
+        self.assertEqual(self.stub.count('resource_update'), 0)
+        self.assert_uploaded()
+
+    def test_ignores_a_partly_written_journal_line(self):
+        self.sync()
+        with open(self.journal_path, 'a', encoding='utf-8') as journal_file:
+            journal_file.write('{"dataset": "040918-us')
+        self.assertEqual(self.sync(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import pathlib
+import tempfile
+import unittest
+
+from manifest import RowManifest
+
+
+class Extractor:
+
+    def get_filename(self):
+        return 'G-STOP.csv'
+
+
+class RowManifestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.folder = pathlib.Path(self.temporary_directory.name)
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def test_saves_keys_of_mixed_types(self):
+        extractor = Extractor()
+        manifest = RowManifest(self.folder)
+        rows = [
+            {'userId': 'user1', 'sessionId': 2, 'creationDate': 1530000000000},
+            {'userId': 'user1', 'sessionId': None, 'creationDate': 1530000000001},
+            {'userId': 'user1', 'sessionId': '3', 'creationDate': 1530000000002},
+        ]
+        for row in rows:
+            manifest.add_row(extractor, row)
+        manifest.save()
+
+        saved_manifest = RowManifest(self.folder)
+        for row in rows:
+            self.assertTrue(saved_manifest.has_row(extractor, row))
+        self.assertTrue(saved_manifest.has_extractor(extractor))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import pathlib
+import tempfile
+import unittest
+
+from outputs import ParquetOutput
+
+if ParquetOutput.is_available():
+    import pyarrow
+    import pyarrow.parquet
+
+
+@unittest.skipUnless(ParquetOutput.is_available(), 'PyArrow is not installed')
+class ParquetOutputTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.output_filename = pathlib.Path(self.temporary_directory.name) / 'G-STOP.parquet'
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def write_batches(self, column_names, *batches):
+        """Write each batch of rows as a row group and return the table read back from the file"""
+        parquet_output = ParquetOutput(self.output_filename, column_names)
+        parquet_output.batch_size = 2
+        for rows in batches:
+            parquet_output.write_rows(rows)
+        parquet_output.close()
+        return pyarrow.parquet.read_table(str(self.output_filename))
+
+    def test_infers_the_column_types(self):
+        table = self.write_batches(['Count', 'Mean', 'Valid', 'Name', 'Empty'], [
+            [1, 1.5, True, 'a', '[]'],
+            [2, 2, False, '[]', '[]'],
+        ])
+        self.assertEqual(table.schema.types, [
+            pyarrow.int64(), pyarrow.float64(), pyarrow.bool_(), pyarrow.string(), pyarrow.string()])
+        self.assertEqual(table.to_pydict(), {
+            'Count': [1, 2], 'Mean': [1.5, 2.0], 'Valid': [True, False], 'Name': ['a', None], 'Empty': [None, None]})
+
+    def test_widens_a_column_whose_later_values_do_not_fit(self):
+        table = self.write_batches(['Count'], [[1], [2]], [['n/a'], [3]])
+        self.assertEqual(table.schema.types, [pyarrow.string()])
+        self.assertEqual(table.column('Count').to_pylist(), ['1', '2', 'n/a', '3'])
+
+    def test_widens_a_column_more_than_once(self):
+        table = self.write_batches(['Count', 'Valid'], [[1, True], [2, False]], [[2.5, True], ['[]', True]],
+                                   [[4, False], [True, 'no']])
+        self.assertEqual(table.schema.types, [pyarrow.string(), pyarrow.string()])
+        self.assertEqual(table.column('Count').to_pylist(), ['1.0', '2.0', '2.5', None, '4', 'True'])
+        self.assertEqual(table.column('Valid').to_pylist(), ['True', 'False', 'True', 'True', 'False', 'no'])
+
+    def test_widens_an_int_column_to_a_double_column(self):
+        table = self.write_batches(['Mean'], [[1], [2]], [[2.5], [3]])
+        self.assertEqual(table.schema.types, [pyarrow.float64()])
+        self.assertEqual(table.column('Mean').to_pylist(), [1.0, 2.0, 2.5, 3.0])
+        self.assertEqual(pyarrow.parquet.ParquetFile(str(self.output_filename)).num_row_groups, 2)
+        self.assertEqual(list(self.output_filename.parent.iterdir()), [self.output_filename])
+
+
+if __name__ == '__main__':
+    unittest.main()
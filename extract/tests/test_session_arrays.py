@@ -0,0 +1,104 @@
+import io
+import math
+import unittest
+import contextlib
+from collections import defaultdict
+
+from synthetic import SyntheticExport
+from extractors.games.session_arrays import SessionEventArrays
+from extractors.games.stop import (
+    StopDataExtractor, RestraintDataExtractor, NAStopDataExtractor,
+    NARestraintDataExtractor, GStopDataExtractor, GRestraintDataExtractor, DoubleDataExtractor
+)
+
+STOP_EXTRACTOR_CLASSES = [
+    StopDataExtractor, RestraintDataExtractor, NAStopDataExtractor, NARestraintDataExtractor,
+    GStopDataExtractor, GRestraintDataExtractor, DoubleDataExtractor
+]
+
+# The session state dicts whose keys must be added in the same order by both calculations,
+# because the spreadsheet lists the values of some of them in that order
+ORDERED_STATE_NAMES = [
+    'trial_stats', 'block_trial_type_counts', 'block_item_type_counts', 'label_allocation_counts',
+    'selected_item_ids', 'block_item_ids', 'dv_correct_counts', 'dv_correct_responses',
+]
+
+
+def comparable(value):
+    """Return a value with its defaultdicts and slotted objects as dicts and its NumPy values as Python values"""
+    if hasattr(value, 'tolist'):
+        # The array calculations keep some values as NumPy arrays and scalars
+        value = value.tolist()
+    if isinstance(value, (dict, defaultdict)):
+        return {key: comparable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [comparable(item) for item in value]
+    if hasattr(value, '__slots__'):
+        return {name: comparable(getattr(value, name)) for name in value.__slots__}
+    return value
+
+
+@unittest.skipUnless(SessionEventArrays.is_available(), 'NumPy is not installed')
+class SessionArraysTestCase(unittest.TestCase):
+    """The session event calculations made with NumPy arrays must match those made event by event"""
+
+    def extract_sessions(self, extractor_class, rows, use_session_arrays):
+        """Return the extracted rows and the session state of each session an extractor processes"""
+        extractor = extractor_class()
+        extractor.use_session_arrays = use_session_arrays
+        sessions = []
+        # The session calculations print as they go
+        with contextlib.redirect_stdout(io.StringIO()):
+            for row in rows:
+                if extractor.process_row(row):
+                    session = extractor.last_session
+                    state = comparable(session)
+                    state['session_event_log'] = comparable(session.session_event_log.logs)
+                    sessions.append((extractor.extracted_rows(), state))
+        return sessions
+
+    def assert_paths_match(self, trials_per_round):
+        # Big enough for some blocks to have no correct STOP responses
+        rows = SyntheticExport(users=5, sessions=2, trials_per_round=trials_per_round).create_rows()
+        for extractor_class in STOP_EXTRACTOR_CLASSES:
+            with self.subTest(extractor=extractor_class.__name__, trials_per_round=trials_per_round):
+                dict_sessions = self.extract_sessions(extractor_class, rows, False)
+                array_sessions = self.extract_sessions(extractor_class, rows, True)
+                self.assertEqual(len(dict_sessions), 10)
+                for (dict_rows, dict_state), (array_rows, array_state) in zip(dict_sessions, array_sessions):
+                    self.assertEqual(array_rows, dict_rows)
+                    for name in dict_state:
+                        self.assert_close(array_state[name], dict_state[name], name)
+                    for name in ORDERED_STATE_NAMES:
+                        self.assert_same_key_order(array_state[name], dict_state[name], name)
+
+    def assert_close(self, first, second, path):
+        """Assert two comparable values are equal, apart from the rounding of their floats"""
+        if isinstance(first, float) or isinstance(second, float):
+            self.assertTrue(math.isclose(first, second, rel_tol=1e-9), '{}: {} != {}'.format(path, first, second))
+        elif isinstance(first, dict) and isinstance(second, dict):
+            self.assertEqual(first.keys(), second.keys(), path)
+            for key in first:
+                self.assert_close(first[key], second[key], '{}[{!r}]'.format(path, key))
+        elif isinstance(first, list) and isinstance(second, list):
+            self.assertEqual(len(first), len(second), path)
+            for index, (first_item, second_item) in enumerate(zip(first, second)):
+                self.assert_close(first_item, second_item, '{}[{}]'.format(path, index))
+        else:
+            self.assertEqual(first, second, path)
+
+    def assert_same_key_order(self, first, second, path):
+        if isinstance(first, dict):
+            self.assertEqual(list(first), list(second), path)
+            for key in first:
+                self.assert_same_key_order(first[key], second[key], '{}[{!r}]'.format(path, key))
+
+    def test_matches_the_event_by_event_calculations(self):
+        self.assert_paths_match(48)
+
+    def test_matches_the_event_by_event_calculations_of_shorter_sessions(self):
+        self.assert_paths_match(24)
+
+
+if __name__ == '__main__':
+    unittest.main()
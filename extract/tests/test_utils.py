@@ -0,0 +1,39 @@
+import io
+import json
+import unittest
+
+from utils import iterate_json_array
+
+
+class IterateJsonArrayTestCase(unittest.TestCase):
+
+    def iterate(self, text, chunk_size=4):
+        return list(iterate_json_array(io.StringIO(text), chunk_size))
+
+    def test_yields_the_elements_of_the_array(self):
+        elements = [{'userId': 'user1', 'data': [1, 2.5, None]}, 'text', 12345678, True, []]
+        text = json.dumps(elements, indent=2)
+        self.assertEqual(self.iterate(text), elements)
+        self.assertEqual(self.iterate(text, chunk_size=65536), elements)
+
+    def test_yields_nothing_for_an_empty_array(self):
+        self.assertEqual(self.iterate(' [ ] '), [])
+
+    def test_allows_whitespace_after_the_array(self):
+        self.assertEqual(self.iterate('[1]\n' + ' ' * 20 + '\n'), [1])
+
+    def test_rejects_data_after_the_array(self):
+        for text in ['[1]x', '[1] []', '[1]' + ' ' * 20 + 'x', '[]]']:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    self.iterate(text)
+
+    def test_rejects_a_truncated_array(self):
+        for text in ['', '[1, 2', '[1,]', '{}']:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    self.iterate(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
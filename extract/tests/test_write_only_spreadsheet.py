@@ -0,0 +1,71 @@
+import io
+import pathlib
+import tempfile
+import unittest
+import contextlib
+
+from openpyxl import load_workbook
+
+from synthetic import SyntheticExport
+from extractors.games.stop import StopDataExtractor, NARestraintDataExtractor, DoubleDataExtractor
+from extractors.games.write_only_spreadsheet import WriteOnlySpreadsheet
+
+
+def read_sheets(filename):
+    """Return a dict of the rows of each sheet of a workbook keyed by title, without trailing empty cells or rows"""
+    workbook = load_workbook(filename)
+    sheets = {}
+    for sheet in workbook.worksheets:
+        rows = []
+        for row in sheet.iter_rows(values_only=True):
+            row = list(row)
+            while row and row[-1] is None:
+                row.pop()
+            rows.append(row)
+        while rows and not rows[-1]:
+            rows.pop()
+        sheets[sheet.title] = rows
+    return sheets
+
+
+class WriteOnlySpreadsheetTestCase(unittest.TestCase):
+    """A session's workbook must be the same whether it is created with Spreadsheet or WriteOnlySpreadsheet"""
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.output_path = pathlib.Path(self.temporary_directory.name)
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def assert_workbooks_match(self, extractor_class, trials_per_round):
+        rows = SyntheticExport(users=1, sessions=1, trials_per_round=trials_per_round).create_rows()
+        extractor = extractor_class()
+        extractor.xlsx_mode = 'session'
+        # The session calculations and the spreadsheet print as they go
+        with contextlib.redirect_stdout(io.StringIO()):
+            for row in rows:
+                extractor.process_row(row)
+            spreadsheet_filename = self.output_path / 'spreadsheet.xlsx'
+            extractor.save_spreadsheet(spreadsheet_filename)
+            write_only_spreadsheet = extractor.create_spreadsheet(extractor.last_session, WriteOnlySpreadsheet())
+        write_only_filename = self.output_path / 'write_only.xlsx'
+        write_only_spreadsheet.save(write_only_filename)
+
+        expected_sheets = read_sheets(spreadsheet_filename)
+        sheets = read_sheets(write_only_filename)
+        self.assertEqual(list(sheets), list(expected_sheets))
+        for title, expected_rows in expected_sheets.items():
+            self.assertEqual(len(sheets[title]), len(expected_rows), title)
+            for row_number, (row, expected_row) in enumerate(zip(sheets[title], expected_rows), 1):
+                self.assertEqual(row, expected_row, '{} row {}'.format(title, row_number))
+
+    def test_creates_the_same_workbook_as_spreadsheet(self):
+        for extractor_class in [StopDataExtractor, NARestraintDataExtractor, DoubleDataExtractor]:
+            for trials_per_round in [48, 24]:
+                with self.subTest(extractor=extractor_class.__name__, trials_per_round=trials_per_round):
+                    self.assert_workbooks_match(extractor_class, trials_per_round)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import json
+import time
+
+# The phases of an extraction in the order they are reported
+PHASES = ['dispatch', 'extract', 'check', 'calculate', 'spreadsheet', 'write']
+
+# The name under which the phases that are not specific to one extractor are recorded,
+# e.g. finding the duplicate rows and the extractors of each row
+ALL_EXTRACTORS = '(all)'
+
+
+class NullTimer:
+    """The timer used when timing is off: every call does nothing, so it costs next to nothing"""
+
+    def start(self):
+        pass
+
+    def stop(self, extractor, phase, rows=0):
+        pass
+
+
+class PhaseTimer(NullTimer):
+    """
+    Record the wall time, number of calls and number of rows of each phase of each extractor.
+    A phase is timed by calling start before it and stop after it. Phases may be nested, e.g.
+    creating a STOP spreadsheet while calculating a session, and the time of a nested phase is
+    only counted once: against the nested phase and not against the phase it is nested in.
+    The dispatch phase of a pass over the rows is therefore the time spent finding the rows
+    and extractors rather than in extracting them.
+    """
+
+    def __init__(self):
+        # dict of [seconds, calls, rows] keyed by (extractor, phase); the extractor may be a name
+        self.totals = {}
+        # A [start time, seconds of nested phases] pair for each phase that has been started
+        self.started = []
+
+    def start(self):
+        self.started.append([time.perf_counter(), 0.0])
+
+    def stop(self, extractor, phase, rows=0):
+        start_time, nested_seconds = self.started.pop()
+        seconds = time.perf_counter() - start_time
+        if self.started:
+            self.started[-1][1] += seconds
+        key = (extractor, phase)
+        totals = self.totals.get(key)
+        if totals is None:
+            totals = self.totals[key] = [0.0, 0, 0]
+        totals[0] += seconds - nested_seconds
+        totals[1] += 1
+        totals[2] += rows
+
+    def get_phase_totals(self):
+        """Return a list of dicts of the totals of each phase of each extractor keyed by its filename"""
+        phase_totals = []
+        for (extractor, phase), (seconds, calls, rows) in self.totals.items():
+            name = extractor if isinstance(extractor, str) else extractor.get_filename()
+            phase_totals.append({'extractor': name, 'phase': phase, 'seconds': seconds, 'calls': calls, 'rows': rows})
+        return phase_totals
+
+    @staticmethod
+    def merge_phase_totals(*phase_totals_lists):
+        """Combine the phase totals of several timers, e.g. those of the worker processes of a run"""
+        merged = {}
+        for phase_totals in phase_totals_lists:
+            for totals in phase_totals:
+                key = (totals['extractor'], totals['phase'])
+                if key not in merged:
+                    merged[key] = dict(totals, seconds=0.0, calls=0, rows=0)
+                for count in ['seconds', 'calls', 'rows']:
+                    merged[key][count] += totals[count]
+        return list(merged.values())
+
+    @staticmethod
+    def create_report(phase_totals):
+        phase_totals = sorted(phase_totals, key=lambda totals: (totals['extractor'], PHASES.index(totals['phase'])))
+        extractor_seconds = {}
+        for totals in phase_totals:
+            extractor_seconds[totals['extractor']] = extractor_seconds.get(totals['extractor'], 0.0) + totals['seconds']
+        return {
+            'seconds': sum(extractor_seconds.values()),
+            'extractors': extractor_seconds,
+            'phases': phase_totals,
+        }
+
+    @staticmethod
+    def format_report(report):
+        lines = ['{:<34} {:<12} {:>10} {:>7} {:>10} {:>10}'.format('Extractor', 'Phase', 'Seconds', '%', 'Calls', 'Rows')]
+        total_seconds = report['seconds'] or 1
+        for totals in report['phases']:
+            lines.append('{:<34} {:<12} {:>10.3f} {:>6.1f}% {:>10} {:>10}'.format(
+                totals['extractor'], totals['phase'], totals['seconds'], 100 * totals['seconds'] / total_seconds,
+                totals['calls'], totals['rows']))
+        lines.append('')
+        for extractor, seconds in sorted(report['extractors'].items(), key=lambda item: -item[1]):
+            lines.append('{:<34} {:<12} {:>10.3f} {:>6.1f}%'.format(extractor, 'total', seconds, 100 * seconds / total_seconds))
+        lines.append('{:<34} {:<12} {:>10.3f}'.format('', 'total', report['seconds']))
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def save_report(cls, phase_totals, report_path):
+        """Write the report as JSON to <report_path>.json and as a table to <report_path>.txt"""
+        report = cls.create_report(phase_totals)
+        with open('{}.json'.format(report_path), 'w', encoding='utf-8') as json_file:
+            json.dump(report, json_file, indent=2)
+        with open('{}.txt'.format(report_path), 'w', encoding='utf-8') as text_file:
+            text_file.write(cls.format_report(report))
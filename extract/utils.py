@@ -1,3 +1,82 @@
+import re
+import json
+
+
 def irange(start, end):
     """Return a range that includes the end value: 1,5 -> 1...5 rather than 1...4"""
     return range(start, end + 1)
+
+
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def iterate_json_array(json_file, chunk_size=65536):
+    """
+    Yield the elements of the top-level array of a JSON file one at a time.
+    Only the element being decoded is held in memory, so memory use grows with
+    the largest element rather than with the size of the file.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    while position == len(buffer):
+        chunk = json_file.read(chunk_size)
+        if not chunk:
+            raise ValueError('Expected a JSON array')
+        buffer += chunk
+        position = JSON_WHITESPACE.match(buffer).end()
+    if buffer[position:position + 1] != '[':
+        raise ValueError('Expected a JSON array')
+    position += 1
+    end_of_file = False
+    expect_separator = False
+    after_separator = False
+    while True:
+        position = JSON_WHITESPACE.match(buffer, position).end()
+        # Discard the elements that have already been decoded
+        if position > chunk_size:
+            buffer = buffer[position:]
+            position = 0
+        if position == len(buffer):
+            if end_of_file:
+                raise ValueError('Unexpected end of JSON array')
+            chunk = json_file.read(chunk_size)
+            end_of_file = not chunk
+            buffer += chunk
+            continue
+        if buffer[position] == ']' and not after_separator:
+            # Only whitespace may follow the array, as json.load requires
+            rest = buffer[position + 1:]
+            while rest:
+                if JSON_WHITESPACE.match(rest).end() < len(rest):
+                    raise ValueError('Extra data after the JSON array')
+                rest = json_file.read(chunk_size)
+            return
+        if expect_separator:
+            if buffer[position] != ',':
+                raise ValueError('Expected , or ] at position {}'.format(position))
+            position += 1
+            expect_separator = False
+            after_separator = True
+            continue
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+            # A number cut off by the end of the buffer decodes without an error,
+            # so the element is only complete once the following separator is read
+            next_position = JSON_WHITESPACE.match(buffer, end).end()
+            complete = end_of_file or (next_position < len(buffer) and buffer[next_position] in ',]')
+        except json.JSONDecodeError:
+            if end_of_file:
+                raise
+            complete = False
+        if not complete:
+            # Read at least as much again as the partial element so that
+            # decoding a large element is retried a logarithmic number of times
+            chunk = json_file.read(max(chunk_size, len(buffer) - position))
+            end_of_file = not chunk
+            buffer += chunk
+            continue
+        yield element
+        position = end
+        expect_separator = True
+        after_separator = False